@@ -2,4 +2,11 @@ import sys
 import os
 
 # Agrega src/ al sys.path para que los tests puedan importar los módulos correctamente
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
\ No newline at end of file
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
+
+# cba_shared se instala con requirements.txt (-e ../shared); en un checkout del
+# monorepo sin instalar se toma la carpeta hermana
+try:
+    import cba_shared  # noqa: F401
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'shared')))
@@ -141,6 +141,50 @@ def build_parser() -> argparse.ArgumentParser:
         help="Ver navegador (pasa --debug al CLI real)",
     )
 
+    # subcomando: crawl
+    crawl_parser = subparsers.add_parser(
+        "crawl",
+        help="Recorre los listados de categorías y actualiza el universo local",
+    )
+    crawl_parser.add_argument(
+        "--categories",
+        type=Path,
+        help="Archivo con una URL de categoría por línea",
+    )
+    crawl_parser.add_argument(
+        "--pins",
+        type=Path,
+        nargs="+",
+        help="CSV con columna url (p. ej. ../data/sku_pins.csv) de donde deducir las categorías",
+    )
+    crawl_parser.add_argument(
+        "--workers", type=int, default=3, help="Navegadores en paralelo"
+    )
+    crawl_parser.add_argument(
+        "--universe", type=Path, help="JSON del universo (por defecto: data/universe.json)"
+    )
+
+    # subcomando: suggest-pins
+    suggest_parser = subparsers.add_parser(
+        "suggest-pins",
+        help="Matchea la CBA contra el universo local y sugiere pins (offline)",
+    )
+    suggest_parser.add_argument(
+        "--universe", type=Path, help="JSON del universo (por defecto: data/universe.json)"
+    )
+    suggest_parser.add_argument(
+        "--catalog",
+        type=Path,
+        default=Path(__file__).resolve().parents[1] / "data" / "cba_catalog.csv",
+        help="Catálogo CBA",
+    )
+    suggest_parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(__file__).resolve().parents[1] / "exports" / "pin_suggestions.csv",
+        help="CSV de sugerencias",
+    )
+
     return parser
 
 
@@ -211,11 +255,45 @@ def _cmd_pins_run(args: argparse.Namespace) -> None:
     sys.exit(proc.returncode)
 
 
+def _cmd_crawl(args: argparse.Namespace) -> None:
+    from src.scraper.crawl import category_urls_from_pins, crawl
+    from src.universe import DEFAULT_PATH, ProductUniverse
+
+    if args.categories:
+        lines = args.categories.read_text(encoding="utf-8").splitlines()
+        urls = [u.strip() for u in lines if u.strip() and not u.startswith("#")]
+    elif args.pins:
+        urls = category_urls_from_pins(args.pins)
+    else:
+        print("[ERROR] crawl necesita --categories o --pins")
+        sys.exit(2)
+    universe = ProductUniverse(args.universe or DEFAULT_PATH)
+
+    def _progress(url: str, info: dict) -> None:
+        print(f"  {url} -> {info}")
+
+    stats = crawl(urls, universe, workers=args.workers, on_category=_progress)
+    universe.save()
+    print(f"Crawl: {stats} universo={len(universe)} ({universe.path})")
+
+
+def _cmd_suggest_pins(args: argparse.Namespace) -> None:
+    from src.normalizer import load_cba_catalog
+    from src.universe import DEFAULT_PATH, ProductUniverse, write_suggestions
+
+    universe = ProductUniverse(args.universe or DEFAULT_PATH)
+    rows = universe.suggest_pins(load_cba_catalog(str(args.catalog)))
+    path = write_suggestions(rows, args.output)
+    print(f"Sugerencias: {len(rows)} ítems con match sobre {len(universe)} productos -> {path}")
+
+
 COMMAND_DISPATCH = {
     "run": _cmd_run,
     "dry-run": _cmd_dry_run,
     "export-series": _cmd_export_series,
     "pins-run": _cmd_pins_run,
+    "crawl": _cmd_crawl,
+    "suggest-pins": _cmd_suggest_pins,
 }
 
 
@@ -0,0 +1,121 @@
+"""
+Benchmark de escritura de una corrida: fila por fila vs. ``repo.save_run``.
+
+- ``per_row``: una conexión nueva por sentencia (``insert_product`` +
+  ``insert_sku`` + ``insert_price`` por precio), como escribía ``repo`` antes.
+- ``batched``: ``save_run`` en una transacción con upserts en lote.
+
+Corre contra PostgreSQL (variables ``PG*``, ``--pg``; conviene una base
+descartable con ``0001_init.sql`` aplicada, p. ej. un contenedor local) o
+contra SQLite con el mismo código (``--sqlite``, por defecto un archivo
+temporal)::
+
+    python -m src.db.bench --rows 270 --runs 3
+    python -m src.db.bench --pg --rows 270
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+try:
+    from . import engine, repo
+except ImportError:
+    import engine, repo
+
+
+def synthetic_rows(n):
+    """``n`` precios de una corrida (un SKU por producto)."""
+    return [{
+        "name": f"producto {i}",
+        "brand": f"marca {i % 17}",
+        "category": f"categoria {i % 12}",
+        "code": f"art_{100000 + i}",
+        "description": f"producto {i} x 500 g",
+        "pack_size": 500.0,
+        "pack_unit": "g",
+        "price_final": 1000.0 + i,
+        "promo": None,
+        "stock": True,
+    } for i in range(n)]
+
+
+def per_row(connect, run_date, rows):
+    """Como antes: cada sentencia abre, confirma y cierra su conexión."""
+    def call(fn, *args):
+        conn = connect()
+        try:
+            with conn:
+                return fn(*args, conn=conn)
+        finally:
+            conn.close()
+
+    run_id = call(repo.insert_run, run_date, "bench", "ok")
+    for r in rows:
+        pid = call(repo.insert_product, r["name"], r["brand"], r["category"])
+        sid = call(repo.insert_sku, pid, r["code"], r["description"], r["pack_size"], r["pack_unit"])
+        call(repo.insert_price, sid, run_id, r["price_final"], r["promo"], r["stock"])
+
+
+def batched(connect, run_date, rows, pooled=False):
+    if pooled:
+        return repo.save_run(run_date, "bench", "ok", rows)
+    conn = connect()
+    try:
+        return repo.save_run(run_date, "bench", "ok", rows, conn=conn)
+    finally:
+        conn.close()
+
+
+def bench(connect, n_rows=270, runs=3, pooled=False):
+    """Segundos por corrida de cada modo (mejor de ``runs``), con fechas distintas por corrida."""
+    rows = synthetic_rows(n_rows)
+    day = date(2000, 1, 1)
+    out = {"rows": n_rows, "runs": runs}
+    for mode in ("per_row", "batched"):
+        times = []
+        for _ in range(runs):
+            day += timedelta(days=1)
+            t0 = time.perf_counter()
+            if mode == "per_row":
+                per_row(connect, day.isoformat(), rows)
+            else:
+                batched(connect, day.isoformat(), rows, pooled=pooled)
+            times.append(time.perf_counter() - t0)
+        out[mode] = round(min(times), 4)
+    out["speedup"] = round(out["per_row"] / out["batched"], 1) if out["batched"] else None
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de escritura por corrida (fila a fila vs. lote)")
+    ap.add_argument("--rows", type=int, default=270)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--pg", action="store_true", help="PostgreSQL (variables PG*) en vez de SQLite")
+    ap.add_argument("--sqlite", default=None, help="archivo SQLite (por defecto uno temporal)")
+    args = ap.parse_args(argv)
+
+    if args.pg:
+        result = bench(engine.get_connection, args.rows, args.runs, pooled=True)
+        engine.close_pool()
+        result["backend"] = "postgres"
+    else:
+        tmpdir = None
+        path = args.sqlite
+        if path is None:
+            tmpdir = tempfile.TemporaryDirectory()
+            path = os.path.join(tmpdir.name, "bench.sqlite")
+        engine.sqlite_connection(path).close()
+        result = bench(lambda: engine.sqlite_connection(path), args.rows, args.runs)
+        result["backend"] = "sqlite"
+        if tmpdir is not None:
+            tmpdir.cleanup()
+    print(json.dumps(result, ensure_ascii=False))
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
 """
 Helper para conexión y migraciones en PostgreSQL.
+
+Las conexiones salen de un pool por proceso (:func:`connection`) en vez de
+abrir una nueva por sentencia. :func:`sqlite_connection` da una base SQLite
+con el mismo esquema para pruebas y benchmarks sin servidor; ``repo`` acepta
+cualquiera de las dos.
 """
-import psycopg2
 import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
 
-def get_connection():
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connect_kwargs():
     # TODO: Leer config de .env
-    return psycopg2.connect(
+    return dict(
         dbname=os.getenv("PGDATABASE", "ipc_ushuaia"),
         user=os.getenv("PGUSER", "postgres"),
         password=os.getenv("PGPASSWORD", "postgres"),
@@ -14,12 +29,85 @@ def get_connection():
         port=os.getenv("PGPORT", 5432)
     )
 
-def run_migration(sql_path):
+
+def get_connection():
+    """Conexión nueva (sin pool); quien la abre la cierra."""
+    import psycopg2
+
+    return psycopg2.connect(**_connect_kwargs())
+
+
+def get_pool():
+    """Pool de conexiones del proceso (``PGPOOL_MIN``/``PGPOOL_MAX``, 1/5 por defecto)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from psycopg2.pool import ThreadedConnectionPool
+
+            _pool = ThreadedConnectionPool(
+                int(os.getenv("PGPOOL_MIN", 1)), int(os.getenv("PGPOOL_MAX", 5)), **_connect_kwargs()
+            )
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    """Conexión del pool: commit al salir, rollback si hubo error, y vuelve al pool."""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.putconn(conn)
+
+
+def is_sqlite(conn):
+    return isinstance(conn, sqlite3.Connection)
+
+
+def _sqlite_sql(sql):
+    # SERIAL no existe en SQLite; INTEGER PRIMARY KEY es el rowid autoincremental
+    return re.sub(r"\bSERIAL PRIMARY KEY\b", "INTEGER PRIMARY KEY", sql)
+
+
+def sqlite_connection(path=":memory:", migrate=True):
+    """Conexión SQLite (WAL) con las migraciones aplicadas si la base está vacía."""
+    conn = sqlite3.connect(str(path))
+    if str(path) != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    empty = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='products'").fetchone() is None
+    if migrate and empty:
+        for sql_path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            run_migration(sql_path, conn=conn)
+    return conn
+
+
+def run_migration(sql_path, conn=None):
     """
-    Ejecuta un script SQL de migración.
+    Ejecuta un script SQL de migración (en ``conn`` si se pasa, PostgreSQL o SQLite).
     """
     with open(sql_path, encoding='utf-8') as f:
         sql = f.read()
+    if conn is not None and is_sqlite(conn):
+        with conn:
+            conn.executescript(_sqlite_sql(sql))
+        return
+    if conn is not None:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+        return
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(sql)
@@ -1,99 +1,260 @@
 """
 CRUD y consultas para el modelo IPC Ushuaia.
+
+Las funciones de a una fila aceptan ``conn``; sin ella toman una conexión del
+pool (``engine.connection``) y confirman al terminar. Para guardar una
+corrida entera está :func:`save_run`: run, productos, SKUs y precios en una
+sola transacción, con upserts en lote (``execute_values`` en PostgreSQL,
+``executemany`` en SQLite) en vez de una sentencia y una conexión por fila.
+
+Cada sentencia es un par ``(postgres, sqlite)`` con sus propios marcadores
+(``%s`` / ``?``); el SQL no se reescribe al vuelo.
+
+La marca vacía se guarda siempre como ``''``: con ``NULL`` el
+``UNIQUE(name, brand)`` no detecta el duplicado y cada alta agregaría otro
+producto.
 """
 
+from contextlib import contextmanager
+
 try:
-    from .engine import get_connection
+    from .engine import connection, is_sqlite
 except ImportError:
-    from engine import get_connection
+    from engine import connection, is_sqlite
+
+# filas por sentencia en execute_values y valores por IN (...) en las búsquedas de ids
+PAGE_SIZE = 500
+LOOKUP_CHUNK = 500
+
+
+@contextmanager
+def _conn(conn=None):
+    # con conn explícita la transacción es de quien llama
+    if conn is not None:
+        yield conn
+        return
+    with connection() as pooled:
+        yield pooled
+
+
+def _brand(brand):
+    return brand or ""
+
+
+def _fetch(conn, query, params=(), one=True):
+    cur = conn.cursor()
+    try:
+        cur.execute(query[1] if is_sqlite(conn) else query[0], params)
+        return cur.fetchone() if one else cur.fetchall()
+    finally:
+        cur.close()
+
+
+def _execute_values(conn, query, rows):
+    """Todas las ``rows``: ``execute_values`` con el ``VALUES %s`` de PostgreSQL o ``executemany`` en SQLite."""
+    if not rows:
+        return
+    if is_sqlite(conn):
+        conn.executemany(query[1], rows)
+        return
+    from psycopg2.extras import execute_values
+
+    with conn.cursor() as cur:
+        execute_values(cur, query[0], rows, page_size=PAGE_SIZE)
+
+
+def _select_in(conn, query, values):
+    """``query`` con un ``IN ({marks})`` evaluado de a ``LOOKUP_CHUNK`` valores."""
+    values = list(values)
+    out = []
+    for i in range(0, len(values), LOOKUP_CHUNK):
+        chunk = values[i:i + LOOKUP_CHUNK]
+        sql = [q.format(marks=", ".join([mark] * len(chunk))) for q, mark in zip(query, ("%s", "?"))]
+        out.extend(_fetch(conn, sql, chunk, one=False))
+    return out
+
 
-def insert_product(name, brand, category):
+def insert_product(name, brand, category, conn=None):
     """Inserta un producto y retorna su id."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO products (name, brand, category)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (name, brand) DO UPDATE SET category=EXCLUDED.category
-                RETURNING id;
-            """, (name, brand, category))
-            return cur.fetchone()[0]
-
-def get_product_by_name(name, brand):
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            INSERT INTO products (name, brand, category)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (name, brand) DO UPDATE SET category=EXCLUDED.category
+            RETURNING id;
+        """, """
+            INSERT INTO products (name, brand, category)
+            VALUES (?, ?, ?)
+            ON CONFLICT (name, brand) DO UPDATE SET category=EXCLUDED.category
+            RETURNING id;
+        """), (name, _brand(brand), category))[0]
+
+def get_product_by_name(name, brand, conn=None):
     """Consulta producto por nombre y marca."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, name, brand, category FROM products WHERE name=%s AND brand=%s
-            """, (name, brand))
-            return cur.fetchone()
-
-def insert_sku(product_id, code, description, pack_size, pack_unit):
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            SELECT id, name, brand, category FROM products WHERE name=%s AND brand=%s
+        """, """
+            SELECT id, name, brand, category FROM products WHERE name=? AND brand=?
+        """), (name, _brand(brand)))
+
+def insert_sku(product_id, code, description, pack_size, pack_unit, conn=None):
     """Inserta un SKU y retorna su id."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO skus (product_id, code, description, pack_size, pack_unit)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (code) DO UPDATE SET description=EXCLUDED.description, pack_size=EXCLUDED.pack_size, pack_unit=EXCLUDED.pack_unit
-                RETURNING id;
-            """, (product_id, code, description, pack_size, pack_unit))
-            return cur.fetchone()[0]
-
-def insert_price(sku_id, run_id, price_final, promo, stock):
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            INSERT INTO skus (product_id, code, description, pack_size, pack_unit)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (code) DO UPDATE SET description=EXCLUDED.description, pack_size=EXCLUDED.pack_size, pack_unit=EXCLUDED.pack_unit
+            RETURNING id;
+        """, """
+            INSERT INTO skus (product_id, code, description, pack_size, pack_unit)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (code) DO UPDATE SET description=EXCLUDED.description, pack_size=EXCLUDED.pack_size, pack_unit=EXCLUDED.pack_unit
+            RETURNING id;
+        """), (product_id, code, description, pack_size, pack_unit))[0]
+
+def insert_price(sku_id, run_id, price_final, promo, stock, conn=None):
     """Inserta un precio y retorna su id."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO prices (sku_id, run_id, price_final, promo, stock)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (sku_id, run_id) DO UPDATE SET price_final=EXCLUDED.price_final, promo=EXCLUDED.promo, stock=EXCLUDED.stock
-                RETURNING id;
-            """, (sku_id, run_id, price_final, promo, stock))
-            return cur.fetchone()[0]
-
-def insert_basket_item(product_id, monthly_qty_value, monthly_qty_unit, notes):
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            INSERT INTO prices (sku_id, run_id, price_final, promo, stock)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (sku_id, run_id) DO UPDATE SET price_final=EXCLUDED.price_final, promo=EXCLUDED.promo, stock=EXCLUDED.stock
+            RETURNING id;
+        """, """
+            INSERT INTO prices (sku_id, run_id, price_final, promo, stock)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (sku_id, run_id) DO UPDATE SET price_final=EXCLUDED.price_final, promo=EXCLUDED.promo, stock=EXCLUDED.stock
+            RETURNING id;
+        """), (sku_id, run_id, price_final, promo, stock))[0]
+
+def insert_basket_item(product_id, monthly_qty_value, monthly_qty_unit, notes, conn=None):
     """Inserta un ítem de canasta y retorna su id."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO basket_items (product_id, monthly_qty_value, monthly_qty_unit, notes)
-                VALUES (%s, %s, %s, %s)
-                RETURNING id;
-            """, (product_id, monthly_qty_value, monthly_qty_unit, notes))
-            return cur.fetchone()[0]
-
-def insert_run(run_date, branch, status):
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            INSERT INTO basket_items (product_id, monthly_qty_value, monthly_qty_unit, notes)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id;
+        """, """
+            INSERT INTO basket_items (product_id, monthly_qty_value, monthly_qty_unit, notes)
+            VALUES (?, ?, ?, ?)
+            RETURNING id;
+        """), (product_id, monthly_qty_value, monthly_qty_unit, notes))[0]
+
+def insert_run(run_date, branch, status, conn=None):
     """Inserta un run y retorna su id."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO runs (run_date, branch, status)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (run_date, branch) DO UPDATE SET status=EXCLUDED.status
-                RETURNING id;
-            """, (run_date, branch, status))
-            return cur.fetchone()[0]
-
-def insert_index_value(run_id, cba_ae, cba_family, index_value, var_mm, var_ia):
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            INSERT INTO runs (run_date, branch, status)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (run_date, branch) DO UPDATE SET status=EXCLUDED.status
+            RETURNING id;
+        """, """
+            INSERT INTO runs (run_date, branch, status)
+            VALUES (?, ?, ?)
+            ON CONFLICT (run_date, branch) DO UPDATE SET status=EXCLUDED.status
+            RETURNING id;
+        """), (run_date, branch, status))[0]
+
+def insert_index_value(run_id, cba_ae, cba_family, index_value, var_mm, var_ia, conn=None):
     """Inserta valores de índice y retorna su id."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO index_values (run_id, cba_ae, cba_family, index_value, var_mm, var_ia)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id;
-            """, (run_id, cba_ae, cba_family, index_value, var_mm, var_ia))
-            return cur.fetchone()[0]
-
-def insert_log(run_id, level, message):
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            INSERT INTO index_values (run_id, cba_ae, cba_family, index_value, var_mm, var_ia)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING id;
+        """, """
+            INSERT INTO index_values (run_id, cba_ae, cba_family, index_value, var_mm, var_ia)
+            VALUES (?, ?, ?, ?, ?, ?)
+            RETURNING id;
+        """), (run_id, cba_ae, cba_family, index_value, var_mm, var_ia))[0]
+
+def insert_log(run_id, level, message, conn=None):
     """Inserta un log y retorna su id."""
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO logs (run_id, level, message)
-                VALUES (%s, %s, %s)
-                RETURNING id;
-            """, (run_id, level, message))
-            return cur.fetchone()[0]
+    with _conn(conn) as conn:
+        return _fetch(conn, ("""
+            INSERT INTO logs (run_id, level, message)
+            VALUES (%s, %s, %s)
+            RETURNING id;
+        """, """
+            INSERT INTO logs (run_id, level, message)
+            VALUES (?, ?, ?)
+            RETURNING id;
+        """), (run_id, level, message))[0]
+
+
+def upsert_products(conn, rows):
+    """Upsert en lote de ``rows`` (name, brand, category); retorna ``{(name, brand): id}`` con la marca vacía como ``''``."""
+    # una fila por clave: ON CONFLICT no puede tocar dos veces la misma fila en una sentencia
+    values = {}
+    for r in rows:
+        values[(r["name"], _brand(r.get("brand")))] = r.get("category")
+    _execute_values(conn, ("""
+        INSERT INTO products (name, brand, category) VALUES %s
+        ON CONFLICT (name, brand) DO UPDATE SET category=EXCLUDED.category
+    """, """
+        INSERT INTO products (name, brand, category) VALUES (?, ?, ?)
+        ON CONFLICT (name, brand) DO UPDATE SET category=EXCLUDED.category
+    """), [(name, brand, category) for (name, brand), category in values.items()])
+    found = _select_in(conn, ("SELECT id, name, brand FROM products WHERE name IN ({marks})",) * 2,
+                       {name for name, _ in values})
+    return {(name, brand): pid for pid, name, brand in found if (name, brand) in values}
+
+
+def upsert_skus(conn, rows, product_ids):
+    """Upsert en lote de SKUs (code, description, pack_size, pack_unit); retorna ``{code: id}``."""
+    values = {}
+    for r in rows:
+        pid = product_ids.get((r["name"], _brand(r.get("brand"))))
+        values[r["code"]] = (pid, r["code"], r.get("description"), r.get("pack_size"), r.get("pack_unit"))
+    _execute_values(conn, ("""
+        INSERT INTO skus (product_id, code, description, pack_size, pack_unit) VALUES %s
+        ON CONFLICT (code) DO UPDATE SET product_id=EXCLUDED.product_id, description=EXCLUDED.description,
+            pack_size=EXCLUDED.pack_size, pack_unit=EXCLUDED.pack_unit
+    """, """
+        INSERT INTO skus (product_id, code, description, pack_size, pack_unit) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (code) DO UPDATE SET product_id=EXCLUDED.product_id, description=EXCLUDED.description,
+            pack_size=EXCLUDED.pack_size, pack_unit=EXCLUDED.pack_unit
+    """), list(values.values()))
+    found = _select_in(conn, ("SELECT id, code FROM skus WHERE code IN ({marks})",) * 2, values)
+    return dict((code, sid) for sid, code in found)
+
+
+def upsert_prices(conn, run_id, rows, sku_ids):
+    """Upsert en lote de los precios de ``run_id``; retorna cuántos se escribieron."""
+    values = {}
+    for r in rows:
+        sid = sku_ids.get(r["code"])
+        if sid is not None and r.get("price_final") is not None:
+            values[sid] = (sid, run_id, r["price_final"], r.get("promo"), r.get("stock"))
+    _execute_values(conn, ("""
+        INSERT INTO prices (sku_id, run_id, price_final, promo, stock) VALUES %s
+        ON CONFLICT (sku_id, run_id) DO UPDATE SET price_final=EXCLUDED.price_final, promo=EXCLUDED.promo, stock=EXCLUDED.stock
+    """, """
+        INSERT INTO prices (sku_id, run_id, price_final, promo, stock) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (sku_id, run_id) DO UPDATE SET price_final=EXCLUDED.price_final, promo=EXCLUDED.promo, stock=EXCLUDED.stock
+    """), list(values.values()))
+    return len(values)
+
+
+def save_run(run_date, branch, status, rows, conn=None):
+    """Guarda una corrida completa en una transacción.
+
+    ``rows``: dicts con ``name``, ``brand``, ``category``, ``code``,
+    ``description``, ``pack_size``, ``pack_unit``, ``price_final``, ``promo``
+    (texto) y ``stock``. Las filas sin ``code`` no generan SKU ni precio y
+    las sin ``price_final`` no generan precio. Con ``conn`` (PostgreSQL o
+    SQLite) se usa esa conexión; si no, una del pool. Si algo falla no queda
+    nada escrito de la corrida.
+    """
+    rows = [r for r in rows if r.get("name")]
+    with _conn(conn) as conn:
+        with conn:
+            run_id = insert_run(run_date, branch, status, conn=conn)
+            product_ids = upsert_products(conn, rows)
+            coded = [r for r in rows if r.get("code")]
+            sku_ids = upsert_skus(conn, coded, product_ids)
+            n_prices = upsert_prices(conn, run_id, coded, sku_ids)
+    return {"run_id": run_id, "products": len(product_ids), "skus": len(sku_ids), "prices": n_prices}
+
 # TODO: Agregar funciones de consulta, update y delete según necesidad
@@ -1,3 +1,3 @@
-from .units import parse_size, to_base_units
+from .units import parse_size, parse_sizes, to_base_units
 from .pricing import unit_price
-__all__ = ["parse_size", "to_base_units", "unit_price"]
+__all__ = ["parse_size", "parse_sizes", "to_base_units", "unit_price"]
@@ -8,6 +8,7 @@ def unit_price(price: float, pack_size: float, pack_unit: str, base_unit: str) -
     Calcula el precio por unidad base.
     Ej: price=300, pack_size=900, pack_unit='ml', base_unit='ml' -> 0.333...
     """
+    from cba_shared import engine
     from .units import to_base_units
 
     # Convertir pack_size a la unidad base deseada
@@ -16,4 +17,5 @@ def unit_price(price: float, pack_size: float, pack_unit: str, base_unit: str) -
         raise ValueError(f"No se puede convertir {pack_unit} a {base_unit}")
     if base_qty == 0:
         raise ValueError("El tamaño del pack no puede ser cero")
-    return price / base_qty
+    # misma división que compute_item_costs del proyecto raíz
+    return engine.unit_price(price, base_qty) or 0.0
@@ -1,100 +1,37 @@
 """
 Parser y normalizador de tamaños y unidades.
 Detecta patrones como '1 kg', '900 ml', 'x2 500g', 'docena', fracciones y multi-pack.
+Las reglas son las del motor compartido (``cba_shared.engine``, paquete
+``shared/`` del repo); acá se proyectan a la base g/ml/unidad.
 """
 
-import re
-from typing import Tuple
+from typing import Iterable, List, Tuple
 
-# Alias y conversiones
-_unit_aliases = {
-    'g': 'g', 'gr': 'g', 'grs': 'g',
-    'kg': 'kg', 'kilo': 'kg',
-    'ml': 'ml', 'cc': 'ml',
-    'l': 'l', 'lt': 'l', 'litro': 'l',
-    'unidad': 'unidad', 'un': 'unidad', 'u': 'unidad',
-    'unidades': 'unidad',  # Soporte plural
-    'docena': 'docena', 'docenas': 'docena',
-}
+from cba_shared import engine
 
-_unit_multipliers = {
-    'g': 1,
-    'kg': 1000,
-    'ml': 1,
-    'l': 1000,
-    'unidad': 1,
-    'docena': 12,
-}
-
-def _parse_fraction(s):
-    s = s.replace('½', '1/2').replace('¼', '1/4')
-    if '/' in s:
-        num, den = s.split('/')
-        return float(num) / float(den)
-    return float(s)
 
 def parse_size(text: str) -> Tuple[float, str]:
     """
     Extrae cantidad y unidad base de una descripción textual.
     Ej: 'x2 500g' -> (1000, 'g')
     """
-    text = text.lower().strip()
-    # Multi-pack: xN ...
-    m = re.match(r"x\s*(\d+)\s*(.*)", text)
-    if m:
-        mult = int(m.group(1))
-        rest = m.group(2).strip()
-        qty, unit = parse_size(rest)
-        return mult * qty, unit
-    # Multi-pack con fracción: xN fracción unidad
-    m = re.match(r"x\s*(\d+)\s*([\d/.,]+)\s*([a-zA-Z]+)", text)
-    if m:
-        mult = int(m.group(1))
-        qty = _parse_fraction(m.group(2).replace(',', '.'))
-        unit = m.group(3)
-        base_qty, base_unit = to_base_units(qty, unit)
-        return mult * base_qty, base_unit
-    # Fracción: 1/2 kg, 0.5 kg, ½ kg
-    m = re.match(r"([\d/.,]+)\s*([a-zA-Z]+)", text)
-    if m:
-        qty = _parse_fraction(m.group(1).replace(',', '.'))
-        unit = m.group(2)
-        return to_base_units(qty, unit)
-    # Docena
-    if 'docena' in text:
-        m = re.match(r"(\d+)\s*docena", text)
-        if m:
-            return int(m.group(1)) * 12, 'unidad'
-        return 12, 'unidad'
-    # Unidades
-    m = re.match(r"(\d+)\s*unidades?", text)
-    if m:
-        return int(m.group(1)), 'unidad'
-    # Solo número (asumir unidad)
-    m = re.match(r"(\d+)$", text)
-    if m:
-        return float(m.group(1)), 'unidad'
-    # Si solo dice 'docena'
-    if text.strip() == 'docena':
-        return 12, 'unidad'
-    raise ValueError(f"No se pudo parsear tamaño: {text}")
+    size = engine.parse_text(text)
+    if size.rule == 'fallback':
+        raise ValueError(f"No se pudo parsear tamaño: {text}")
+    return engine.to_g_ml(size)
+
+
+def parse_sizes(texts: Iterable[str]) -> List[Tuple[float, str]]:
+    """
+    ``parse_size`` en lote: cada texto distinto se parsea una vez.
+    Los textos sin tamaño reconocible devuelven ``(None, None)``.
+    """
+    return [(None, None) if s.rule == 'fallback' else engine.to_g_ml(s) for s in engine.parse_texts(texts)]
+
 
 def to_base_units(value: float, unit: str) -> Tuple[float, str]:
     """
     Convierte a unidad base (g, ml, unidad).
     Ej: (1.5, 'kg') -> (1500, 'g')
     """
-    unit = unit.lower()
-    if unit not in _unit_aliases:
-        raise ValueError(f"Unidad desconocida: {unit}")
-    canonical = _unit_aliases[unit]
-    if canonical not in _unit_multipliers:
-        raise ValueError(f"Unidad no convertible: {unit}")
-    mult = _unit_multipliers[canonical]
-    if canonical == 'docena':
-        return value * mult, 'unidad'
-    if canonical == 'kg':
-        return value * mult, 'g'
-    if canonical == 'l':
-        return value * mult, 'ml'
-    return value * mult, canonical
+    return engine.to_g_ml(engine.size_of(value, unit))
@@ -0,0 +1,157 @@
+"""Relevamiento completo de categorías hacia el universo local de productos.
+
+Cada categoría se abre con ``list_category`` y se recorre con ``paginate``;
+de cada página se extraen todas las tarjetas con
+``extract_product_cards_imetrics`` y se vuelcan en
+:class:`~src.universe.ProductUniverse`.
+
+Las categorías se reparten entre ``workers`` hilos, cada uno con su propio
+navegador (Playwright sync no comparte páginas entre hilos), así la cantidad
+de páginas abiertas contra el sitio nunca supera ``workers``. El universo se
+actualiza solo desde el hilo principal a medida que terminan las categorías.
+"""
+
+from __future__ import annotations
+
+import csv
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+__all__ = ["category_urls_from_pins", "fetch_category", "crawl"]
+
+BASE_URL = "https://supermercado.laanonimaonline.com"
+
+
+def category_urls_from_pins(csv_paths: Iterable[Path], depth: int = 2) -> List[str]:
+    """Listados de categoría (``/almacen/harinas/``) deducidos de las URLs de pins."""
+    urls: Dict[str, None] = {}
+    for path in csv_paths:
+        with open(path, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh):
+                parts = [p for p in urlparse(row.get("url") or "").path.split("/") if p]
+                if len(parts) > depth:
+                    urls[f"{BASE_URL}/{'/'.join(parts[:depth])}/"] = None
+    return list(urls)
+
+
+def fetch_category(page, url: str) -> List[str]:
+    """HTML de todas las páginas del listado ``url``."""
+    from .search import list_category, paginate
+
+    list_category(page, url)
+    return paginate(page)
+
+
+def _default_open_page() -> Tuple[Any, Callable[[], None]]:
+    from .browser import close_browser, launch_browser
+
+    browser, context, page = launch_browser(headless=True)
+    return page, lambda: close_browser(browser, context)
+
+
+def crawl(
+    category_urls: List[str],
+    universe,
+    *,
+    workers: int = 3,
+    fetch: Callable[[Any, str], List[str]] = fetch_category,
+    open_page: Callable[[], Tuple[Any, Callable[[], None]]] = _default_open_page,
+    on_category: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    extract_cards: Optional[Callable[[str], List[Dict[str, Any]]]] = None,
+) -> Dict[str, Any]:
+    """Recorre ``category_urls`` con hasta ``workers`` navegadores a la vez.
+
+    Devuelve categorías, páginas, tarjetas, productos nuevos/actualizados,
+    errores y segundos. ``on_category(url, resumen)`` se llama al terminar
+    cada categoría (también si falló, con ``error``). Si todos los hilos
+    mueren antes de terminar, las categorías pendientes cuentan como errores
+    (``not processed``) en lugar de esperar para siempre. ``fetch``,
+    ``open_page`` y ``extract_cards`` (por defecto
+    ``extract_product_cards_imetrics``) se pueden inyectar.
+    """
+    if extract_cards is None:
+        from .extract import extract_product_cards_imetrics as extract_cards
+
+    todo: "queue.Queue[Optional[str]]" = queue.Queue()
+    done: "queue.Queue[Tuple[str, Optional[Tuple[int, List[Dict[str, Any]]]], Optional[str]]]" = queue.Queue()
+    for url in category_urls:
+        todo.put(url)
+
+    def _worker() -> None:
+        # el navegador se abre y se cierra en el mismo hilo que lo usa
+        page, close, url = None, None, None
+        try:
+            while True:
+                try:
+                    url = todo.get_nowait()
+                except queue.Empty:
+                    url = None
+                    return
+                try:
+                    if page is None:
+                        page, close = open_page()
+                    pages = fetch(page, url)
+                    cards: List[Dict[str, Any]] = []
+                    for html in pages:
+                        cards.extend(extract_cards(html))
+                    done.put((url, (len(pages), cards), None))
+                except Exception as e:
+                    done.put((url, None, str(e)))
+                url = None
+        finally:
+            if url is not None:
+                # el hilo murió a mitad de una categoría (BaseException): igual se informa
+                done.put((url, None, "worker died"))
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    stats = {"categories": 0, "pages": 0, "cards": 0, "new": 0, "updated": 0, "skipped": 0, "errors": 0}
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=_worker, daemon=True) for _ in range(max(1, min(workers, len(category_urls))))]
+    for t in threads:
+        t.start()
+
+    def _failed(url: str, error: str) -> None:
+        stats["categories"] += 1
+        stats["errors"] += 1
+        if on_category:
+            on_category(url, {"error": error})
+
+    received = 0
+    while received < len(category_urls):
+        try:
+            url, result, error = done.get(timeout=1.0)
+        except queue.Empty:
+            if any(t.is_alive() for t in threads) or not done.empty():
+                continue
+            # murieron todos los hilos: lo que quedó en ``todo`` no lo procesa nadie
+            while True:
+                try:
+                    _failed(todo.get_nowait(), "not processed")
+                except queue.Empty:
+                    break
+            break
+        received += 1
+        if error is not None:
+            _failed(url, error)
+            continue
+        stats["categories"] += 1
+        pages, cards = result
+        counts = universe.upsert(cards, category=urlparse(url).path)
+        stats["pages"] += pages
+        stats["cards"] += len(cards)
+        for k, v in counts.items():
+            stats[k] += v
+        if on_category:
+            on_category(url, dict(counts, pages=pages, cards=len(cards)))
+    for t in threads:
+        t.join()
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    return stats
@@ -0,0 +1,151 @@
+"""Universo local de productos relevados por categoría.
+
+El modo ``crawl`` (``src/scraper/crawl.py``) recorre los listados de
+categorías del supermercado y guarda cada tarjeta en un único JSON, una
+entrada por producto con clave ``art_<id>`` (sale de la URL) o ``sku:<sku>``
+si la URL no la trae. Cada corrida actualiza precio, stock y ``last_seen``
+y acumula las categorías donde apareció el producto.
+
+Con el universo en disco el matching contra la CBA y las sugerencias de pins
+corren offline (``match``/``suggest_pins`` sobre
+:class:`~src.parser.CatalogMatcher`) en vez de lanzar una búsqueda en vivo
+por ítem.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .normalize.units import parse_sizes
+from .parser import map_products_to_cba
+
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / "data" / "universe.json"
+
+_ART_RE = re.compile(r"/art_(\d+)")
+
+SUGGESTION_FIELDS = ["item", "category", "url", "title", "sku", "price", "source", "reason"]
+
+
+def product_key(card: Dict[str, Any]) -> Optional[str]:
+    """``art_<id>`` desde la URL de la tarjeta; si no hay, ``sku:<sku>``."""
+    m = _ART_RE.search(card.get("url") or "")
+    if m:
+        return f"art_{m.group(1)}"
+    sku = str(card.get("sku") or "").strip()
+    return f"sku:{sku}" if sku else None
+
+
+class ProductUniverse:
+    """Productos vistos en los listados, persistidos en ``path`` (JSON)."""
+
+    def __init__(self, path: os.PathLike | str = DEFAULT_PATH) -> None:
+        self.path = Path(path)
+        self.items: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            self.items = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def upsert(self, cards: Iterable[Dict[str, Any]], category: str = "", seen_at: Optional[str] = None) -> Dict[str, int]:
+        """Agrega o actualiza tarjetas de ``extract_product_cards_imetrics``.
+
+        Devuelve cuántas fueron nuevas, actualizadas y cuántas se
+        descartaron por no tener clave.
+        """
+        seen_at = seen_at or datetime.now(timezone.utc).isoformat(timespec="seconds")
+        counts = {"new": 0, "updated": 0, "skipped": 0}
+        for card in cards:
+            key = product_key(card)
+            if key is None:
+                counts["skipped"] += 1
+                continue
+            entry = self.items.get(key)
+            if entry is None:
+                entry = self.items[key] = {"key": key, "categories": [], "first_seen": seen_at}
+                counts["new"] += 1
+            else:
+                counts["updated"] += 1
+            entry.update(
+                sku=card.get("sku") or entry.get("sku", ""),
+                name=card.get("nombre", ""),
+                brand=card.get("marca", ""),
+                url=card.get("url", ""),
+                price=card.get("precio_final"),
+                promo_flag=bool(card.get("promo_flag")),
+                in_stock=bool(card.get("in_stock")),
+                last_seen=seen_at,
+            )
+            if category and category not in entry["categories"]:
+                entry["categories"].append(category)
+        return counts
+
+    def save(self) -> Path:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.items, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+        return self.path
+
+    def products(self, in_stock_only: bool = True) -> List[Dict[str, Any]]:
+        """Productos con precio en el formato de :func:`~src.parser.map_products_to_cba`.
+
+        El tamaño sale del título (g/ml/unidad) y ``unit_price`` es el precio
+        por esa unidad; sin tamaño reconocible se toma el envase como 1.
+        """
+        entries = [e for e in self.items.values() if e.get("price") and (e.get("in_stock") or not in_stock_only)]
+        sizes = parse_sizes(e.get("name", "") for e in entries)
+        out = []
+        for e, (qty, unit) in zip(entries, sizes):
+            out.append({
+                "sku": e["key"],
+                "name": e.get("name", ""),
+                "url": e.get("url", ""),
+                "price": e["price"],
+                "pack_size": qty,
+                "pack_unit": unit,
+                "unit_price": e["price"] / qty if qty else e["price"],
+                "promo_flag": e.get("promo_flag", False),
+            })
+        return out
+
+    def match(self, cba_catalog: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Mapeo CBA ↔ universo, igual que con productos de una búsqueda en vivo."""
+        return map_products_to_cba(self.products(), cba_catalog)
+
+    def suggest_pins(self, cba_catalog: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Una sugerencia de pin (URL del producto elegido) por ítem con match."""
+        mapping = self.match(cba_catalog)
+        rows = []
+        for row in cba_catalog:
+            chosen = mapping.get(row["item"]) or {}
+            entry = self.items.get(chosen.get("sku") or "")
+            if not entry:
+                continue
+            rows.append({
+                "item": row["item"],
+                "category": row.get("category", ""),
+                "url": entry.get("url", ""),
+                "title": entry.get("name", ""),
+                "sku": entry.get("sku", ""),
+                "price": entry.get("price"),
+                "source": chosen.get("source"),
+                "reason": chosen.get("reason") or "",
+            })
+        return rows
+
+
+def write_suggestions(rows: List[Dict[str, Any]], path: os.PathLike | str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=SUGGESTION_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
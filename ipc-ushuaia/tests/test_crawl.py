@@ -0,0 +1,70 @@
+"""
+Tests para el crawl por categoría con páginas, fetch y extractor inyectados (sin navegador).
+"""
+import threading
+
+import pytest
+
+from src.scraper import crawl as crawl_mod
+from src.universe import ProductUniverse
+
+BASE = 'https://supermercado.laanonimaonline.com'
+
+
+def _html(cat, *skus):
+    return ';'.join(f'{BASE}/{cat}/art_{s}/' for s in skus)
+
+
+def _cards(html):
+    # una "página" es la lista de URLs de sus tarjetas
+    return [{'sku': u.rstrip('/').split('_')[-1], 'nombre': 'Producto', 'url': u, 'precio_final': 100.0}
+            for u in html.split(';')]
+
+
+def _open_page(opened):
+    lock = threading.Lock()
+
+    def _open():
+        page = {'closed': False}
+        with lock:
+            opened.append(page)
+        return page, lambda: page.update(closed=True)
+    return _open
+
+
+def test_crawl_fills_universe_and_closes_pages(tmp_path):
+    listings = {
+        f'{BASE}/almacen/harinas/': [_html('almacen/harinas', '1', '2'), _html('almacen/harinas', '3')],
+        f'{BASE}/lacteos/leches/': [_html('lacteos/leches', '4')],
+        f'{BASE}/roto/': None,
+    }
+
+    def _fetch(page, url):
+        if listings[url] is None:
+            raise RuntimeError('timeout')
+        return listings[url]
+
+    opened, seen = [], {}
+    universe = ProductUniverse(tmp_path / 'universe.json')
+    stats = crawl_mod.crawl(list(listings), universe, workers=2, fetch=_fetch, open_page=_open_page(opened),
+                            extract_cards=_cards, on_category=lambda url, info: seen.update({url: info}))
+    assert (stats['categories'], stats['pages'], stats['cards'], stats['new'], stats['errors']) == (3, 3, 4, 4, 1)
+    assert sorted(universe.items) == ['art_1', 'art_2', 'art_3', 'art_4']
+    assert universe.items['art_4']['categories'] == ['/lacteos/leches/']
+    assert seen[f'{BASE}/roto/'] == {'error': 'timeout'}
+    assert len(opened) <= 2 and all(p['closed'] for p in opened)
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_crawl_returns_when_every_worker_dies(tmp_path):
+    urls = [f'{BASE}/a/', f'{BASE}/b/', f'{BASE}/c/']
+    opened = []
+
+    def _fetch(page, url):
+        # SystemExit no es Exception: el hilo muere sin pasar por el except del worker
+        raise SystemExit(1)
+
+    stats = crawl_mod.crawl(urls, ProductUniverse(tmp_path / 'universe.json'), workers=2, fetch=_fetch,
+                            open_page=_open_page(opened), extract_cards=_cards)
+    assert stats['categories'] == 3 and stats['errors'] == 3
+    assert all(p['closed'] for p in opened)
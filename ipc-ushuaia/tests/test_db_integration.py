@@ -1,9 +1,55 @@
 """
-Pruebas de inserción y consulta en la base de datos PostgreSQL (mock o real).
+Pruebas de inserción y consulta en la base de datos (SQLite con el esquema de PostgreSQL).
 """
-# from src.db.engine import get_connection
-# from src.db.repo import insert_product, get_product_by_name
+import pytest
 
-def test_insert_and_get_product():
-    # TODO: Implementar test real con base de datos de prueba o mock
-    pass
+from src.db import engine, repo
+from src.db.bench import synthetic_rows
+
+
+@pytest.fixture
+def conn(tmp_path):
+    c = engine.sqlite_connection(tmp_path / "ipc.sqlite")
+    yield c
+    c.close()
+
+
+def test_insert_and_get_product(conn):
+    pid = repo.insert_product("Leche", "La Serenísima", "lácteos", conn=conn)
+    assert repo.insert_product("Leche", "La Serenísima", "lacteos", conn=conn) == pid
+    assert repo.get_product_by_name("Leche", "La Serenísima", conn=conn) == (pid, "Leche", "La Serenísima", "lacteos")
+
+
+def test_product_without_brand_is_one_row_on_both_paths(conn):
+    pid = repo.insert_product("Pan fresco", None, "panadería", conn=conn)
+    assert repo.get_product_by_name("Pan fresco", None, conn=conn)[0] == pid
+    rows = [{"name": "Pan fresco", "brand": None, "category": "panadería", "code": "art_1",
+             "price_final": 10.0, "promo": "", "stock": True}]
+    repo.save_run("2024-01-05", "USHUAIA 5", "ok", rows, conn=conn)
+    assert conn.execute("SELECT id, brand FROM products").fetchall() == [(pid, "")]
+    assert conn.execute("SELECT product_id FROM skus WHERE code = 'art_1'").fetchone()[0] == pid
+
+
+def test_save_run_batched_upserts(conn):
+    rows = synthetic_rows(30)
+    first = repo.save_run("2024-01-05", "USHUAIA 5", "ok", rows, conn=conn)
+    assert first["products"] == first["skus"] == first["prices"] == 30
+
+    # re-correr el mismo día actualiza en lugar de duplicar; sin código no hay precio
+    rows[0]["price_final"] = 1.5
+    again = repo.save_run("2024-01-05", "USHUAIA 5", "ok", rows + [dict(rows[1], code="")], conn=conn)
+    assert again["run_id"] == first["run_id"]
+    assert conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0] == 30
+    assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 30
+    assert conn.execute("SELECT price_final FROM prices p JOIN skus s ON s.id = p.sku_id WHERE s.code = 'art_100000'").fetchone()[0] == 1.5
+
+
+def test_save_run_is_one_transaction(conn):
+    rows = synthetic_rows(5)
+    rows[3]["price_final"] = "no es un precio"
+    conn.execute("CREATE TRIGGER bad BEFORE INSERT ON prices WHEN typeof(NEW.price_final) = 'text' "
+                 "BEGIN SELECT RAISE(ABORT, 'precio inválido'); END")
+    with pytest.raises(Exception):
+        repo.save_run("2024-01-05", "USHUAIA 5", "ok", rows, conn=conn)
+    assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 0
@@ -27,3 +27,15 @@ def test_map_products_to_cba():
     mapping = parser.map_products_to_cba(products, cba_catalog)
     assert mapping['Pan fresco']['sku'] == '123'
     assert mapping['Leche líquida']['sku'] == '456'
+
+def test_catalog_matcher_only_evaluates_candidates():
+    cba_catalog = [
+        {'item': 'Pan fresco', 'preferred_keywords': 'pan;fresco', 'fallback_keywords': 'lactal'},
+        {'item': 'Leche líquida', 'preferred_keywords': 'leche', 'fallback_keywords': ''}
+    ]
+    products = [{'name': f'Galletitas {i}', 'sku': str(i)} for i in range(50)]
+    products.append({'name': 'Leche entera', 'sku': 'L', 'unit_price': 200})
+    matcher = parser.CatalogMatcher(cba_catalog).index(products)
+    assert [m['sku'] for m in matcher.matches(matcher.rows[1])] == ['L']
+    assert matcher.matches(matcher.rows[0]) == []
+    assert matcher.stats['pairs'] == 1
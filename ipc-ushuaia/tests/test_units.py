@@ -23,3 +23,8 @@ def test_to_base_units_cases():
     assert to_base_units(500, 'g') == (500, 'g')
     assert to_base_units(1, 'docena') == (12, 'unidad')
     assert to_base_units(2, 'docena') == (24, 'unidad')
+
+def test_parse_sizes_batch():
+    from src.normalize.units import parse_sizes
+    assert parse_sizes(['x2 500g', 'Aceite x 1,5 Lt.', 'sin tamaño', 'x2 500g']) == [
+        (1000, 'g'), (1500, 'ml'), (None, None), (1000, 'g')]
@@ -0,0 +1,46 @@
+"""
+Tests para el universo local de productos y el matching offline.
+"""
+from src.universe import ProductUniverse, product_key
+
+BASE = 'https://supermercado.laanonimaonline.com'
+CARDS = [
+    {'sku': '2440', 'nombre': 'Leche Entera La Serenísima x 1 l', 'marca': 'LS',
+     'url': f'{BASE}/lacteos/leches/leche-entera/art_2440/', 'precio_final': 1200.0, 'promo_flag': False, 'in_stock': True},
+    {'sku': '99', 'nombre': 'Leche Descremada x 1 l', 'marca': 'X',
+     'url': f'{BASE}/lacteos/leches/leche-descremada/art_99/', 'precio_final': 900.0, 'promo_flag': True, 'in_stock': True},
+    {'sku': '', 'nombre': 'Pan Lactal x 500 g', 'marca': '', 'url': '', 'precio_final': 700.0, 'promo_flag': False, 'in_stock': True},
+]
+CATALOG = [
+    {'item': 'Leche líquida', 'category': 'Lácteos', 'preferred_keywords': 'leche entera',
+     'fallback_keywords': 'leche descremada', 'min_pack_size': '1', 'monthly_qty_unit': 'l'},
+    {'item': 'Yerba', 'category': 'Infusiones', 'preferred_keywords': 'yerba', 'fallback_keywords': ''},
+]
+
+
+def test_product_key():
+    assert product_key(CARDS[0]) == 'art_2440'
+    assert product_key({'sku': '77', 'url': ''}) == 'sku:77'
+    assert product_key(CARDS[2]) is None
+
+
+def test_upsert_persists_and_updates(tmp_path):
+    path = tmp_path / 'universe.json'
+    u = ProductUniverse(path)
+    assert u.upsert(CARDS, category='/lacteos/leches/', seen_at='2024-01-01') == {'new': 2, 'updated': 0, 'skipped': 1}
+    u.save()
+    u2 = ProductUniverse(path)
+    counts = u2.upsert([dict(CARDS[0], precio_final=1300.0)], category='/ofertas/', seen_at='2024-02-01')
+    assert counts == {'new': 0, 'updated': 1, 'skipped': 0}
+    entry = u2.items['art_2440']
+    assert entry['price'] == 1300.0 and entry['first_seen'] == '2024-01-01' and entry['last_seen'] == '2024-02-01'
+    assert entry['categories'] == ['/lacteos/leches/', '/ofertas/']
+
+
+def test_suggest_pins_offline(tmp_path):
+    u = ProductUniverse(tmp_path / 'universe.json')
+    u.upsert(CARDS)
+    rows = u.suggest_pins(CATALOG)
+    # la preferida gana aunque la descremada sea más barata; Yerba no está en el universo
+    assert [(r['item'], r['sku'], r['source']) for r in rows] == [('Leche líquida', '2440', 'preferred')]
+    assert rows[0]['url'].endswith('/art_2440/')
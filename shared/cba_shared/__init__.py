@@ -0,0 +1,5 @@
+"""Código común del scraper CBA (raíz) e ``ipc-ushuaia``.
+
+Ambos proyectos usan el paquete ``src``, así que lo compartido vive en este
+paquete instalable (``pip install -e shared``) en lugar de cargarse por ruta.
+"""
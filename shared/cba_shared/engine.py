@@ -0,0 +1,201 @@
+"""Motor único de normalización de tamaños y precios unitarios.
+
+Antes convivían dos parsers (``src/normalize/units.py`` sobre títulos, con
+base kg/l/unit, e ``ipc-ushuaia/src/normalize/units.py`` sobre cadenas de
+presentación, con base g/ml/unidad) que daban resultados distintos para la
+misma presentación. Este módulo es la única tabla de reglas; cada proyecto
+proyecta el resultado a su base:
+
+- :func:`to_kg_l` → ``(cantidad, 'kg'|'l'|'unit')`` (scraping, pricing y
+  reporting de este proyecto);
+- :func:`to_g_ml` → ``(cantidad, 'g'|'ml'|'unidad')`` (``ipc-ushuaia``).
+
+Un :class:`Size` guarda ``count × amount unit`` tal como aparece en el
+texto (``x2 500 g`` → ``Size(2, 500, 'g')``), así las dos proyecciones hacen
+la misma aritmética que hacían los parsers originales.
+
+Las reglas se prueban en orden y gana la primera; ``parse_text`` está
+memoizado por texto normalizado (minúsculas, espacios colapsados, ``½`` y
+``¼`` como fracciones) y ``parse_texts`` parsea en lote cada texto distinto
+una sola vez.
+
+Solo usa la biblioteca estándar; se instala como dependencia de ambos
+proyectos (``pip install -e shared``).
+"""
+import functools
+import re
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# cache de textos normalizados; cada corrida re-parsea los mismos títulos
+# en búsqueda, pinned, pricing y reporting
+CACHE_SIZE = 8192
+
+_NUM = r"(?:\d+(?:[\.,]\d+)?)"
+_MASS = r"kg|kgs|kilos|kilogramos|kilogramo|kilo|g|gr|grs|gramos"
+_VOL = r"l|lt|lts|litros|litro|ml|cc"
+
+# alias → unidad canónica del texto
+_UNIT_ALIASES = {
+    'kg': 'kg', 'kgs': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogramo': 'kg', 'kilogramos': 'kg',
+    'g': 'g', 'gr': 'g', 'grs': 'g', 'gramos': 'g',
+    'l': 'l', 'lt': 'l', 'lts': 'l', 'litro': 'l', 'litros': 'l',
+    'ml': 'ml', 'cc': 'ml',
+    'u': 'unit', 'un': 'unit', 'unidad': 'unit', 'unidades': 'unit', 'unit': 'unit',
+    'docena': 'docena', 'docenas': 'docena', 'doz': 'docena', 'dozen': 'docena',
+}
+
+
+class Size(NamedTuple):
+    """``count`` envases de ``amount`` ``unit`` (unidad canónica: kg/g/l/ml/unit)."""
+    count: float
+    amount: float
+    unit: str
+    rule: str
+
+
+def canonical_unit(unit: str) -> str:
+    u = (unit or '').lower().strip()
+    if u not in _UNIT_ALIASES:
+        raise ValueError(f"Unidad desconocida: {unit}")
+    return _UNIT_ALIASES[u]
+
+
+def _to_float(num: str) -> float:
+    return float(num.replace(',', '.'))
+
+
+def size_of(amount: float, unit: str, count: float = 1, rule: str = '') -> Size:
+    """``Size`` de ``count × amount unit`` (``unit`` con cualquier alias; la docena pasa a 12 unidades)."""
+    u = canonical_unit(unit)
+    if u == 'docena':
+        return Size(count, 12 * float(amount), 'unit', rule)
+    return Size(count, float(amount), u, rule)
+
+
+def _fixed(qty: float) -> Callable[[Any, str], Size]:
+    return lambda m, rule: Size(1, qty, 'unit', rule)
+
+
+def _dozens(m, rule: str) -> Size:
+    return Size(1, 12 * float(m.group(1)), 'unit', rule)
+
+
+def _units_count(m, rule: str) -> Size:
+    return Size(1, float(m.group(1)), 'unit', rule)
+
+
+def _pack_fraction(m, rule: str) -> Size:
+    return size_of(0.5 if m.group(2) == '1/2' else 0.25, m.group(3), int(m.group(1)), rule)
+
+
+def _whole_and_half(m, rule: str) -> Size:
+    return size_of(float(m.group(1)) + 0.5, m.group(2), 1, rule)
+
+
+def _explicit(m, rule: str) -> Size:
+    return size_of(_to_float(m.group(1)), m.group(2), 1, rule)
+
+
+def _pack(m, rule: str) -> Size:
+    return size_of(_to_float(m.group(3)), m.group(4), int(m.group(1) or m.group(2)), rule)
+
+
+def _fraction(m, rule: str) -> Size:
+    return size_of(0.5 if m.group(1) == '1/2' else 0.25, m.group(2), 1, rule)
+
+
+def _bare_number(m, rule: str) -> Size:
+    return Size(1, float(m.group(1)), 'unit', rule)
+
+
+# Tabla ordenada de reglas (nombre, regex compilada, conversión): gana la primera que matchea
+RULES: Tuple[Tuple[str, 're.Pattern[str]', Callable[[Any, str], Size]], ...] = (
+    # docena / media docena / N docenas
+    ('media_docena', re.compile(r"\bmedia\s+docena\b"), _fixed(6.0)),
+    ('docenas', re.compile(r"\b(\d+)\s*docenas?\b"), _dozens),
+    ('docena', re.compile(r"docena"), _fixed(12.0)),
+    # x2 1/2 kg: pack de medios (la 'x' pegada al número)
+    ('pack_fraccion', re.compile(rf"\bx(\d+)\s+(1/2|1/4)\s*({_MASS}|{_VOL})\b"), _pack_fraction),
+    # patterns like 1 1/2 l or 2 1/2 kg
+    ('entero_y_medio', re.compile(r"(\d+)\s+1/2\s*(kg|kilo|kilogramo|l|lt|litro)"), _whole_and_half),
+    # pattern like "x 473 cc" (explicit size after an 'x', not a pack count)
+    ('x_tamano', re.compile(rf"\bx\s*({_NUM})\s*({_MASS}|{_VOL})\b"), _explicit),
+    # xN packs like x2 500 g or 2 x 500 g (la cuenta va separada del tamaño por 'x' o espacio)
+    ('pack', re.compile(rf"(?:\bx\s*(\d+)\s+|\b(\d+)\s*[×x]\s*)({_NUM})\s*({_MASS}|{_VOL})\b"), _pack),
+    # 1/2 kg, 1/4 kg
+    ('fraccion', re.compile(r"(1/2|1/4)\s*(kg|kilo|kilogramo|l|lt|litro)"), _fraction),
+    # explicit quantity like 1.5 l, 900 ml, 500 g, 1 kg
+    ('cantidad', re.compile(rf"({_NUM})\s*({_MASS}|{_VOL})\b"), _explicit),
+    # units count like 6 u / 6 un / 6 unidades / x6 u (si no hay peso ni volumen)
+    ('unidades', re.compile(r"(?:x\s*)?(\d+)\s*(?:u\b|un\b|unid(?:ades)?\b|unidad(?:es)?\b)"), _units_count),
+    # solo un número: unidades
+    ('numero', re.compile(r"^(\d+)$"), _bare_number),
+)
+FALLBACK = Size(1, 1.0, 'unit', 'fallback')
+
+_RULE_HITS: Dict[str, int] = {name: 0 for name, _, _ in RULES}
+_RULE_HITS['fallback'] = 0
+
+
+def normalize_text(text: str) -> str:
+    # las reglas solo usan \s, así que colapsar espacios no cambia el resultado
+    t = (text or '').lower().replace('½', '1/2').replace('¼', '1/4')
+    return ' '.join(t.split())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _parse_normalized(t: str) -> Size:
+    for name, rx, convert in RULES:
+        m = rx.search(t)
+        if m:
+            _RULE_HITS[name] += 1
+            return convert(m, name)
+    _RULE_HITS['fallback'] += 1
+    return FALLBACK
+
+
+def parse_text(text: str) -> Size:
+    """Tamaño de un título o presentación (``FALLBACK`` = 1 unidad si no hay regla)."""
+    return _parse_normalized(normalize_text(text))
+
+
+def parse_texts(texts: Iterable[str]) -> List[Size]:
+    """:func:`parse_text` en lote; cada texto distinto se parsea una vez."""
+    keys = [normalize_text(t) for t in texts]
+    parsed = {k: _parse_normalized(k) for k in dict.fromkeys(keys)}
+    return [parsed[k] for k in keys]
+
+
+def to_kg_l(size: Size) -> Tuple[float, str]:
+    """Proyección kg/l/unit (g y ml se dividen por 1000)."""
+    if size.unit in ('g', 'ml'):
+        return size.count * (size.amount / 1000.0), 'kg' if size.unit == 'g' else 'l'
+    return size.count * size.amount, size.unit
+
+
+def to_g_ml(size: Size) -> Tuple[float, str]:
+    """Proyección g/ml/unidad (kg y l se multiplican por 1000)."""
+    if size.unit in ('kg', 'l'):
+        return size.count * (size.amount * 1000), 'g' if size.unit == 'kg' else 'ml'
+    return size.count * size.amount, 'unidad' if size.unit == 'unit' else size.unit
+
+
+def unit_price(price: Optional[float], qty: Optional[float]) -> Optional[float]:
+    """Precio por unidad base; ``None`` sin precio o sin cantidad."""
+    try:
+        return float(price) / float(qty) if price and qty else None
+    except (TypeError, ValueError):
+        return None
+
+
+def stats() -> Dict[str, Any]:
+    """Aciertos/fallos del cache y regla que resolvió cada texto parseado."""
+    info = _parse_normalized.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize,
+            'rules': dict(_RULE_HITS)}
+
+
+def clear_cache() -> None:
+    _parse_normalized.cache_clear()
+    for k in _RULE_HITS:
+        _RULE_HITS[k] = 0
@@ -0,0 +1,216 @@
+"""Matching CBA ↔ productos compartido por ambos ``src/parser.py``.
+
+Las filas de la CBA y los productos se compilan una vez (keywords en
+minúsculas, tamaño mínimo en unidad base, categoría) y :class:`CatalogMatcher`
+indexa los nombres por n-gramas. Lo único que cambia entre proyectos son las
+reglas de tamaño (:class:`MatchRules`): la conversión a unidad base de cada
+uno (kg/l o g/ml) y si un pack por debajo de la tolerancia se acepta cuando
+el nombre trae una keyword preferida.
+"""
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class MatchRules(NamedTuple):
+    to_base_units: Callable[[float, str], Tuple[float, str]]
+    parse_size: Callable[[str], Tuple[float, str]]
+    # pack más chico que la tolerancia: con keyword preferida se acepta como pack_size_diff
+    small_pack_if_preferred: bool = False
+
+
+def final_unit_price(product: Dict[str, Any]) -> Optional[float]:
+    """Devuelve el precio por unidad considerando promociones."""
+    if product.get("unit_price") is not None:
+        return product.get("unit_price")
+
+    price = product.get("promo_price")
+    if price is None:
+        price = product.get("price")
+
+    pack_size = product.get("pack_size")
+    try:
+        return price / float(pack_size) if price is not None and pack_size else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _keywords(raw: Any) -> List[str]:
+    return [k.strip().lower() for k in (raw or "").split(";") if k.strip()]
+
+
+def compile_cba_row(cba_row: Dict[str, Any], rules: MatchRules) -> Dict[str, Any]:
+    """Precalcula lo que el matching usa de una fila de la CBA (una vez por fila)."""
+    min_pack = cba_row.get("min_pack_size")
+    min_unit = cba_row.get("monthly_qty_unit", "unidad")
+    min_base, base_unit = None, None
+    if min_pack is not None:
+        try:
+            min_base, base_unit = rules.to_base_units(float(min_pack), min_unit)
+        except (TypeError, ValueError):
+            min_base, base_unit = None, None
+    return {
+        "row": cba_row,
+        "category": (cba_row.get("category") or "").lower(),
+        "preferred": _keywords(cba_row.get("preferred_keywords")),
+        "fallback": _keywords(cba_row.get("fallback_keywords")),
+        "has_min": min_pack is not None,
+        "min_unit": min_unit,
+        "min_base": min_base,
+        "base_unit": base_unit,
+    }
+
+
+def compile_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Nombre y categoría en minúsculas; el tamaño se resuelve una vez por unidad."""
+    return {
+        "product": product,
+        "name": product.get("name", "").lower(),
+        "category": (product.get("category") or "").lower(),
+        "sizes": {},
+    }
+
+
+def _pack_base(cp: Dict[str, Any], min_unit: str, rules: MatchRules) -> Tuple[Optional[float], Optional[str]]:
+    product = cp["product"]
+    pack_size = product.get("pack_size")
+    # sin pack_unit el tamaño declarado se interpreta en la unidad de la fila
+    key = (product.get("pack_unit") or min_unit) if pack_size is not None else None
+    if key in cp["sizes"]:
+        return cp["sizes"][key]
+    size: Tuple[Optional[float], Optional[str]] = (None, None)
+    try:
+        if pack_size is not None:
+            size = rules.to_base_units(float(pack_size), key)
+        else:
+            size_match = re.search(r"([\d/.,]+\s*[a-zA-Z]+)", cp["name"])
+            if size_match:
+                size = rules.parse_size(size_match.group(1))
+    except (TypeError, ValueError):
+        size = (None, None)
+    cp["sizes"][key] = size
+    return size
+
+
+def match_compiled(
+    cp: Dict[str, Any], cr: Dict[str, Any], tolerance: float, rules: MatchRules
+) -> Optional[Tuple[str, Optional[str]]]:
+    """``(source, reason)`` para un producto y una fila ya compilados, o ``None``."""
+    name = cp["name"]
+    if cr["category"] and cp["category"] and cr["category"] != cp["category"]:
+        return None
+    preferred, fallback = cr["preferred"], cr["fallback"]
+    reason: Optional[str] = None
+    if cr["has_min"]:
+        min_base, base_unit = cr["min_base"], cr["base_unit"]
+        pack_base, pack_unit_conv = _pack_base(cp, cr["min_unit"], rules)
+        if (
+            pack_base is not None
+            and min_base is not None
+            and pack_unit_conv is not None
+            and base_unit is not None
+        ):
+            # Permitir equivalencia ml/l y g/kg
+            units_equiv = (
+                pack_unit_conv.lower() == base_unit.lower()
+                or (pack_unit_conv.lower() == "ml" and base_unit.lower() == "l")
+                or (pack_unit_conv.lower() == "g" and base_unit.lower() == "kg")
+            )
+            # Si pack_base está en ml y base en l, convertir pack_base a l
+            if pack_unit_conv.lower() == "ml" and base_unit.lower() == "l":
+                pack_base = pack_base / 1000.0
+            if pack_unit_conv.lower() == "g" and base_unit.lower() == "kg":
+                pack_base = pack_base / 1000.0
+            if units_equiv:
+                if pack_base < min_base * (1 - tolerance):
+                    if rules.small_pack_if_preferred:
+                        for kw in preferred:
+                            if kw in name:
+                                return "preferred", "pack_size_diff"
+                    return None
+                if pack_base < min_base:
+                    reason = "pack_size_diff"
+
+    for kw in preferred:
+        if kw in name:
+            return "preferred", reason
+    for kw in fallback:
+        if kw in name:
+            return "fallback", reason
+    return None
+
+
+# largo de los n-gramas del índice; keywords más cortas recorren todos los productos
+GRAM = 3
+
+
+def _grams(text: str) -> set:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class CatalogMatcher:
+    """Matching CBA ↔ productos con índice invertido de n-gramas.
+
+    Las filas se compilan una vez al construir; ``index`` compila los
+    productos y arma ``n-grama → productos``. Como toda coincidencia exige
+    que alguna keyword (preferida o fallback) esté contenida en el nombre, los
+    candidatos de una fila salen de intersecar las listas de los n-gramas de
+    cada keyword y verificar la subcadena: :meth:`match` solo se evalúa sobre
+    esos pares, no sobre catálogo × productos.
+    """
+
+    def __init__(self, cba_catalog: List[Dict[str, Any]], rules: MatchRules, tolerance: float = 0.1) -> None:
+        self.rules = rules
+        self.rows = [compile_cba_row(r, rules) for r in cba_catalog]
+        self.tolerance = tolerance
+        self.products: List[Dict[str, Any]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self.stats = {"rows": len(self.rows), "products": 0, "pairs": 0}
+
+    def index(self, products: List[Dict[str, Any]]) -> "CatalogMatcher":
+        self.products = [compile_product(p) for p in products]
+        self._postings = {}
+        for i, cp in enumerate(self.products):
+            for g in _grams(cp["name"]):
+                self._postings.setdefault(g, []).append(i)
+        self.stats.update(products=len(self.products), pairs=0)
+        return self
+
+    def _containing(self, kw: str) -> set:
+        grams = _grams(kw)
+        if not grams:
+            ids = range(len(self.products))
+        else:
+            lists = sorted((self._postings.get(g, []) for g in grams), key=len)
+            ids = set(lists[0]).intersection(*lists[1:])
+        return {i for i in ids if kw in self.products[i]["name"]}
+
+    def candidates(self, cr: Dict[str, Any]) -> List[int]:
+        """Índices (en orden de entrada) de productos que contienen alguna keyword de la fila."""
+        found: set = set()
+        for kw in dict.fromkeys(cr["preferred"] + cr["fallback"]):
+            found |= self._containing(kw)
+        return sorted(
+            i for i in found
+            if not (cr["category"] and self.products[i]["category"] and cr["category"] != self.products[i]["category"])
+        )
+
+    def match(self, cp: Dict[str, Any], cr: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+        """Un par candidato; los parsers lo redirigen a su ``match_sku_to_cba``."""
+        return match_compiled(cp, cr, self.tolerance, self.rules)
+
+    def matches(self, cr: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Copias de los productos que matchean la fila, con ``unit_price``, ``source`` y ``reason``."""
+        out: List[Dict[str, Any]] = []
+        for i in self.candidates(cr):
+            cp = self.products[i]
+            self.stats["pairs"] += 1
+            result = self.match(cp, cr)
+            if result:
+                source, reason = result
+                prod_copy = cp["product"].copy()
+                prod_copy["unit_price"] = final_unit_price(prod_copy)
+                prod_copy["source"] = source
+                if reason:
+                    prod_copy["reason"] = reason
+                out.append(prod_copy)
+        return out
@@ -5,7 +5,7 @@ import os
 import sys
 import json
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 try:
     from zoneinfo import ZoneInfo
 except Exception:
@@ -13,12 +13,24 @@ except Exception:
 
 from pathlib import Path
 
-from .site.search import run_searches
+from .site.aio import run_engine
 from .normalize.pricing import compute_item_costs
 from .metrics.cba import compute_cba_values
-from .metrics.index import update_series
+from .metrics.index import update_series, write_series
+from . import warehouse
 from .reporting.render import render_report
 from .site.utils import json_log
+from .site.routing import reset_routing, routing_summary
+from .site.evidence import configure_evidence, flush_evidence
+from .site.evidence_store import EvidenceStore
+from .site.fingerprints import FingerprintStore
+from .site.pins import PinManager
+from .site.scoring import set_scoring_policy
+from .site.selector_plan import load_selector_plan
+from .site.session import acquire_lease, count_loads, live_session, read_session, release_lease, release_page
+from .site.waits import reset_waits, waits_summary
+from .normalize.units import title_size_stats
+from .infra.retry import append_journal, load_journal, save_checkpoint
 from .ingest.csv_input import read_sku_pins, read_by_category
 from .site.branch import ensure_branch
 
@@ -152,32 +164,22 @@ def write_breakdown(path: str, period: str, rows: List[Dict[str, Any]]) -> None:
             writer.writerow(out)
 
 
+DAILY_FIELDS = [
+    'date','period','item_id','name','query','title','url','price_original','price_promo','price_final','qty_base','unit','unit_price_base','in_stock','promo_flag'
+]
+
+
+def _daily_row(run_date: str, period: str, r: Dict[str, Any]) -> Dict[str, Any]:
+    return dict({k: r.get(k) for k in DAILY_FIELDS}, date=run_date, period=period)
+
+
 def write_daily_prices(path: str, run_date: str, period: str, rows: List[Dict[str, Any]]) -> None:
-    fields = [
-        'date','period','item_id','name','query','title','url','price_original','price_promo','price_final','qty_base','unit','unit_price_base','in_stock','promo_flag'
-    ]
     os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
     with open(path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
+        writer = csv.DictWriter(f, fieldnames=DAILY_FIELDS)
         writer.writeheader()
         for r in rows:
-            writer.writerow({
-                'date': run_date,
-                'period': period,
-                'item_id': r.get('item_id'),
-                'name': r.get('name'),
-                'query': r.get('query'),
-                'title': r.get('title'),
-                'url': r.get('url'),
-                'price_original': r.get('price_original'),
-                'price_promo': r.get('price_promo'),
-                'price_final': r.get('price_final'),
-                'qty_base': r.get('qty_base'),
-                'unit': r.get('unit'),
-                'unit_price_base': r.get('unit_price_base'),
-                'in_stock': r.get('in_stock'),
-                'promo_flag': r.get('promo_flag'),
-            })
+            writer.writerow(_daily_row(run_date, period, r))
 
 
 def read_pins(path: str) -> Dict[str, Dict[str, Any]]:
@@ -189,7 +191,7 @@ def read_pins(path: str) -> Dict[str, Dict[str, Any]]:
     return pins
 
 
-def write_pins(path: str, results: List[Dict[str, Any]]) -> None:
+def write_pins(path: str, results: List[Dict[str, Any]], unpin: Iterable[str] = ()) -> None:
     # Preservar columnas existentes y actualizar url/title y metadatos si estÃ¡n
     existing_rows: Dict[str, Dict[str, Any]] = {}
     existing_fields: List[str] = []
@@ -214,6 +216,10 @@ def write_pins(path: str, results: List[Dict[str, Any]]) -> None:
             if r.get(k) not in (None, ''):
                 row[k] = r.get(k)
         existing_rows[iid] = row
+    # pins dados de baja: se conserva la fila (metadatos) sin URL
+    for iid in unpin:
+        if iid in existing_rows:
+            existing_rows[iid]['url'] = ''
     base = ['item_id','url','title']
     keys_union = set(existing_fields)
     for v in existing_rows.values():
@@ -228,6 +234,176 @@ def write_pins(path: str, results: List[Dict[str, Any]]) -> None:
             w.writerow({k: v.get(k, '') for k in fieldnames})
 
 
+def _pinned_row(res: Dict[str, Any], iid: str, pin: Dict[str, Any], base: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    from .normalize.units import parse_title_size
+    qb, un = parse_title_size(res.get('title') or '')
+    res.update({
+        'item_id': iid,
+        'name': (base['name'] if base else (pin.get('title') or iid)),
+        'query': 'PINNED',
+        'qty_base': qb,
+        'unit': un,
+        'expected_qty': (base['expected_qty'] if base else 0.0),
+        'monthly_qty_base': (base['monthly_qty_base'] if base else 0.0),
+        'substitution': '',
+        'brand_tier': pin.get('brand_tier', ''),
+        'cba_flag': pin.get('cba_flag', ''),
+        'category': pin.get('category', ''),
+    })
+    return res
+
+
+def _load_pins_map(period: str) -> Dict[str, Dict[str, Any]]:
+    """Pins por item_id: ``data/sku_pins.csv`` completado con by_category del período."""
+    pins_map: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists('data/sku_pins.csv'):
+        for prow in read_sku_pins('data/sku_pins.csv'):
+            if prow.get('item_id'):
+                pins_map[prow['item_id']] = prow
+    # Incorporar entradas desde by_category/<cat>.csv del perÃ­odo actual
+    try:
+        bycat_rows = read_by_category(['by_category/*.csv', 'data/*.csv'], expected_period=period)
+    except Exception:
+        bycat_rows = []
+    bycat_rows = [r for r in bycat_rows if (r.get('period') == period)]
+    for r in bycat_rows:
+        iid = r.get('item_id') or ''
+        if not iid:
+            continue
+        # prioridad: si ya hay pin con URL, mantenerlo; si falta URL, completar
+        if (iid not in pins_map) or (not pins_map[iid].get('url')):
+            pins_map[iid] = {
+                'item_id': iid,
+                'url': r.get('url',''),
+                'title': r.get('title','') or iid,
+                'brand_tier': r.get('brand_tier',''),
+                'cba_flag': r.get('cba_flag',''),
+                'category': r.get('category',''),
+            }
+    return pins_map
+
+
+def _pin_jobs(catalog: List[Dict[str, Any]], pins_map: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Try pinned: catalogo primero, luego items extra presentes en sku_pins
+    cat_index = {r['item_id']: r for r in catalog}
+    pin_jobs: List[Dict[str, Any]] = []
+    for row in catalog:
+        pin = pins_map.get(row['item_id'])
+        if pin and pin.get('url'):
+            pin_jobs.append({'item_id': row['item_id'], 'url': pin['url'], 'save_basename': f"pinned_{row['item_id']}", 'extra': False})
+    for pid, pin in pins_map.items():
+        if pid not in cat_index and (pin or {}).get('url'):
+            pin_jobs.append({'item_id': pid, 'url': pin['url'], 'save_basename': f"pinned_extra_{pid}", 'extra': True})
+    return pin_jobs
+
+
+def _pin_manager(cfg: Dict[str, Any], run_date: str) -> PinManager:
+    return PinManager(
+        run_date,
+        promote_after=int(cfg.get('pin_promote_after', 3) or 3),
+        demote_dead_after=int(cfg.get('pin_demote_dead_after', 2) or 2),
+        demote_oos_after=int(cfg.get('pin_demote_oos_after', 5) or 5),
+        ban_days=int(cfg.get('pin_ban_days', 30) or 30),
+    )
+
+
+def _apply_pin_decisions(pin_manager: PinManager, pins_map: Dict[str, Dict[str, Any]], log_path: str,
+                         pinned_rows: List[Dict[str, Any]], search_rows: Dict[str, Dict[str, Any]]) -> None:
+    """Promueve/baja pins según el historial y reescribe ``data/sku_pins.csv``."""
+    decision = pin_manager.decide(pins_map)
+    promoted = [dict(search_rows[p['item_id']], url=p['url']) for p in decision['promote'] if p['item_id'] in search_rows]
+    for p in decision['promote']:
+        json_log(log_path, 'pin_promoted', p)
+    for d in decision['demote']:
+        json_log(log_path, 'pin_demoted', d)
+    if pinned_rows or promoted or decision['demote']:
+        write_pins('data/sku_pins.csv', pinned_rows + promoted, unpin=[d['item_id'] for d in decision['demote']])
+    pin_manager.save()
+    json_log(log_path, 'pins_summary', pin_manager.stats)
+
+
+def _open_warehouse(cfg: Dict[str, Any], exports_dir: str, log_path: str):
+    conn = warehouse.connect(cfg.get('warehouse_path', warehouse.DEFAULT_DB))
+    if warehouse.is_empty(conn):
+        # primera corrida con almacen: trae la historia de los CSV existentes
+        json_log(log_path, 'warehouse_import', warehouse.import_csv_history(conn, exports_dir))
+    return conn
+
+
+def _write_exports(conn, exports_dir: str, period: str, run_date: str) -> Tuple[str, str, str]:
+    """Serie, desglose y diario del dia como exportes generados desde el almacen."""
+    series_path = os.path.join(exports_dir, 'series_cba.csv')
+    write_series(series_path, warehouse.series(conn))
+    breakdown_path = os.path.join(exports_dir, f'breakdown_{period}.csv')
+    write_breakdown(breakdown_path, period, warehouse.breakdown(conn, period))
+    daily_path = os.path.join(exports_dir, f'daily_prices_{run_date}.csv')
+    write_daily_prices(daily_path, run_date, period, warehouse.daily_prices(conn, run_date))
+    return series_path, breakdown_path, daily_path
+
+
+def _fingerprint_store(cfg: Dict[str, Any]) -> Optional[FingerprintStore]:
+    if str(cfg.get('fingerprints', 'on')).lower() in ('off', 'false', '0', 'no'):
+        return None
+    return FingerprintStore(
+        base_hours=float(cfg.get('recheck_base_hours', 20) or 20),
+        max_days=float(cfg.get('recheck_max_days', 7) or 7),
+    )
+
+
+def _evidence_store(cfg: Dict[str, Any]) -> Optional[EvidenceStore]:
+    # evidence_store = "files" conserva PNG/HTML sueltos por corrida
+    if str(cfg.get('evidence_store', 'cas')).lower() != 'cas':
+        return None
+    return EvidenceStore(cfg.get('evidence_dir', 'evidence'), compress=cfg.get('evidence_compress', 'gzip'))
+
+
+def _screenshot_policy(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'mode': str(cfg.get('screenshot_mode', 'full')).lower(),
+        'sample_every': int(cfg.get('screenshot_sample_every', 10) or 10),
+        'format': str(cfg.get('screenshot_format', 'png')).lower(),
+        'quality': int(cfg.get('screenshot_quality', 70) or 70),
+    }
+
+
+def _attach_session(args: argparse.Namespace, log_path: str) -> Tuple[Optional[str], Optional[str]]:
+    # --attach: usar el navegador de session-serve si esta vivo
+    if not getattr(args, 'attach', False):
+        return None, None
+    sess = live_session()
+    if not sess:
+        print("[WARN] --attach: no hay session-serve activo; se lanza un navegador propio")
+        json_log(log_path, 'session_attach_missing', {})
+        return None, None
+    lease = acquire_lease()
+    if not lease:
+        print("[WARN] --attach: session-serve ocupado (re-verificando sucursal); se lanza un navegador propio")
+        json_log(log_path, 'session_attach_busy', {'status': (read_session() or {}).get('status')})
+        return None, None
+    json_log(log_path, 'session_attached', {'cdp_url': sess['cdp_url'], 'cycle': sess.get('cycle'), 'pages_served': sess.get('pages_served')})
+    return sess['cdp_url'], lease
+
+
+def _open_journal(run_id: str, resume: bool, log_path: str) -> Dict[str, Dict[str, Any]]:
+    """Journal por item en data/raw/<run_id>/items.jsonl.
+
+    Con ``--resume`` devuelve los items ya resueltos (item_id -> registro);
+    sin ``--resume`` descarta el journal anterior del mismo run_id. Un pin sin
+    ``price_final`` no cuenta como resuelto: el item se vuelve a buscar.
+    """
+    path = Path('data/raw') / run_id / 'items.jsonl'
+    if not resume:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return {}
+    done = {r['item_id']: r for r in load_journal(run_id)
+            if r.get('item_id') and r.get('result') and (r.get('stage') != 'pinned' or r['result'].get('price_final'))}
+    json_log(log_path, 'resume', {'run_id': run_id, 'items_done': len(done)})
+    return done
+
+
 def parse_period(p: Optional[str]) -> str:
     if p:
         return p
@@ -238,7 +414,12 @@ def parse_period(p: Optional[str]) -> str:
 def cmd_run(args: argparse.Namespace) -> int:
     period = parse_period(args.period)
     cfg = load_config_toml('config.toml')
-    selectors = load_selectors('config/selectors.json')
+    # plan compilado una vez por corrida; el orden sale del historial de aciertos
+    selectors = load_selector_plan('config/selectors.json')
+    set_scoring_policy(cfg.get('scoring_policy', 'default'))
+    engine = getattr(args, 'engine', None) or cfg.get('engine', 'sync')
+    concurrency = int(cfg.get('async_concurrency', 4) or 4)
+    block_profile = cfg.get('browser_block_profile', 'lean')
 
     evidence_dir = cfg.get('evidence_dir', 'evidence')
     html_dump_dir = cfg.get('html_dump_dir', os.path.join(evidence_dir, 'html'))
@@ -257,6 +438,7 @@ def cmd_run(args: argparse.Namespace) -> int:
     ensure_catalog('data/cba_catalog.csv')
 
     log_path = os.path.join(evidence_dir, f'run_{period}.jsonl')
+    run_id = f"run_{os.path.basename(evidence_dir)}"
     # Add checksums for traceability
     def _md5(path: str) -> str:
         import hashlib
@@ -264,14 +446,20 @@ def cmd_run(args: argparse.Namespace) -> int:
             return ''
         with open(path, 'rb') as f:
             return hashlib.md5(f.read()).hexdigest()
+    reset_waits()
+    reset_routing()
+    configure_evidence(_evidence_store(cfg), _screenshot_policy(cfg))
     json_log(log_path, 'start', {
         'period': period,
         'selectors_md5': _md5('config/selectors.json'),
         'catalog_md5': _md5('data/cba_catalog.csv'),
         'config_md5': _md5('config.toml')
     })
+    done = _open_journal(run_id, getattr(args, 'resume', False), log_path)
 
     # 1) Select branch via Playwright
+    cdp_url, lease = _attach_session(args, log_path)
+    session_pages = 0
     try:
         page = ensure_branch(
             base_url=cfg.get('base_url', 'https://supermercado.laanonimaonline.com/'),
@@ -284,9 +472,15 @@ def cmd_run(args: argparse.Namespace) -> int:
             headless=(not args.debug),
             strict_verify=(not getattr(args, 'skip_branch_verify', False)),
             force_refresh=getattr(args, 'force_branch_refresh', False),
-            browser_channel=(getattr(args, 'browser_channel', None) or cfg.get('browser_channel', '') or None)
+            browser_channel=(getattr(args, 'browser_channel', None) or cfg.get('browser_channel', '') or None),
+            block_profile=block_profile,
+            cdp_url=cdp_url,
         )
+        if cdp_url:
+            count_loads(page)
     except Exception as e:
+        release_lease(lease)
+        json_log(log_path, 'evidence_flush', flush_evidence())
         json_log(log_path, 'error', {'stage': 'branch', 'error': str(e)})
         err_msg = str(e).replace('\ufffd', '?')
         print(f"[FATAL] Seleccion de sucursal fallo: {err_msg}")
@@ -296,126 +490,100 @@ def cmd_run(args: argparse.Namespace) -> int:
     catalog = read_catalog('data/cba_catalog.csv')
     exclude_keywords = [s.strip() for s in cfg.get('exclude_keywords', '').split(',') if s.strip()]
 
+    run_date = (datetime.now(ZoneInfo("America/Argentina/Ushuaia")) if ZoneInfo else datetime.utcnow()).date().isoformat()
+    pin_manager = _pin_manager(cfg, run_date)
+
     # 3) Pinned SKUs first, luego bÃºsquedas
     try:
         results: List[Dict[str, Any]] = []
-        # Pinned map
-        pins_map: Dict[str, Dict[str, Any]] = {}
-        if os.path.exists('data/sku_pins.csv'):
-            for prow in read_sku_pins('data/sku_pins.csv'):
-                if prow.get('item_id'):
-                    pins_map[prow['item_id']] = prow
-        # Incorporar entradas desde by_category/<cat>.csv del perÃ­odo actual
-        try:
-            bycat_rows = read_by_category(['by_category/*.csv', 'data/*.csv'], expected_period=period)
-        except Exception:
-            bycat_rows = []
-        bycat_rows = [r for r in bycat_rows if (r.get('period') == period)]
-        for r in bycat_rows:
-            iid = r.get('item_id') or ''
-            if not iid:
-                continue
-            # prioridad: si ya hay pin con URL, mantenerlo; si falta URL, completar
-            if (iid not in pins_map) or (not pins_map[iid].get('url')):
-                pins_map[iid] = {
-                    'item_id': iid,
-                    'url': r.get('url',''),
-                    'title': r.get('title','') or iid,
-                    'brand_tier': r.get('brand_tier',''),
-                    'cba_flag': r.get('cba_flag',''),
-                    'category': r.get('category',''),
-                }
-        # Try pinned
-        from .site.product import extract_product_page
-        from .normalize.units import parse_title_size
-        for row in catalog:
-            pin = pins_map.get(row['item_id'])
-            if not pin or not pin.get('url'):
-                continue
-            try:
-                res = extract_product_page(
-                    page,
-                    url=pin['url'],
-                    selectors=selectors,
-                    evidence_dir=evidence_dir,
-                    html_dump_dir=html_dump_dir,
-                    save_basename=f"pinned_{row['item_id']}"
-                )
-                qb, un = parse_title_size(res.get('title') or '')
-                res.update({
-                    'item_id': row['item_id'],
-                    'name': row['name'],
-                    'query': 'PINNED',
-                    'qty_base': qb,
-                    'unit': un,
-                    'expected_qty': row['expected_qty'],
-                    'monthly_qty_base': row['monthly_qty_base'],
-                    'substitution': '',
-                    'brand_tier': pin.get('brand_tier', ''),
-                    'cba_flag': pin.get('cba_flag', ''),
-                    'category': pin.get('category', ''),
-                })
-                if res.get('price_final') and qb:
+        pins_map = pin_manager.apply(_load_pins_map(period))
+        cat_index = {r['item_id']: r for r in catalog}
+        pin_jobs = _pin_jobs(catalog, pins_map)
+
+        # --resume: items ya resueltos en el journal no se vuelven a visitar
+        for iid, rec in done.items():
+            if rec.get('stage') == 'pinned':
+                res = _pinned_row(rec['result'], iid, pins_map.get(iid) or {}, cat_index.get(iid))
+                if res.get('price_final') and res.get('qty_base'):
                     results.append(res)
-            except Exception as e:
-                json_log(log_path, 'pinned_error', {'item_id': row['item_id'], 'error': str(e)})
-
-        # Ãtems extras presentes en sku_pins pero no en el catÃ¡logo
-        extra_ids = [pid for pid in pins_map.keys() if pid not in {r['item_id'] for r in catalog}]
-        for pid in extra_ids:
-            pin = pins_map.get(pid) or {}
-            url = pin.get('url') or ''
-            if not url:
-                continue
-            try:
-                res = extract_product_page(
-                    page,
-                    url=url,
-                    selectors=selectors,
-                    evidence_dir=evidence_dir,
-                    html_dump_dir=html_dump_dir,
-                    save_basename=f"pinned_extra_{pid}"
-                )
-                qb, un = parse_title_size(res.get('title') or '')
-                res.update({
-                    'item_id': pid,
-                    'name': pin.get('title') or pid,
-                    'query': 'PINNED',
-                    'qty_base': qb,
-                    'unit': un,
-                    'expected_qty': 0.0,
-                    'monthly_qty_base': 0.0,
-                    'substitution': '',
-                    'brand_tier': pin.get('brand_tier', ''),
-                    'cba_flag': pin.get('cba_flag', ''),
-                    'category': pin.get('category', ''),
-                })
-                if res.get('price_final') and qb:
+            else:
+                results.append(rec['result'])
+        pin_jobs = [j for j in pin_jobs if j['item_id'] not in done]
+
+        def _journal_pinned(i: int, out: Dict[str, Any]) -> None:
+            if (out.get('result') or {}).get('price_final'):
+                append_journal(run_id, {'item_id': pin_jobs[i]['item_id'], 'stage': 'pinned', 'result': out['result']})
+
+        base_url = cfg.get('base_url', 'https://supermercado.laanonimaonline.com/')
+        fingerprints = _fingerprint_store(cfg)
+        search_mode = getattr(args, 'search_mode', None) or cfg.get('search_mode', 'dom')
+        save_checkpoint(run_id, 'pinned', {'period': period, 'jobs': len(pin_jobs), 'resumed': len(done)})
+
+        def _after_pinned(outcomes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            # entre etapas: lo que no resolvio el pin pasa a busqueda
+            for job, out in zip(pin_jobs, outcomes):
+                iid = job['item_id']
+                pin_manager.observe_pinned(iid, job['url'], out['result'], out['error'], out.get('status'))
+                if out['error']:
+                    json_log(log_path, 'pinned_extra_error' if job['extra'] else 'pinned_error', {'item_id': iid, 'error': out['error']})
+                    continue
+                res = _pinned_row(out['result'], iid, pins_map.get(iid) or {}, cat_index.get(iid))
+                if res.get('price_final') and res.get('qty_base'):
                     results.append(res)
-            except Exception as e:
-                json_log(log_path, 'pinned_extra_error', {'item_id': pid, 'error': str(e)})
-
-        remaining = [r for r in catalog if r['item_id'] not in {x['item_id'] for x in results}]
-        search_results = run_searches(
-            page=page,
-            period=period,
-            catalog=remaining,
-            selectors=selectors,
-            evidence_dir=evidence_dir,
-            html_dump_dir=html_dump_dir,
-            exclude_keywords=exclude_keywords,
-            log_path=log_path,
-            base_url=cfg.get('base_url', 'https://supermercado.laanonimaonline.com/')
+            if fingerprints is not None:
+                fingerprints.save()
+                json_log(log_path, 'fingerprints_summary', fingerprints.stats)
+            resolved = {x['item_id'] for x in results}
+            remaining = [r for r in catalog if r['item_id'] not in resolved and r['item_id'] not in done]
+            save_checkpoint(run_id, 'search', {'period': period, 'jobs': len(remaining), 'resumed': len(done)})
+            return remaining
+
+        def _journal_search(i: int, out: Dict[str, Any]) -> None:
+            if out.get('result'):
+                append_journal(run_id, {'item_id': out['result'].get('item_id'), 'stage': 'search', 'result': out['result']})
+
+        # Un solo motor para las dos etapas: async con navegador propio, o en
+        # secuencia sobre la pagina sync que dejo ensure_branch
+        eng = run_engine(
+            selectors=selectors, evidence_dir=evidence_dir, html_dump_dir=html_dump_dir, log_path=log_path,
+            pinned_jobs=pin_jobs, plan_searches=_after_pinned, exclude_keywords=exclude_keywords, base_url=base_url,
+            search_mode=search_mode, concurrency=concurrency, headless=(not args.debug), block_profile=block_profile,
+            cdp_url=cdp_url, fingerprints=fingerprints, on_pinned=_journal_pinned, on_search=_journal_search,
+            page=None if engine == 'async' else page,
         )
-        results.extend(search_results)
+        if engine == 'async':
+            session_pages += len(pin_jobs) + len(eng['catalog'])
+        json_log(log_path, 'engine_done', {
+            'engine': engine, 'pinned_jobs': len(pin_jobs), 'search_jobs': len(eng['catalog']),
+            'concurrency': concurrency if engine == 'async' else 1, 'pinned_seconds': eng['pinned_seconds'],
+            'search_seconds': eng['search_seconds'], 'seconds': eng['seconds'],
+        })
+        for row, out in zip(eng['catalog'], eng['searches']):
+            if out['error']:
+                json_log(log_path, 'search_error', {'item_id': row['item_id'], 'error': out['error']})
+            elif out['result']:
+                results.append(out['result'])
     finally:
+        json_log(log_path, 'waits_summary', waits_summary())
+        json_log(log_path, 'routing_summary', dict(routing_summary(), profile=block_profile))
+        json_log(log_path, 'selector_stats', {'selectors_md5': selectors.md5, 'keys': selectors.stats()})
+        json_log(log_path, 'title_size_stats', title_size_stats())
+        selectors.save()
         # Keep the context open for post-mortem if debug; else close via page.context.close()
         try:
-            if not args.debug:
+            if getattr(page, '_branch_attached', False):
+                # sesion compartida: solo la pagina propia
+                session_pages += release_page(page)
+            elif not args.debug:
                 page.context.close()
                 page.context.browser.close()
         except Exception:
             pass
+        release_lease(lease, session_pages)
+        # la evidencia encolada tiene que estar en disco antes de informar
+        json_log(log_path, 'evidence_flush', flush_evidence())
+
+    save_checkpoint(run_id, 'done', {'period': period, 'items': len(results)})
 
     # 4) Normalize pricing and compute costs
     priced_rows = compute_item_costs(results)
@@ -424,29 +592,31 @@ def cmd_run(args: argparse.Namespace) -> int:
     family_ae = float(cfg.get('family_ae', 3.09))
     cba_ae, cba_family = compute_cba_values(priced_rows, family_ae)
 
-    # 6) Update index series
-    series_path = os.path.join(exports_dir, 'series_cba.csv')
-    series_row = update_series(series_path, period, cba_ae, cba_family)
-
-    # 7) Write breakdown
-    breakdown_path = os.path.join(exports_dir, f'breakdown_{period}.csv')
+    # 6) Persistir la corrida en el almacen (un lote) y actualizar el indice
     for r in priced_rows:
         r['period'] = period
-    write_breakdown(breakdown_path, period, priced_rows)
-
-    # 7b) Daily prices CSV (fecha del dÃƒÂ­a)
-    run_date = (datetime.now(ZoneInfo("America/Argentina/Ushuaia")) if ZoneInfo else datetime.utcnow()).date().isoformat()
-    daily_path = os.path.join(exports_dir, f'daily_prices_{run_date}.csv')
-    write_daily_prices(daily_path, run_date, period, priced_rows)
-    # 7c) Persist pins
+    wh = _open_warehouse(cfg, exports_dir, log_path)
+    wh_run = warehouse.record_run(wh, period=period, run_date=run_date, rows=priced_rows,
+                                  branch=args.branch or cfg.get('branch_name', 'USHUAIA 5'))
+    series_row = warehouse.record_index(wh, wh_run, period, cba_ae, cba_family)
+
+    # 7) Serie, desglose y precios diarios (fecha del dÃƒÂ­a) como exportes
+    series_path, breakdown_path, daily_path = _write_exports(wh, exports_dir, period, run_date)
+    # 7c) Persist pins: los pinned refrescan metadatos; los ganadores de busqueda
+    # pasan a pin recien tras pin_promote_after corridas consistentes
     try:
-        write_pins('data/sku_pins.csv', priced_rows)
+        search_rows = {r['item_id']: r for r in priced_rows if r.get('query') != 'PINNED'}
+        for iid, r in search_rows.items():
+            pin_manager.observe_search(iid, r)
+        pinned_rows = [r for r in priced_rows if r.get('query') == 'PINNED']
+        _apply_pin_decisions(pin_manager, pins_map, log_path, pinned_rows, search_rows)
     except Exception as e:
         json_log(log_path, 'pins_write_error', {'error': str(e)})
 
     # 8) Render report
     report_path = os.path.join(reports_dir, f'{period}.html')
-    render_report(report_path, period, series_path, breakdown_path)
+    render_report(report_path, period, series_path, breakdown_path, db=wh)
+    wh.close()
 
     # 9) Validations
     valid_prices = [r for r in priced_rows if isinstance(r.get('price_final'), (int, float)) and r['price_final'] > 0]
@@ -527,10 +697,12 @@ def cmd_verify(args: argparse.Namespace) -> int:
                         continue
         except Exception:
             pass
-        # find header screenshot
-        for name in os.listdir(latest_evd):
-            if name.startswith('header_after_branch') and name.endswith('.png'):
-                header_png = os.path.join(latest_evd, name)
+        # find header screenshot (archivo suelto o entrada del manifest)
+        store = EvidenceStore(evidence_root)
+        for name in store.names(latest_evd):
+            if name.startswith('header_after_branch') and name.endswith(('.png', '.jpg', '.webp')):
+                # en modo CAS la captura vive en evidence/_blobs, no en la carpeta de la corrida
+                header_png = str(store.path_of(latest_evd, name) or '')
                 break
 
     # 5) Print summary
@@ -558,7 +730,7 @@ def cmd_verify(args: argparse.Namespace) -> int:
 def cmd_pins_run(args: argparse.Namespace) -> int:
     period = parse_period(args.period)
     cfg = load_config_toml('config.toml')
-    selectors = load_selectors('config/selectors.json')
+    selectors = load_selector_plan('config/selectors.json')
 
     evidence_dir = cfg.get('evidence_dir', 'evidence')
     html_dump_dir = cfg.get('html_dump_dir', os.path.join(evidence_dir, 'html'))
@@ -629,81 +801,149 @@ def cmd_pins_run(args: argparse.Namespace) -> int:
         print(f"[WARN] Se omitiran items sin URL en by_category/*.csv: {', '.join(missing)}")
 
     log_path = os.path.join(evidence_dir, f'run_{period}.jsonl')
+    reset_waits()
+    reset_routing()
+    configure_evidence(_evidence_store(cfg), _screenshot_policy(cfg))
     json_log(log_path, 'start_pins', {'period': period, 'mode': 'pins_only'})
+    run_date = (datetime.now(ZoneInfo("America/Argentina/Ushuaia")) if ZoneInfo else datetime.utcnow()).date().isoformat()
+    run_id = f"pins_{period}_{run_date}"
+    done = _open_journal(run_id, getattr(args, 'resume', False), log_path)
+    pin_manager = _pin_manager(cfg, run_date)
+    pins_map = pin_manager.apply(pins_map)
 
-    # Start Playwright minimal
-    from playwright.sync_api import sync_playwright
-    p = sync_playwright().start()
-    browser = p.chromium.launch(headless=(not args.debug))
-    context = browser.new_context()
-    page = context.new_page()
-
-    from .site.product import extract_product_page
-    from .normalize.units import parse_title_size
     results: List[Dict[str, Any]] = []
     processed = 0
     skipped = 0
-    catalog_ids = {r['item_id'] for r in catalog}
-    all_ids = list(catalog_ids | set(pins_map.keys()))
     cat_index = {r['item_id']: r for r in catalog}
+    # Orden determinista: catalogo primero, luego pins extra en orden de lectura
+    all_ids = [r['item_id'] for r in catalog] + [iid for iid in pins_map.keys() if iid not in cat_index]
+    jobs: List[Dict[str, Any]] = []
     for iid in all_ids:
         pin = pins_map.get(iid)
         url = pin.get('url') if pin else ''
         if not url:
             skipped += 1
             continue
-        try:
-            res = extract_product_page(
-                page,
-                url=url,
-                selectors=selectors,
-                evidence_dir=evidence_dir,
-                html_dump_dir=html_dump_dir,
-                save_basename=f"pinned_{iid}"
-            )
-            qb, un = parse_title_size(res.get('title') or '')
-            base = cat_index.get(iid)
-            res.update({
-                'item_id': iid,
-                'name': (base['name'] if base else (pin.get('title') if pin else iid)),
-                'query': 'PINNED',
-                'qty_base': qb,
-                'unit': un,
-                'expected_qty': (base['expected_qty'] if base else 0.0),
-                'monthly_qty_base': (base['monthly_qty_base'] if base else 0.0),
-                'substitution': '',
-                'brand_tier': (pin.get('brand_tier') if pin else ''),
-                'cba_flag': (pin.get('cba_flag') if pin else ''),
-                'category': (pin.get('category') if pin else ''),
-            })
-            results.append(res)
-            processed += 1
-        except Exception as e:
-            json_log(log_path, 'pinned_error', {'item_id': iid, 'error': str(e)})
-
-    # Close
+        jobs.append({'item_id': iid, 'url': url, 'save_basename': f"pinned_{iid}"})
+
+    workers = args.workers or int(cfg.get('pins_workers', 4) or 4)
+    engine = args.engine or cfg.get('engine', 'sync')
+    block_profile = cfg.get('browser_block_profile', 'lean')
+    fetch = args.fetch or cfg.get('fetch_mode', 'browser')
+    fingerprints = _fingerprint_store(cfg)
+    outcomes: List[Dict[str, Any]] = [{'result': None, 'error': 'not processed', 'worker': None} for _ in jobs]
+    todo_idx = list(range(len(jobs)))
+    if done:
+        todo_idx = []
+        for i, job in enumerate(jobs):
+            rec = done.get(job['item_id'])
+            if rec:
+                outcomes[i] = {'result': rec['result'], 'error': None, 'worker': 'journal'}
+            else:
+                todo_idx.append(i)
+    if fingerprints is not None and getattr(args, 'due_only', False):
+        # Items estables con re-chequeo no vencido: se reutiliza el ultimo resultado
+        due_idx = []
+        for i in todo_idx:
+            job = jobs[i]
+            cached = fingerprints.last_result(job['url'])
+            if cached and not fingerprints.is_due(job['url']):
+                outcomes[i] = {'result': cached, 'error': None, 'worker': 'cached'}
+            else:
+                due_idx.append(i)
+        json_log(log_path, 'pins_due', {'jobs': len(todo_idx), 'due': len(due_idx), 'not_due': len(todo_idx) - len(due_idx)})
+        todo_idx = due_idx
+
+    def _journal(idx: List[int]):
+        # on_result(i, outcome) de cada motor: i es relativo a la sublista idx
+        def _cb(i: int, out: Dict[str, Any]) -> None:
+            if (out.get('result') or {}).get('price_final'):
+                append_journal(run_id, {'item_id': jobs[idx[i]]['item_id'], 'stage': 'pinned', 'result': out['result']})
+        return _cb
+
+    save_checkpoint(run_id, 'pinned', {'period': period, 'jobs': len(todo_idx), 'resumed': len(done)})
+    browser_idx = todo_idx
+    if fetch == 'http' and todo_idx:
+        from .site.http_fetch import fetch_pinned_http
+        http = fetch_pinned_http([jobs[i] for i in todo_idx], selectors=selectors, html_dump_dir=html_dump_dir,
+                                 workers=int(cfg.get('http_workers', 8) or 8), fingerprints=fingerprints,
+                                 on_result=_journal(todo_idx))
+        json_log(log_path, 'pins_http_done', {'jobs': len(todo_idx), 'hits': len(todo_idx) - len(http['misses']) - len(http['gone']),
+                                              'misses': len(http['misses']), 'gone': len(http['gone']), 'seconds': http['seconds']})
+        for i, o in zip(todo_idx, http['outcomes']):
+            outcomes[i] = o
+        browser_idx = [todo_idx[k] for k in http['misses']]
+    # Navegador solo para lo que no resolvio HTTP (o todo, en modo browser)
+    browser_jobs = [jobs[i] for i in browser_idx]
+    cdp_url, lease = _attach_session(args, log_path) if browser_jobs else (None, None)
+    if browser_jobs and engine == 'async':
+        concurrency = args.workers or int(cfg.get('async_concurrency', 4) or 4)
+        eng = run_engine(
+            selectors=selectors, evidence_dir=evidence_dir, html_dump_dir=html_dump_dir, log_path=log_path,
+            pinned_jobs=browser_jobs, concurrency=concurrency, headless=(not args.debug), block_profile=block_profile, cdp_url=cdp_url,
+            fingerprints=fingerprints, on_pinned=_journal(browser_idx),
+        )
+        json_log(log_path, 'async_engine_done', {'stage': 'pinned', 'jobs': len(browser_jobs), 'concurrency': concurrency, 'seconds': eng['seconds']})
+        for i, o in zip(browser_idx, eng['pinned']):
+            outcomes[i] = dict(o, worker=None)
+    elif browser_jobs:
+        from .site.pool import extract_pinned_pool
+        pool = extract_pinned_pool(
+            browser_jobs,
+            selectors=selectors,
+            evidence_dir=evidence_dir,
+            html_dump_dir=html_dump_dir,
+            workers=workers,
+            headless=(not args.debug),
+            block_profile=block_profile,
+            cdp_url=cdp_url,
+            fingerprints=fingerprints,
+            on_result=_journal(browser_idx),
+        )
+        for st in pool['workers']:
+            json_log(log_path, 'pins_worker_done', st)
+        json_log(log_path, 'pins_pool_done', {'workers': len(pool['workers']), 'jobs': len(browser_jobs), 'seconds': pool['seconds']})
+        for i, o in zip(browser_idx, pool['outcomes']):
+            outcomes[i] = o
+    release_lease(lease, len(browser_jobs))
+    json_log(log_path, 'evidence_flush', flush_evidence())
+    save_checkpoint(run_id, 'done', {'period': period, 'jobs': len(jobs), 'resumed': len(done)})
+    if fingerprints is not None:
+        fingerprints.save()
+        json_log(log_path, 'fingerprints_summary', fingerprints.stats)
+    json_log(log_path, 'waits_summary', waits_summary())
+    json_log(log_path, 'routing_summary', dict(routing_summary(), profile=block_profile))
+    json_log(log_path, 'selector_stats', {'selectors_md5': selectors.md5, 'keys': selectors.stats()})
+    selectors.save()
+
+    for job, out in zip(jobs, outcomes):
+        iid = job['item_id']
+        if out['worker'] not in ('journal', 'cached') and out['error'] != 'not processed':
+            pin_manager.observe_pinned(iid, job['url'], out['result'], out['error'], out.get('status'))
+        if out['error']:
+            json_log(log_path, 'pinned_error', {'item_id': iid, 'error': out['error'], 'worker': out['worker']})
+            continue
+        results.append(_pinned_row(out['result'], iid, pins_map.get(iid) or {}, cat_index.get(iid)))
+        processed += 1
+    # pins-run no busca: solo puede dar de baja pins caidos o sin stock persistente
     try:
-        if not args.debug:
-            context.close()
-            browser.close()
-    except Exception:
-        pass
+        _apply_pin_decisions(pin_manager, pins_map, log_path, [], {})
+    except Exception as e:
+        json_log(log_path, 'pins_write_error', {'error': str(e)})
 
     # Pricing and exports
     priced_rows = compute_item_costs(results)
     family_ae = float(cfg.get('family_ae', 3.09))
     cba_ae, cba_family = compute_cba_values(priced_rows, family_ae)
-    series_path = os.path.join(exports_dir, 'series_cba.csv')
-    series_row = update_series(series_path, period, cba_ae, cba_family)
-    breakdown_path = os.path.join(exports_dir, f'breakdown_{period}.csv')
     for r in priced_rows:
         r['period'] = period
-    write_breakdown(breakdown_path, period, priced_rows)
-    run_date = (datetime.now(ZoneInfo("America/Argentina/Ushuaia")) if ZoneInfo else datetime.utcnow()).date().isoformat()
-    daily_path = os.path.join(exports_dir, f'daily_prices_{run_date}.csv')
-    write_daily_prices(daily_path, run_date, period, priced_rows)
+    wh = _open_warehouse(cfg, exports_dir, log_path)
+    wh_run = warehouse.record_run(wh, period=period, run_date=run_date, rows=priced_rows, branch=cfg.get('branch_name', 'USHUAIA 5'))
+    series_row = warehouse.record_index(wh, wh_run, period, cba_ae, cba_family)
+    series_path, breakdown_path, daily_path = _write_exports(wh, exports_dir, period, run_date)
     report_path = os.path.join(reports_dir, f'{period}.html')
-    render_report(report_path, period, series_path, breakdown_path)
+    render_report(report_path, period, series_path, breakdown_path, db=wh)
+    wh.close()
 
     # Summary
     valid_prices = [r for r in priced_rows if isinstance(r.get('price_final'), (int, float)) and r['price_final'] > 0]
@@ -719,6 +959,201 @@ def cmd_pins_run(args: argparse.Namespace) -> int:
     print(f"Reporte: {report_path}")
     print(f"% Ã­tems con precio vÃ¡lido: {ratio*100:.1f}%")
     return 0 if len(valid_prices) > 0 else 1
+
+
+def cmd_evidence_compact(args: argparse.Namespace) -> int:
+    cfg = load_config_toml('config.toml')
+    store = EvidenceStore(cfg.get('evidence_dir', 'evidence'), compress=cfg.get('evidence_compress', 'gzip'))
+    keep_days = args.keep_days if args.keep_days is not None else int(cfg.get('evidence_keep_days', 45) or 45)
+    stats = store.compact(keep_days=keep_days, dry_run=args.dry_run)
+    print("=== Compactacion de evidencia ===")
+    print(f"Corridas: {stats['runs']} | Podadas: {stats['runs_pruned']} | Muestras mensuales: {stats['monthly_samples']}")
+    print(f"Archivos migrados al store: {stats['files_migrated']} | Blobs sin referencia borrados: {stats['blobs_deleted']}")
+    print(f"Liberado: {stats['bytes_freed'] / 1e6:.1f} MB{' (dry-run)' if args.dry_run else ''}")
+    return 0
+
+
+def cmd_replay(args: argparse.Namespace) -> int:
+    from .site.replay import diff_breakdown, replay_pinned, replay_searches
+    cfg = load_config_toml('config.toml')
+    run_dir = Path(args.run_dir)
+    if not run_dir.is_dir():
+        print(f"[FATAL] No existe la carpeta de corrida: {run_dir}")
+        return 1
+    m = re.match(r'^(\d{4}-\d{2})_(\d{4}-\d{2}-\d{2})$', run_dir.name)
+    period = parse_period(args.period or (m.group(1) if m else None))
+    run_date = m.group(2) if m else datetime.now().date().isoformat()
+    selectors = load_selectors('config/selectors.json')
+    set_scoring_policy(cfg.get('scoring_policy', 'default'))
+    store = EvidenceStore(run_dir.parent, compress=cfg.get('evidence_compress', 'gzip'))
+    exports_dir = cfg.get('exports_dir', 'exports')
+    out_dir = args.out or os.path.join(exports_dir, 'replay', run_dir.name)
+    ensure_dirs([out_dir])
+    log_path = os.path.join(out_dir, f'replay_{period}.jsonl')
+    json_log(log_path, 'start', {'period': period, 'run_dir': str(run_dir), 'evidence': len(store.names(run_dir))})
+
+    catalog = read_catalog('data/cba_catalog.csv')
+    exclude_keywords = [s.strip() for s in cfg.get('exclude_keywords', '').split(',') if s.strip()]
+    cat_index = {r['item_id']: r for r in catalog}
+    pins_map = _load_pins_map(period)
+    pin_jobs = _pin_jobs(catalog, pins_map)
+    # items cuyo HTML no se volco (huella sin cambios) salen del journal de la corrida
+    journal = {r.get('item_id'): r for r in load_journal(f"run_{run_dir.name}")}
+
+    results: List[Dict[str, Any]] = []
+    sources: Dict[str, int] = {}
+    for job, out in zip(pin_jobs, replay_pinned(run_dir, store, pin_jobs, selectors, journal)):
+        iid = job['item_id']
+        if out['error']:
+            json_log(log_path, 'pinned_missing', {'item_id': iid, 'error': out['error']})
+            continue
+        sources[f"pinned_{out['source']}"] = sources.get(f"pinned_{out['source']}", 0) + 1
+        res = _pinned_row(out['result'], iid, pins_map.get(iid) or {}, cat_index.get(iid))
+        if res.get('price_final') and res.get('qty_base'):
+            results.append(res)
+    remaining = [r for r in catalog if r['item_id'] not in {x['item_id'] for x in results}]
+    search_mode = args.search_mode or cfg.get('search_mode', 'dom')
+    outs = replay_searches(run_dir, store, remaining, selectors, exclude_keywords, log_path,
+                           base_url=cfg.get('base_url', 'https://supermercado.laanonimaonline.com/'), mode=search_mode)
+    for row, out in zip(remaining, outs):
+        if out['error']:
+            json_log(log_path, 'search_missing', {'item_id': row['item_id'], 'error': out['error']})
+            continue
+        sources['search_html'] = sources.get('search_html', 0) + 1
+        if out['result']:
+            results.append(out['result'])
+
+    priced_rows = compute_item_costs(results)
+    family_ae = float(cfg.get('family_ae', 3.09))
+    cba_ae, cba_family = compute_cba_values(priced_rows, family_ae)
+    # la serie parte de la exportada, como la habria actualizado la corrida en vivo
+    series_path = os.path.join(out_dir, 'series_cba.csv')
+    live_series = os.path.join(exports_dir, 'series_cba.csv')
+    if os.path.exists(live_series):
+        import shutil
+        shutil.copyfile(live_series, series_path)
+    update_series(series_path, period, cba_ae, cba_family)
+    breakdown_path = os.path.join(out_dir, f'breakdown_{period}.csv')
+    for r in priced_rows:
+        r['period'] = period
+    write_breakdown(breakdown_path, period, priced_rows)
+    daily_path = os.path.join(out_dir, f'daily_prices_{run_date}.csv')
+    write_daily_prices(daily_path, run_date, period, priced_rows)
+    report_path = os.path.join(out_dir, f'{period}.html')
+    render_report(report_path, period, series_path, breakdown_path)
+
+    diff = diff_breakdown(os.path.join(exports_dir, f'breakdown_{period}.csv'), breakdown_path)
+    json_log(log_path, 'replay_done', {'items': len(priced_rows), 'sources': sources, 'cba_ae': cba_ae})
+    json_log(log_path, 'replay_diff', diff)
+
+    print("=== Replay ===")
+    print(f"Corrida: {run_dir} | Periodo: {period}")
+    print(f"Items: {len(priced_rows)} | Fuentes: {sources}")
+    print(f"CBA AE: ${cba_ae:,.2f}")
+    print(f"Desglose: {breakdown_path}")
+    print(f"Serie: {series_path}")
+    print(f"Diferencias vs exportado: agregados={len(diff['added'])} faltantes={len(diff['missing'])} cambiados={len(diff['changed'])}")
+    for iid, fields in list(diff['changed'].items())[:20]:
+        print(f"  {iid}: {fields}")
+    if args.check and not diff['identical']:
+        return 1
+    return 0
+
+
+def cmd_reextract(args: argparse.Namespace) -> int:
+    from .site.reextract import plan_tasks, reextract
+    cfg = load_config_toml('config.toml')
+    store = EvidenceStore(args.evidence_root or cfg.get('evidence_dir', 'evidence'), compress=cfg.get('evidence_compress', 'gzip'))
+    run_dirs = sorted(p for p in store.root.glob(args.runs) if p.is_dir())
+    if args.since:
+        run_dirs = [p for p in run_dirs if p.name[-10:] >= args.since]
+    out_dir = args.out or os.path.join(cfg.get('exports_dir', 'exports'), 'reextract')
+    ensure_dirs([out_dir])
+    log_path = os.path.join(out_dir, 'reextract.jsonl')
+    catalog = read_catalog('data/cba_catalog.csv')
+    # cada corrida con los pins de su propio período
+    tasks = plan_tasks(run_dirs, store, catalog, _load_pins_map)
+    json_log(log_path, 'start', {'runs': len(run_dirs), 'files': len(tasks), 'workers': args.workers})
+    ctx = {
+        'selectors': load_selectors('config/selectors.json'),
+        'exclude_keywords': [s.strip() for s in cfg.get('exclude_keywords', '').split(',') if s.strip()],
+        'base_url': cfg.get('base_url', 'https://supermercado.laanonimaonline.com/'),
+        'mode': args.search_mode or cfg.get('search_mode', 'dom'),
+        'scoring_policy': cfg.get('scoring_policy', 'default'),
+    }
+
+    # un CSV por fecha, escrito a medida que llegan las filas
+    files: Dict[str, Any] = {}
+    writers: Dict[str, csv.DictWriter] = {}
+
+    def _on_row(task: Dict[str, Any], row: Dict[str, Any]) -> None:
+        day = task['date']
+        if day not in writers:
+            files[day] = open(os.path.join(out_dir, f'daily_prices_{day}.csv'), 'w', newline='', encoding='utf-8')
+            writers[day] = csv.DictWriter(files[day], fieldnames=DAILY_FIELDS)
+            writers[day].writeheader()
+        writers[day].writerow(_daily_row(day, task['period'], row))
+
+    try:
+        stats = reextract(tasks, ctx, _on_row, workers=args.workers, chunksize=args.chunksize,
+                          on_error=lambda t, e: json_log(log_path, 'reextract_error', {'file': f"{t['run_dir']}/{t['name']}", 'error': e}))
+    finally:
+        for f in files.values():
+            f.close()
+    stats['dates'] = len(writers)
+    json_log(log_path, 'reextract_done', stats)
+    print("=== Re-extraccion ===")
+    print(f"Corridas: {len(run_dirs)} | Archivos: {stats['files']} | Filas: {stats['rows']} | Errores: {stats['errors']}")
+    print(f"Workers: {stats['workers']} | {stats['seconds']:.1f} s | {stats['files_per_sec']} archivos/s")
+    print(f"Precios diarios: {out_dir} ({stats['dates']} fechas)")
+    return 0
+
+
+def cmd_session_serve(args: argparse.Namespace) -> int:
+    from .site.session import serve
+    cfg = load_config_toml('config.toml')
+    selectors = load_selector_plan('config/selectors.json')
+    evidence_dir = os.path.join(cfg.get('evidence_dir', 'evidence'), 'session')
+    html_dump_dir = os.path.join(evidence_dir, 'html')
+    ensure_dirs([evidence_dir, html_dump_dir, 'data'])
+    log_path = os.path.join(evidence_dir, 'session.jsonl')
+    port = args.port or int(cfg.get('browser_session_port', 9222) or 9222)
+    configure_evidence(_evidence_store(cfg), _screenshot_policy(cfg))
+
+    def _verify(cdp_url: str) -> bool:
+        # misma seleccion/verificacion de sucursal que run, sobre el navegador compartido
+        try:
+            page = ensure_branch(
+                base_url=cfg.get('base_url', 'https://supermercado.laanonimaonline.com/'),
+                postal_code=cfg.get('postal_code', '9410'),
+                branch_name=args.branch or cfg.get('branch_name', 'USHUAIA 5'),
+                selectors=selectors,
+                evidence_dir=evidence_dir,
+                html_dump_dir=html_dump_dir,
+                log_path=log_path,
+                block_profile=cfg.get('browser_block_profile', 'lean'),
+                cdp_url=cdp_url,
+            )
+        except Exception as e:
+            json_log(log_path, 'error', {'stage': 'session_branch', 'error': str(e)})
+            return False
+        release_page(page)
+        return True
+
+    print(f"Sesion en http://127.0.0.1:{port} (Ctrl+C para detener)")
+    try:
+        return serve(
+            verify_branch=_verify,
+            log_path=log_path,
+            port=port,
+            recycle_after=args.recycle_after or int(cfg.get('browser_session_recycle_pages', 300) or 300),
+            health_interval=args.health_interval or float(cfg.get('browser_session_health_seconds', 120) or 120),
+            headless=(not args.debug),
+        )
+    finally:
+        selectors.save()
+
+
 def cmd_dry_run(args: argparse.Namespace) -> int:
     period = parse_period(args.period)
     cfg = load_config_toml('config.toml')
@@ -751,52 +1186,27 @@ def cmd_dry_run(args: argparse.Namespace) -> int:
             cards.append({'title': title.strip(), 'price_text': price_str, 'in_stock': True, 'promo_flag': False, 'url': ''})
 
     from .site.extract import parse_price_ar
-    from .normalize.units import parse_title_size
+    from .normalize.units import parse_many
+    from .site.scoring import score_matrix
+    set_scoring_policy(cfg.get('scoring_policy', 'default'))
+    for card, (qty_base, unit) in zip(cards, parse_many(c['title'] for c in cards)):
+        card['price_final'] = parse_price_ar(card['price_text']) if card['price_text'] else None
+        card['qty_base'], card['unit'] = qty_base, unit
+        card['unit_price'] = card['price_final'] / card['qty_base'] if card['price_final'] and card['qty_base'] else None
+    # todas las filas contra todas las tarjetas en una pasada
+    best = score_matrix(catalog, cards, exclude_keywords)['best']
     results = []
-    for row in catalog:
-        query = f"{row['name']}"
-        # score quickly
-        scored = []
-        for card in cards:
-            title = card['title']
-            price = parse_price_ar(card['price_text']) if card['price_text'] else None
-            qty_base, unit = parse_title_size(title)
-            unit_price = price / qty_base if price and qty_base else None
-            score = 0
-            for kw in row['preferred_keywords']:
-                if kw and re.search(re.escape(kw), title, re.I):
-                    score += 2
-            for ex in exclude_keywords:
-                if ex and re.search(re.escape(ex), title, re.I):
-                    score -= 2
-            # size proximity
-            try:
-                exp_qty = float(row['expected_qty'])
-            except Exception:
-                exp_qty = 0.0
-            tol = 0.85
-            try:
-                tol = float(row.get('size_tolerance', tol))
-            except Exception:
-                pass
-            if qty_base and exp_qty:
-                ratio = min(qty_base, exp_qty) / max(qty_base, exp_qty)
-                if ratio >= tol:
-                    score += 2
-            # tiebreaker
-            scored.append((score, unit_price if unit_price else 1e12, {
-                'item_id': row['item_id'], 'name': row['name'], 'query': query,
-                'title': title, 'url': card['url'], 'in_stock': card['in_stock'], 'promo_flag': card['promo_flag'],
-                'price_final': price, 'qty_base': qty_base, 'unit': unit,
-                'expected_qty': row['expected_qty'], 'monthly_qty_base': row['monthly_qty_base'],
-                'substitution': ''
-            }))
-        chosen = None
-        if scored:
-            scored.sort(key=lambda t: (-t[0], t[1]))
-            chosen = scored[0][2]
-        if chosen:
-            results.append(chosen)
+    for row, idx in zip(catalog, best):
+        if idx is None:
+            continue
+        card = cards[idx]
+        results.append({
+            'item_id': row['item_id'], 'name': row['name'], 'query': f"{row['name']}",
+            'title': card['title'], 'url': card['url'], 'in_stock': card['in_stock'], 'promo_flag': card['promo_flag'],
+            'price_final': card['price_final'], 'qty_base': card['qty_base'], 'unit': card['unit'],
+            'expected_qty': row['expected_qty'], 'monthly_qty_base': row['monthly_qty_base'],
+            'substitution': ''
+        })
 
     priced_rows = compute_item_costs(results)
     family_ae = 3.09
@@ -835,7 +1245,11 @@ def main():
     p_run.add_argument('--branch', type=str, required=False, help='Nombre de sucursal (ej. USHUAIA 5)')
     p_run.add_argument('--debug', action='store_true', help='No headless, no cierre automÃƒÂ¡tico')
     p_run.add_argument('--skip-branch-verify', action='store_true', help='No abortar si no se verifica Ushuaia en header')
+    p_run.add_argument('--engine', choices=['sync', 'async'], required=False, help='Motor Playwright (default: engine en config.toml)')
+    p_run.add_argument('--search-mode', choices=['dom', 'snapshot', 'imetrics'], required=False, help='snapshot: un page.content() por pagina parseado offline; imetrics: inputs ocultos del HTML de resultados (fallback a DOM)')
     p_run.add_argument('--force-branch-refresh', action='store_true', help='Forzar nuevo proceso de selecciÃ³n de sucursal, ignorando cache')
+    p_run.add_argument('--attach', action='store_true', help='Usar el navegador de session-serve (si esta activo) en lugar de lanzar uno')
+    p_run.add_argument('--resume', action='store_true', help='Retomar la corrida del dia: saltea items ya registrados en data/raw/<run_id>/items.jsonl')
     p_run.set_defaults(func=cmd_run)
 
     p_dr = sub.add_parser('dry-run', help='Prueba de parsing con HTML guardado')
@@ -852,8 +1266,45 @@ def main():
     p_pins = sub.add_parser('pins-run', help='Ejecuta extracciÃ³n usando data/sku_pins.csv (sin sucursal)')
     p_pins.add_argument('--period', type=str, required=False, help='YYYY-MM')
     p_pins.add_argument('--debug', action='store_true', help='No headless, deja navegador abierto')
+    p_pins.add_argument('--engine', choices=['sync', 'async'], required=False, help='Motor Playwright: pool sync o asyncio')
+    p_pins.add_argument('--fetch', choices=['browser', 'http'], required=False, help='http: GET directo con cookies de sucursal, navegador solo si falta el precio')
+    p_pins.add_argument('--workers', type=int, required=False, help='Paginas en paralelo (default: pins_workers en config.toml)')
+    p_pins.add_argument('--due-only', action='store_true', help='Solo re-chequear items vencidos segun data/fingerprints.json; el resto reutiliza el ultimo precio')
+    p_pins.add_argument('--attach', action='store_true', help='Usar el navegador de session-serve (si esta activo)')
+    p_pins.add_argument('--resume', action='store_true', help='Retomar: saltea items ya registrados en el journal del dia')
     p_pins.set_defaults(func=cmd_pins_run)
 
+    p_ss = sub.add_parser('session-serve', help='Navegador persistente con sucursal verificada para --attach')
+    p_ss.add_argument('--port', type=int, required=False, help='Puerto de remote debugging (default: session_port en config.toml)')
+    p_ss.add_argument('--branch', type=str, required=False, help='Nombre de sucursal (ej. USHUAIA 5)')
+    p_ss.add_argument('--recycle-after', type=int, required=False, help='Reciclar el navegador despues de N paginas')
+    p_ss.add_argument('--health-interval', type=float, required=False, help='Segundos entre chequeos de salud')
+    p_ss.add_argument('--debug', action='store_true', help='Navegador visible')
+    p_ss.set_defaults(func=cmd_session_serve)
+
+    p_ec = sub.add_parser('evidence-compact', help='Migra evidencia suelta al store, poda corridas viejas (1 muestra por mes) y borra blobs huerfanos')
+    p_ec.add_argument('--keep-days', type=int, required=False, help='Corridas completas a conservar (default: evidence_keep_days en config.toml)')
+    p_ec.add_argument('--dry-run', action='store_true', help='Solo informar que se podaria')
+    p_ec.set_defaults(func=cmd_evidence_compact)
+
+    p_rp = sub.add_parser('replay', help='Reprocesa una carpeta de evidencia (HTML guardado) sin navegador ni red')
+    p_rp.add_argument('run_dir', help='Carpeta de corrida, p.ej. evidence/2025-09_2025-09-11')
+    p_rp.add_argument('--period', help='Periodo YYYY-MM (por defecto, el del nombre de la carpeta)')
+    p_rp.add_argument('--out', help='Directorio de salida (por defecto exports/replay/<carpeta>)')
+    p_rp.add_argument('--search-mode', dest='search_mode', choices=['dom', 'snapshot', 'imetrics'], default=None)
+    p_rp.add_argument('--check', action='store_true', help='Sale con 1 si el desglose difiere del exportado')
+    p_rp.set_defaults(func=cmd_replay)
+
+    p_rx = sub.add_parser('reextract', help='Re-deriva precios diarios de la evidencia HTML archivada en paralelo')
+    p_rx.add_argument('--evidence-root', dest='evidence_root', help='Raiz de evidencia (default: evidence_dir en config.toml)')
+    p_rx.add_argument('--runs', default='*_*', help='Glob de carpetas de corrida bajo la raiz')
+    p_rx.add_argument('--since', help='Solo corridas desde esta fecha (YYYY-MM-DD)')
+    p_rx.add_argument('--workers', type=int, default=None, help='Procesos (default: CPUs; 1 = sin pool)')
+    p_rx.add_argument('--chunksize', type=int, default=16, help='Archivos por envio a cada worker')
+    p_rx.add_argument('--search-mode', dest='search_mode', choices=['dom', 'snapshot', 'imetrics'], default=None)
+    p_rx.add_argument('--out', help='Directorio de salida (default: exports/reextract)')
+    p_rx.set_defaults(func=cmd_reextract)
+
     args = parser.parse_args()
     if not getattr(args, 'func', None):
         parser.print_help()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import functools
 import json
+import threading
 import time
 from pathlib import Path
 from typing import Any, Callable, TypeVar, cast
@@ -9,6 +10,9 @@ from typing import Any, Callable, TypeVar, cast
 
 F = TypeVar("F", bound=Callable[..., Any])
 
+# los workers de pins-run escriben el journal desde varios threads
+_JOURNAL_LOCK = threading.Lock()
+
 
 class CircuitBreakerOpen(RuntimeError):
     """Se lanza cuando el circuito está abierto y se bloquean las llamadas."""
@@ -110,10 +114,53 @@ def load_checkpoint(
         return json.load(fh)
 
 
+def append_journal(
+    run_id: str,
+    record: dict[str, Any],
+    *,
+    base_dir: str | Path = Path("data/raw"),
+    name: str = "items.jsonl",
+) -> None:
+    """Agregar un registro al journal append-only de un ``run_id``."""
+
+    path = Path(base_dir) / run_id
+    path.mkdir(parents=True, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _JOURNAL_LOCK, (path / name).open("a", encoding="utf-8") as fh:
+        fh.write(line)
+        fh.flush()
+
+
+def load_journal(
+    run_id: str,
+    *,
+    base_dir: str | Path = Path("data/raw"),
+    name: str = "items.jsonl",
+) -> list[dict[str, Any]]:
+    """Leer el journal de un ``run_id``; ignora una última línea truncada."""
+
+    file = Path(base_dir) / run_id / name
+    if not file.exists():
+        return []
+    records = []
+    with file.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
 __all__ = [
     "exponential_backoff",
     "circuit_breaker",
     "CircuitBreakerOpen",
     "save_checkpoint",
     "load_checkpoint",
+    "append_journal",
+    "load_journal",
 ]
@@ -10,7 +10,7 @@ def _read_series(path: str):
         return list(csv.DictReader(f))
 
 
-def _write_series(path: str, rows):
+def write_series(path: str, rows):
     fields = ['period','cba_ae','cba_family','idx','mom','yoy']
     with open(path, 'w', newline='', encoding='utf-8') as f:
         w = csv.DictWriter(f, fieldnames=fields)
@@ -58,7 +58,7 @@ def update_series(path: str, period: str, cba_ae: float, cba_family: float) -> D
         rows.append(row)
     rows.sort(key=lambda r: r['period'])
     os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
-    _write_series(path, rows)
+    write_series(path, rows)
     return row
 
 
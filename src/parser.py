@@ -4,108 +4,48 @@ import os
 import re
 from typing import Any, Dict, List, Optional, Tuple
 
+from cba_shared import matcher as _matcher
+from cba_shared.matcher import MatchRules, compile_product
+
 from .normalize.units import parse_size, to_base_units
 
 # TODO: Implementar extracción real desde HTML/JSON de La Anónima
 
 
-def _final_unit_price(product: Dict[str, Any]) -> Optional[float]:
-    """Devuelve el precio por unidad considerando promociones."""
-    if product.get("unit_price") is not None:
-        return product.get("unit_price")
+# reglas de tamaño de este proyecto para el matcher compartido
+RULES = MatchRules(to_base_units, parse_size, small_pack_if_preferred=True)
 
-    price = product.get("promo_price")
-    if price is None:
-        price = product.get("price")
 
-    pack_size = product.get("pack_size")
-    try:
-        return price / float(pack_size) if price is not None and pack_size else None
-    except (TypeError, ValueError):
-        return None
+def compile_cba_row(cba_row: Dict[str, Any]) -> Dict[str, Any]:
+    return _matcher.compile_cba_row(cba_row, RULES)
 
 
 def match_sku_to_cba(
-    product: Dict[str, Any], cba_row: Dict[str, Any], tolerance: float = 0.1
+    product: Dict[str, Any],
+    cba_row: Dict[str, Any],
+    tolerance: float = 0.1,
+    compiled: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
 ) -> Optional[Tuple[str, Optional[str]]]:
     """Heurística de matching por categoría, palabras clave y tamaño.
 
     Devuelve una tupla ``(source, reason)`` si matchea; en caso contrario, ``None``.
     ``source`` indica si se usó ``preferred`` o ``fallback``. ``reason`` documenta
-    si se aceptó una diferencia de tamaño (``pack_size_diff``).
+    si se aceptó una diferencia de tamaño (``pack_size_diff``). ``compiled`` es
+    el par ``(compile_product(product), compile_cba_row(cba_row))`` ya armado
+    por :class:`CatalogMatcher`.
     """
+    cp, cr = compiled or (compile_product(product), compile_cba_row(cba_row))
+    return _matcher.match_compiled(cp, cr, tolerance, RULES)
 
-    name = product.get("name", "").lower()
-    prod_cat = product.get("category")
-    cba_cat = cba_row.get("category")
-    if cba_cat and prod_cat and cba_cat.lower() != prod_cat.lower():
-        return None
-
-    preferred = [k.strip() for k in cba_row.get("preferred_keywords", "").split(";")]
-    fallback = [k.strip() for k in cba_row.get("fallback_keywords", "").split(";")]
-
-    min_pack = cba_row.get("min_pack_size")
-    min_unit = cba_row.get("monthly_qty_unit", "unidad")
-    pack_size = product.get("pack_size")
-    pack_unit = product.get("pack_unit")
-    reason: Optional[str] = None
-    if min_pack is not None:
-        try:
-            min_base, base_unit = to_base_units(float(min_pack), min_unit)
-        except (TypeError, ValueError):
-            min_base, base_unit = None, None
-        pack_base = None
-        if pack_size is not None:
-            try:
-                pack_base, pack_unit_conv = to_base_units(
-                    float(pack_size), pack_unit or min_unit
-                )
-            except (TypeError, ValueError):
-                pack_base = None
-        else:
-            try:
-                size_match = re.search(r"([\d/.,]+\s*[a-zA-Z]+)", name)
-                if size_match:
-                    qty, unit = parse_size(size_match.group(1))
-                    pack_base, pack_unit_conv = qty, unit
-                else:
-                    pack_base = None
-            except ValueError:
-                pack_base = None
-        if (
-            pack_base is not None
-            and min_base is not None
-            and pack_unit_conv is not None
-            and base_unit is not None
-        ):
-            # Permitir equivalencia ml/l y g/kg
-            units_equiv = (
-                pack_unit_conv.lower() == base_unit.lower()
-                or (pack_unit_conv.lower() == "ml" and base_unit.lower() == "l")
-                or (pack_unit_conv.lower() == "g" and base_unit.lower() == "kg")
-            )
-            # Si pack_base está en ml y base en l, convertir pack_base a l
-            if pack_unit_conv.lower() == "ml" and base_unit.lower() == "l":
-                pack_base = pack_base / 1000.0
-            if pack_unit_conv.lower() == "g" and base_unit.lower() == "kg":
-                pack_base = pack_base / 1000.0
-            if units_equiv:
-                if pack_base < min_base * (1 - tolerance):
-                    # Si hay keyword preferido en el nombre, aceptar pack_size_diff
-                    for kw in preferred:
-                        if kw and kw.lower() in name:
-                            return "preferred", "pack_size_diff"
-                    return None
-                if pack_base < min_base:
-                    reason = "pack_size_diff"
-
-    for kw in preferred:
-        if kw and kw.lower() in name:
-            return "preferred", reason
-    for kw in fallback:
-        if kw and kw.lower() in name:
-            return "fallback", reason
-    return None
+
+class CatalogMatcher(_matcher.CatalogMatcher):
+    """:class:`cba_shared.matcher.CatalogMatcher` con :data:`RULES`; cada par pasa por :func:`match_sku_to_cba`."""
+
+    def __init__(self, cba_catalog: List[Dict[str, Any]], tolerance: float = 0.1) -> None:
+        super().__init__(cba_catalog, RULES, tolerance)
+
+    def match(self, cp: Dict[str, Any], cr: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+        return match_sku_to_cba(cp["product"], cr["row"], self.tolerance, compiled=(cp, cr))
 
 
 def map_products_to_cba(
@@ -113,25 +53,11 @@ def map_products_to_cba(
 ) -> Dict[str, Dict[str, Any]]:
     """Mapea productos scrapeados a los ítems de la CBA."""
 
+    matcher = CatalogMatcher(cba_catalog).index(products)
     mapping: Dict[str, Dict[str, Any]] = {}
-    for cba_row in cba_catalog:
-        matches: List[Dict[str, Any]] = []
-        for prod in products:
-            if (
-                cba_row.get("category")
-                and prod.get("category")
-                and cba_row["category"].lower() != prod["category"].lower()
-            ):
-                continue
-            result = match_sku_to_cba(prod, cba_row)
-            if result:
-                source, reason = result
-                prod_copy = prod.copy()
-                prod_copy["unit_price"] = _final_unit_price(prod_copy)
-                prod_copy["source"] = source
-                if reason:
-                    prod_copy["reason"] = reason
-                matches.append(prod_copy)
+    for cr in matcher.rows:
+        cba_row = cr["row"]
+        matches = matcher.matches(cr)
         if matches:
             priority = {"preferred": 0, "fallback": 1}
             best = min(
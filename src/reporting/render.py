@@ -14,7 +14,7 @@ Funciones principales:
 
 import csv
 
-def render_report(out_path: str, period: str, series_path: str, breakdown_path: str, write_by_category: bool = False) -> None:
+def render_report(out_path: str, period: str, series_path: str, breakdown_path: str, write_by_category: bool = False, db=None) -> None:
     """
     Renderiza el reporte mensual IPC Ushuaia en HTML.
 
@@ -24,13 +24,15 @@ def render_report(out_path: str, period: str, series_path: str, breakdown_path:
         series_path (str): Ruta a series_cba.csv.
         breakdown_path (str): Ruta a breakdown_<period>.csv.
         write_by_category (bool): Si True, exporta breakdown por categoría (opcional).
+        db: Conexión al almacén SQLite; si se pasa, los datos salen de ahí
+            (los CSV quedan solo como enlace de descarga).
 
     Usa Jinja2 si está disponible, si no utiliza el fallback heredado.
     """
     env = _build_jinja_env()
     if env is not None:
         # Carga insumos y valida datos
-        series, breakdown, prev = load_data(series_path, breakdown_path, period)
+        series, breakdown, prev = load_data(series_path, breakdown_path, period, db=db)
         v = validate(breakdown)
         rows = v["rows"]
         enriched = enrich(rows, period, prev)
@@ -140,7 +142,15 @@ def _read_csv(path: str):
         return list(csv.DictReader(f))
 
 
-def load_data(series_path: str, breakdown_path: str, period: str):
+def load_data(series_path: str, breakdown_path: str, period: str, db=None):
+    """Serie, desglose del período y del mes anterior.
+
+    Con ``db`` (conexión de :mod:`src.warehouse`) se consultan en el almacén
+    en lugar de leer los CSV.
+    """
+    if db is not None:
+        from .. import warehouse
+        return warehouse.series(db), warehouse.breakdown(db, period), warehouse.breakdown(db, _period_minus(period, 1))
     series = _read_csv(series_path)
     breakdown = _read_csv(breakdown_path)
     prev_path = os.path.join(os.path.dirname(breakdown_path) or 'exports', f"breakdown_{_period_minus(period,1)}.csv")
@@ -164,7 +174,8 @@ def validate(rows):
 
 def enrich(rows, period: str, prev_rows):
     from src.canasta_base import CANASTA_BASE, FAMILIA_AE, get_cantidad
-    from ..normalize.units import parse_title_size
+    from cba_shared.engine import unit_price as _unit_price
+    from ..normalize.units import parse_many
     prev_map = {r.get('item_id'): r for r in prev_rows if r.get('item_id')}
     # Sumar total CBA: si cost_item_ae no está presente, usar qty_AE * unit_price
     total_cba = 0.0
@@ -182,14 +193,10 @@ def enrich(rows, period: str, prev_rows):
         except Exception:
             pass
     out = []
-    for r in rows:
-        title = r.get('title') or r.get('name') or ''
-        qty = r.get('qty_base')
-        unit = r.get('unit')
-        if not qty or not unit:
-            q, u = parse_title_size(title)
-            qty = qty or q
-            unit = unit or u
+    titles = [r.get('title') or r.get('name') or '' for r in rows]
+    for r, title, (q, u) in zip(rows, titles, parse_many(titles)):
+        qty = r.get('qty_base') or q
+        unit = r.get('unit') or u
         qty_float = _ensure_float(qty)
         # Presentación: respeta la unidad reportada por el producto
         # Si el título contiene una unidad específica, úsala tal cual
@@ -206,7 +213,7 @@ def enrich(rows, period: str, prev_rows):
         price_final = _ensure_float(r.get('price_final')) or 0.0
         price_original = _ensure_float(r.get('price_original')) or 0.0
         price_list = price_original if (price_original > price_final > 0) else None
-        unit_price = (price_final / qty_float) if (price_final and qty_float) else None
+        unit_price = _unit_price(price_final, qty_float)
         # Obtener cantidad mensual por AE desde canasta base
         item_id = r.get('item_id')
         qty_ae = get_cantidad(item_id, 1.0)  # por AE
@@ -231,7 +238,9 @@ def enrich(rows, period: str, prev_rows):
         if brand_tier not in ('premium','estandar','segunda'):
             brand_tier = 'estandar'
         cba_flag = (r.get('cba_flag') or '').strip().lower()
-        in_stock = str(r.get('in_stock') or '1').strip().lower() in ('1','true','yes','si','s')
+        in_stock = r.get('in_stock')
+        if not isinstance(in_stock, bool):
+            in_stock = str(in_stock or '1').strip().lower() in ('1','true','yes','si','s')
         promo_flag = str(r.get('promo_flag') or '').strip().lower() in ('1','true','yes','si','s')
         qty_ae = _ensure_float(r.get('monthly_qty_base')) or 0.0
         out.append({
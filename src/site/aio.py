@@ -0,0 +1,192 @@
+"""Motor de scraping: pines y búsquedas en una sola llamada.
+
+Las extracciones viven una sola vez, como corrutinas, en ``product.py``
+(``extract_product_page_async``) y ``search.py`` (``search_one_async``).
+:func:`run_engine` corre primero los pines y después las búsquedas de lo que
+quedó sin resolver (``plan_searches``), con el mismo navegador:
+
+- sin ``page``: ``playwright.async_api``, cada job en su propia página y
+  todos bajo un semáforo de ``concurrency``; la selección de sucursal sigue
+  siendo la de ``branch.py`` (sync) y acá se reutiliza su
+  ``storage_state.json``;
+- con ``page`` (página sync ya posicionada en la sucursal): los mismos jobs
+  en secuencia sobre esa página, vía :mod:`~src.site.bridge`.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .bridge import SyncView, run_sync
+from .evidence import screenshot_mode
+from .extract import compile_card_plan
+from .product import extract_product_page_async
+from .routing import apply_block_profile_async
+from .search import search_one_async
+
+DEFAULT_STORAGE_STATE = Path("data/storage_state.json")
+
+
+async def _timed(coro_fn, page, *args, on_done=None) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        out = {'result': await coro_fn(page, *args), 'error': None}
+    except Exception as e:
+        out = {'result': None, 'error': str(e)}
+    out['seconds'] = round(time.perf_counter() - t0, 3)
+    if on_done:
+        try:
+            on_done(out)
+        except Exception:
+            pass
+    return out
+
+
+async def _bounded(sem: asyncio.Semaphore, context, coro_fn, *args, page_setup=None, on_done=None) -> Dict[str, Any]:
+    async with sem:
+        page = await context.new_page()
+        try:
+            if page_setup:
+                await page_setup(page)
+            return await _timed(coro_fn, page, *args, on_done=on_done)
+        finally:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+
+async def _run_stages(run_job, pinned_jobs: List[Dict[str, Any]], catalog: List[Dict[str, Any]],
+                      plan_searches: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]],
+                      pinned_args: Callable[[Dict[str, Any]], tuple], search_args: Callable[[Dict[str, Any]], tuple],
+                      on_pinned, on_search) -> Dict[str, Any]:
+    # run_job(coro_fn, args, on_done) -> corrutina con el outcome de un job
+    t0 = time.perf_counter()
+    pinned = await run_job([
+        (extract_product_page_async, pinned_args(job), (lambda o, i=i: on_pinned(i, o)) if on_pinned else None)
+        for i, job in enumerate(pinned_jobs)
+    ])
+    t1 = time.perf_counter()
+    if plan_searches is not None:
+        catalog = plan_searches(pinned)
+    searches = await run_job([
+        (search_one_async, search_args(row), (lambda o, i=i: on_search(i, o)) if on_search else None)
+        for i, row in enumerate(catalog)
+    ])
+    t2 = time.perf_counter()
+    return {
+        'pinned': pinned,
+        'searches': searches,
+        'catalog': catalog,
+        'pinned_seconds': round(t1 - t0, 3),
+        'search_seconds': round(t2 - t1, 3),
+    }
+
+
+async def run_engine_async(
+    *,
+    selectors: Dict[str, Any],
+    evidence_dir: str,
+    html_dump_dir: str,
+    log_path: str,
+    pinned_jobs: Optional[List[Dict[str, Any]]] = None,
+    catalog: Optional[List[Dict[str, Any]]] = None,
+    plan_searches: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None,
+    exclude_keywords: Optional[List[str]] = None,
+    base_url: str = '',
+    search_mode: str = 'dom',
+    concurrency: int = 4,
+    headless: bool = True,
+    storage_state_path: Optional[Path] = DEFAULT_STORAGE_STATE,
+    block_profile: str = 'lean',
+    cdp_url: Optional[str] = None,
+    fingerprints=None,
+    on_pinned: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    on_search: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    page=None,
+    context=None,
+) -> Dict[str, Any]:
+    """Pines y luego búsquedas; ver el docstring del módulo.
+
+    ``plan_searches(outcomes_pinned)`` devuelve las filas a buscar una vez
+    resueltos los pines (si no se pasa, se busca ``catalog``).
+    ``on_pinned``/``on_search(i, outcome)`` avisan por job apenas termina
+    (journal). ``page`` es una página sync (o :class:`SyncView`) para correr
+    en secuencia; ``context`` un contexto async ya abierto (tests, sesiones
+    propias) en lugar de lanzar Chromium.
+    """
+    pinned_jobs = pinned_jobs or []
+    plan = compile_card_plan(selectors) if search_mode == 'snapshot' else None
+    t0 = time.perf_counter()
+
+    def pinned_args(job):
+        return (job['url'], selectors, evidence_dir, html_dump_dir, job.get('save_basename', ''), fingerprints)
+
+    def search_args(row, goto_base=True):
+        return (row, selectors, evidence_dir, html_dump_dir, exclude_keywords or [], log_path, base_url, search_mode, goto_base, plan)
+
+    if page is not None:
+        async def run_job(jobs):
+            return [await _timed(fn, page, *args, on_done=on_done) for fn, args, on_done in jobs]
+
+        out = await _run_stages(run_job, pinned_jobs, catalog or [], plan_searches, pinned_args,
+                                lambda row: search_args(row, goto_base=False), on_pinned, on_search)
+        out['seconds'] = round(time.perf_counter() - t0, 3)
+        return out
+
+    sem = asyncio.Semaphore(max(1, int(concurrency or 1)))
+    screenshots = bool(evidence_dir) and screenshot_mode() != 'none'
+
+    async def _go(context, page_setup=None):
+        async def run_job(jobs):
+            # gather preserva el orden de entrada aunque terminen desordenadas
+            return list(await asyncio.gather(*(_bounded(sem, context, fn, *args, page_setup=page_setup, on_done=on_done)
+                                               for fn, args, on_done in jobs)))
+        return await _run_stages(run_job, pinned_jobs, catalog or [], plan_searches, pinned_args, search_args,
+                                 on_pinned, on_search)
+
+    if context is not None:
+        out = await _go(context)
+    else:
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as p:
+            page_setup = None
+            if cdp_url:
+                # contexto compartido de session-serve: route por página, no se cierra
+                browser = await p.chromium.connect_over_cdp(cdp_url)
+                context = browser.contexts[0]
+
+                async def page_setup(page):
+                    await apply_block_profile_async(page, block_profile, screenshots=screenshots)
+            else:
+                browser = await p.chromium.launch(headless=headless)
+                context_kwargs: Dict[str, Any] = {}
+                if storage_state_path and Path(storage_state_path).exists():
+                    context_kwargs['storage_state'] = str(storage_state_path)
+                context = await browser.new_context(**context_kwargs)
+                await apply_block_profile_async(context, block_profile, screenshots=screenshots)
+            try:
+                out = await _go(context, page_setup)
+            finally:
+                if not cdp_url:
+                    await context.close()
+                await browser.close()
+    out['seconds'] = round(time.perf_counter() - t0, 3)
+    return out
+
+
+def run_engine(**kwargs) -> Dict[str, Any]:
+    """Wrapper sync de :func:`run_engine_async` para el CLI.
+
+    Con ``page`` (sync) corre sobre esa página sin event loop; si no, con
+    ``asyncio.run`` y un navegador async propio en un hilo aparte:
+    ``playwright.sync_api`` (``ensure_branch``) deja su loop marcado como
+    corriendo en el hilo que lo arrancó y ``asyncio.run`` ahí falla.
+    """
+    if kwargs.get('page') is not None:
+        kwargs['page'] = SyncView(kwargs['page'])
+        return run_sync(run_engine_async(**kwargs))
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='aio-engine') as ex:
+        return ex.submit(lambda: asyncio.run(run_engine_async(**kwargs))).result()
@@ -1,4 +1,5 @@
-﻿import os
+﻿import json
+import os
 import re
 import time
 import shutil
@@ -15,7 +16,11 @@ from playwright.sync_api import (
     sync_playwright,
 )
 
+from .evidence import capture_page, screenshot_mode, submit_evidence
+from .selector_plan import note_match, spec_rx
 from .utils import json_log
+from .routing import apply_block_profile
+from .waits import css_of, settle, settle_mark, wait_for_css
 
 # ---------------------------------------------------------------------------
 # Defaults & helpers
@@ -37,27 +42,25 @@ def _compile(pattern: str) -> re.Pattern[str]:
 
 
 def _locator_from_spec(page: Page, spec: Dict[str, Any]) -> Optional[Locator]:
-    import re as _re
-
     if not spec:
         return None
 
     if "role" in spec:
         kwargs: Dict[str, Any] = {}
         if spec.get("name"):
-            kwargs["name"] = _re.compile(spec["name"], re.I)
+            kwargs["name"] = spec_rx(spec, "name", re.I)
         if spec.get("exact") is not None:
             kwargs["exact"] = bool(spec["exact"])
         loc = page.get_by_role(spec["role"], **kwargs)
         if spec.get("has_text"):
-            loc = loc.filter(has_text=_re.compile(spec["has_text"], re.I))
+            loc = loc.filter(has_text=spec_rx(spec, "has_text", re.I))
         return loc
 
     if "placeholder" in spec:
-        return page.get_by_placeholder(_re.compile(spec["placeholder"], re.I))
+        return page.get_by_placeholder(spec_rx(spec, "placeholder", re.I))
 
     if "text" in spec:
-        return page.get_by_text(_re.compile(spec["text"], re.I))
+        return page.get_by_text(spec_rx(spec, "text", re.I))
 
     if "css" in spec:
         return page.locator(spec["css"])
@@ -70,13 +73,16 @@ def _locator_from_spec(page: Page, spec: Dict[str, Any]) -> Optional[Locator]:
 
 def _locate_first(page: Page, specs: Sequence[Dict[str, Any]], *, timeout: float = 4000) -> Optional[Locator]:
     for spec in specs:
+        t0 = time.perf_counter()
         try:
             loc = _locator_from_spec(page, spec)
             if not loc:
                 continue
             loc.first.wait_for(state="attached", timeout=timeout)
+            note_match(spec, True)
             return loc.first
         except Exception:
+            note_match(spec, False, (time.perf_counter() - t0) * 1000)
             continue
     return None
 
@@ -95,16 +101,14 @@ def _merge_specs(selectors: Dict[str, Any], *keys: str) -> List[Dict[str, Any]]:
     return merged
 
 
-def _capture(page: Page, target_path: Path) -> None:
-    try:
-        page.screenshot(path=str(target_path), full_page=True)
-    except Exception:
-        pass
+def _capture(page: Page, target_path: Path, failed: bool = False) -> None:
+    # pasos de sucursal: pocos y auditables, no entran en el muestreo
+    capture_page(page, target_path, failed=failed, always=True)
 
 
 def _dump_html(page: Page, target_path: Path) -> None:
     try:
-        target_path.write_text(page.content(), encoding="utf-8")
+        submit_evidence(target_path, page.content())
     except Exception:
         pass
 
@@ -162,6 +166,8 @@ class BranchConfig:
     browser_channel: Optional[str] = DEFAULT_BROWSER_CHANNEL or None
     evidence_prefix: str = DEFAULT_EVIDENCE_PREFIX
     force_refresh: bool = False
+    block_profile: str = 'lean'
+    cdp_url: Optional[str] = None
 
 
 class BranchEnsurer:
@@ -253,8 +259,29 @@ class BranchEnsurer:
     # Browser setup
     # ------------------------------------------------------------------
 
+    def _attach_browser(self) -> None:
+        # Navegador de ``session-serve``: se usa su contexto por defecto (ya
+        # con la sucursal) y se trabaja en una página propia.
+        self.browser = self.play.chromium.connect_over_cdp(self.cfg.cdp_url)
+        self.context = self.browser.contexts[0] if self.browser.contexts else self.browser.new_context()
+        if self.cfg.storage_state_path.exists():
+            try:
+                state = json.loads(self.cfg.storage_state_path.read_text(encoding="utf-8"))
+                if state.get("cookies"):
+                    self.context.add_cookies(state["cookies"])
+            except Exception:
+                pass
+        self.page = self.context.new_page()
+        self.page.set_default_timeout(45000)
+        # route a nivel página: el contexto es compartido con otros clientes
+        apply_block_profile(self.page, self.cfg.block_profile, screenshots=screenshot_mode() != 'none')
+        self._log("browser_attached", {"cdp_url": self.cfg.cdp_url, "block_profile": self.cfg.block_profile})
+
     def _setup_browser(self) -> None:
         self.play = sync_playwright().start()
+        if self.cfg.cdp_url:
+            self._attach_browser()
+            return
         chromium = self.play.chromium
         channel_label = self.cfg.browser_channel or 'chromium'
         self._log("browser_launch", {"mode": 'headless' if self.cfg.headless else 'headed', "channel": channel_label, "persistent": (not self.cfg.headless)})
@@ -301,6 +328,9 @@ class BranchEnsurer:
                     context_kwargs["storage_state"] = str(self.cfg.storage_state_path)
                 self.context = self.browser.new_context(**context_kwargs)
         self.context.set_default_timeout(45000)
+        # Las capturas de cada paso requieren imágenes: el perfil lo contempla
+        apply_block_profile(self.context, self.cfg.block_profile, screenshots=screenshot_mode() != 'none')
+        self._log("block_profile", {"profile": self.cfg.block_profile})
         self.page = self.context.pages[0] if self.context.pages else self.context.new_page()
         self.page.set_default_timeout(45000)
 
@@ -335,8 +365,9 @@ class BranchEnsurer:
         if specs:
             btn = _locate_first(self.page, specs)
             if btn:
+                mark = settle_mark(self.page)
                 btn.click()
-                self.page.wait_for_timeout(500)
+                settle(self.page, 'branch_click', 500, mark)
         # Generic dialog fallback
         dialogs = self.page.locator("role=dialog")
         for idx in range(min(dialogs.count(), 3)):
@@ -350,8 +381,9 @@ class BranchEnsurer:
                 target = cta.filter(has_text=_compile(pattern))
                 if target.count():
                     try:
+                        mark = settle_mark(self.page)
                         target.first.click()
-                        self.page.wait_for_timeout(500)
+                        settle(self.page, 'branch_click', 500, mark)
                         return self._await_postal_input()
                     except Exception:
                         continue
@@ -368,11 +400,12 @@ class BranchEnsurer:
         btn = self._locate_filtered(specs, forbidden)
         if not btn:
             return None
+        mark = settle_mark(self.page)
         try:
             btn.click()
         except PWTimeoutError:
             btn.click(force=True)
-        self.page.wait_for_timeout(300)
+        settle(self.page, 'branch_click', 300, mark)
         return self._await_postal_input()
 
     def _route_menu(self) -> Optional[Locator]:
@@ -382,21 +415,24 @@ class BranchEnsurer:
         if trigger_specs:
             trigger = self._locate_filtered(trigger_specs, forbidden)
             if trigger:
+                mark = settle_mark(self.page)
                 trigger.click()
-                self.page.wait_for_timeout(300)
+                settle(self.page, 'branch_click', 300, mark)
         else:
             try:
                 ham = self.page.get_by_role("button", name=_compile("menu"))
                 if ham.count():
+                    mark = settle_mark(self.page)
                     ham.first.click()
-                    self.page.wait_for_timeout(300)
+                    settle(self.page, 'branch_click', 300, mark)
             except Exception:
                 pass
         entry_specs = self.cfg.selectors.get("branch_entry_menu") or []
         entry = self._locate_filtered(entry_specs, forbidden) if entry_specs else None
         if entry:
+            mark = settle_mark(self.page)
             entry.click()
-            self.page.wait_for_timeout(300)
+            settle(self.page, 'branch_click', 300, mark)
         return self._await_postal_input()
 
     def _await_postal_input(self) -> Optional[Locator]:
@@ -428,8 +464,9 @@ class BranchEnsurer:
             choice = _locate_first(self.page, [spec], timeout=2000)
             if choice:
                 try:
+                    mark = settle_mark(self.page)
                     choice.click()
-                    self.page.wait_for_timeout(250)
+                    settle(self.page, 'branch_click', 250, mark)
                     self._wait_results()
                 except Exception:
                     continue
@@ -449,11 +486,12 @@ class BranchEnsurer:
                 {"route": route_name, "pattern": self.cfg.branch_name},
             )
             return False
+        mark = settle_mark(self.page)
         try:
             option_locator.click()
         except PWTimeoutError:
             option_locator.click(force=True)
-        self.page.wait_for_timeout(400)
+        settle(self.page, 'branch_click', 400, mark)
 
         confirm_specs = self.cfg.selectors.get("confirm_button") or []
         confirm = _locate_first(self.page, confirm_specs, timeout=2500)
@@ -463,7 +501,7 @@ class BranchEnsurer:
             except PWTimeoutError:
                 confirm.click(force=True)
         self.page.wait_for_load_state("networkidle")
-        self.page.wait_for_timeout(1000)
+        wait_for_css(self.page, css_of(self.cfg.selectors.get("branch_header_label") or []), 'branch_confirm', 1000)
 
         elapsed = time.perf_counter() - t0
         self._log("branch_option_selected", {"route": route_name, "seconds": round(elapsed, 3)})
@@ -585,22 +623,23 @@ class BranchEnsurer:
         if not btn:
             return
         try:
+            mark = settle_mark(self.page)
             btn.click()
-            self.page.wait_for_timeout(300)
+            settle(self.page, 'branch_click', 300, mark)
         except Exception:
             pass
 
-    def _capture_step(self, label: str) -> None:
+    def _capture_step(self, label: str, failed: bool = False) -> None:
         assert self.page is not None
         base = f"{self.cfg.evidence_prefix}_{label}" if self.cfg.evidence_prefix else label
         screenshot_path = self.cfg.evidence_dir / f"{base}.png"
         html_path = self.cfg.html_dump_dir / f"{base}.html"
-        _capture(self.page, screenshot_path)
+        _capture(self.page, screenshot_path, failed)
         _dump_html(self.page, html_path)
 
     def _capture_failure(self, label: str) -> None:
         try:
-            self._capture_step(label)
+            self._capture_step(label, failed=True)
         except Exception:
             pass
 
@@ -638,6 +677,8 @@ def ensure_branch(
     storage_state_path: Optional[str] = None,
     browser_channel: Optional[str] = None,
     force_refresh: bool = False,
+    block_profile: Optional[str] = None,
+    cdp_url: Optional[str] = None,
 ) -> Page:
     cfg = BranchConfig(
         base_url=base_url,
@@ -654,6 +695,8 @@ def ensure_branch(
         storage_state_path=Path(storage_state_path or DEFAULT_STORAGE_STATE),
         browser_channel=browser_channel or DEFAULT_BROWSER_CHANNEL,
         force_refresh=force_refresh,
+        block_profile=block_profile or 'lean',
+        cdp_url=cdp_url,
     )
 
     attempts = 2 if not cfg.force_refresh else 1
@@ -668,6 +711,9 @@ def ensure_branch(
         except Exception as exc:  # pylint: disable=broad-except
             last_exc = exc
             _context = getattr(ensurer, 'context', None)
+            if cfg.cdp_url:
+                # contexto compartido: cerrar solo la página propia
+                _context = getattr(ensurer, 'page', None)
             if _context:
                 try:
                     _context.close()
@@ -697,6 +743,7 @@ def ensure_branch(
     setattr(page, "_branch_playwright", ensurer.play)
     setattr(page, "_branch_context", ensurer.context)
     setattr(page, "_branch_browser", ensurer.browser)
+    setattr(page, "_branch_attached", bool(cfg.cdp_url))
     return page
 
 
@@ -0,0 +1,64 @@
+"""Puente para correr el motor async sobre objetos de ``playwright.sync_api``.
+
+Las extracciones (página de producto, tarjetas, búsqueda) están escritas una
+sola vez como corrutinas sobre la API async. :class:`SyncView` envuelve un
+``Page``/``Locator`` sync para que cada método devuelva un awaitable ya
+resuelto, y :func:`run_sync` corre la corrutina hasta el final sin event
+loop: como ningún ``await`` suspende, termina en el primer paso. Así las
+funciones sync (``extract_product_page``, ``run_searches``...) son wrappers
+finos del mismo código que usa ``aio.run_engine``.
+"""
+from typing import Any, Coroutine
+
+# en playwright.async_api estos métodos devuelven Locator sin await
+_LOCATOR_METHODS = frozenset({
+    'locator', 'get_by_role', 'get_by_text', 'get_by_placeholder', 'get_by_label', 'get_by_test_id',
+    'nth', 'filter', 'frame_locator',
+})
+# propiedades que devuelven objetos con métodos async
+_WRAPPED_PROPS = frozenset({'first', 'last', 'keyboard', 'mouse', 'context'})
+
+
+class _Ready:
+    """Awaitable resuelto: ``await`` devuelve ``value`` sin suspender."""
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __await__(self):
+        return self.value
+        yield  # noqa: generador que termina sin ceder
+
+
+def unwrap(obj: Any) -> Any:
+    return obj._obj if isinstance(obj, SyncView) else obj
+
+
+class SyncView:
+    """Vista awaitable de un objeto sync de Playwright (o de un doble de test)."""
+    __slots__ = ('_obj',)
+
+    def __init__(self, obj: Any):
+        self._obj = unwrap(obj)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._obj, name)
+        if not callable(attr):
+            return SyncView(attr) if name in _WRAPPED_PROPS and attr is not None else attr
+        if name in _LOCATOR_METHODS:
+            return lambda *a, **kw: SyncView(attr(*map(unwrap, a), **{k: unwrap(v) for k, v in kw.items()}))
+        return lambda *a, **kw: _Ready(attr(*map(unwrap, a), **{k: unwrap(v) for k, v in kw.items()}))
+
+    def __bool__(self) -> bool:
+        return bool(self._obj)
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """Resultado de ``coro`` (que solo espera objetos :class:`SyncView`)."""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    coro.close()
+    raise RuntimeError('el motor quedó esperando algo que no viene de una página sync')
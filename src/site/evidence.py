@@ -0,0 +1,268 @@
+"""Escritura de evidencia fuera del camino crítico del scraping.
+
+Las capturas (bytes PNG que devuelve ``page.screenshot()`` sin ``path``) y
+los volcados HTML se encolan en un writer de fondo y el scraper sigue con
+la próxima URL mientras se escriben a disco. La cola está acotada en bytes:
+si se llena, ``submit_evidence`` bloquea hasta que el writer libere lugar.
+
+``flush_evidence()`` espera a que la cola quede vacía y devuelve el resumen
+del writer; el CLI lo llama antes de informar el resultado de la corrida
+(evento ``evidence_flush``).
+
+Con ``configure_evidence(store=EvidenceStore(...))`` el writer guarda en el
+store direccionado por contenido (:mod:`src.site.evidence_store`) en lugar
+de escribir archivos sueltos.
+
+La política de capturas (``configure_evidence(screenshots=...)``) decide
+qué se captura y cómo:
+
+- ``none``: sin capturas.
+- ``sampled``: 1 de cada ``sample_every`` ítems más todas las fallas.
+- ``clip``: solo la región de título/precio (selectores existentes); si no
+  se encuentra, el viewport.
+- ``full``: página completa (comportamiento anterior).
+
+``format`` es ``png``, ``jpeg`` o ``webp`` con ``quality``. Playwright no
+genera WebP: se captura PNG y se recodifica con Pillow en el writer (sin
+Pillow se usa JPEG).
+"""
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+Payload = Union[bytes, str]
+
+
+class EvidenceWriter:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, store=None):
+        self.max_bytes = int(max_bytes)
+        self.store = store
+        self._cond = threading.Condition()
+        self._items: deque = deque()
+        self._pending = 0
+        self._writing = 0
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, Any] = {'files': 0, 'bytes': 0, 'errors': 0, 'max_pending_bytes': 0,
+                                      'blocked_ms': 0.0, 'write_ms': 0.0, 'dedup': 0}
+
+    def submit(self, path: Union[str, Path], data: Payload,
+               transform: Optional[Callable[[bytes], bytes]] = None) -> None:
+        """Encola ``data`` para ``path``; ``transform`` corre en el writer."""
+        raw = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        size = len(raw)
+        with self._cond:
+            t0 = time.perf_counter()
+            # un item más grande que el tope pasa solo cuando la cola está vacía
+            while self._pending and self._pending + size > self.max_bytes:
+                self._cond.wait()
+            self.stats['blocked_ms'] += (time.perf_counter() - t0) * 1000
+            self._items.append((str(path), raw, transform))
+            self._pending += size
+            self.stats['max_pending_bytes'] = max(self.stats['max_pending_bytes'], self._pending)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='evidence-writer', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._items:
+                    self._cond.wait()
+                path, raw, transform = self._items.popleft()
+                self._writing += 1
+            t0 = time.perf_counter()
+            ok = True
+            written = 0
+            try:
+                out = transform(raw) if transform else raw
+                if self.store is not None and self.store.locate(path):
+                    written = self.store.put(path, out)['stored']
+                else:
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                    with open(path, 'wb') as f:
+                        f.write(out)
+                    written = len(out)
+            except Exception:
+                ok = False
+            with self._cond:
+                self._writing -= 1
+                self._pending -= len(raw)
+                self.stats['write_ms'] += (time.perf_counter() - t0) * 1000
+                if ok:
+                    self.stats['files'] += 1
+                    self.stats['bytes'] += written
+                    self.stats['dedup'] += int(written == 0 and self.store is not None)
+                else:
+                    self.stats['errors'] += 1
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todo lo encolado esté en disco; ``False`` si vence ``timeout``."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._items or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def summary(self) -> Dict[str, Any]:
+        with self._cond:
+            out = dict(self.stats, pending=len(self._items) + self._writing)
+        out['blocked_ms'] = round(out['blocked_ms'], 1)
+        out['write_ms'] = round(out['write_ms'], 1)
+        return out
+
+
+_WRITER = EvidenceWriter(int(os.environ.get('EVIDENCE_QUEUE_BYTES', DEFAULT_MAX_BYTES)))
+
+
+SCREENSHOT_MODES = ('none', 'sampled', 'clip', 'full')
+_POLICY: Dict[str, Any] = {'mode': 'full', 'sample_every': 10, 'format': 'png', 'quality': 70}
+_SHOTS_LOCK = threading.Lock()
+_SHOTS: Dict[str, int] = {'taken': 0, 'skipped': 0, 'clipped': 0}
+_SEQ = itertools.count()
+
+# union de los rectangulos de los primeros nodos de ``css``, en coordenadas del documento
+_CLIP_JS = """
+({css, limit}) => {
+  let nodes = [];
+  try { nodes = Array.from(document.querySelectorAll(css)).slice(0, limit); } catch (e) {}
+  let box = null;
+  for (const n of nodes) {
+    const r = n.getBoundingClientRect();
+    if (!r.width || !r.height) continue;
+    const x0 = r.left + window.scrollX, y0 = r.top + window.scrollY;
+    const x1 = x0 + r.width, y1 = y0 + r.height;
+    box = box ? {x0: Math.min(box.x0, x0), y0: Math.min(box.y0, y0), x1: Math.max(box.x1, x1), y1: Math.max(box.y1, y1)}
+              : {x0, y0, x1, y1};
+  }
+  return box;
+}
+"""
+
+
+def _pillow_webp(quality: int) -> Optional[Callable[[bytes], bytes]]:
+    try:
+        from PIL import Image
+    except Exception:
+        return None
+
+    def _to_webp(raw: bytes) -> bytes:
+        import io
+        out = io.BytesIO()
+        Image.open(io.BytesIO(raw)).save(out, format='WEBP', quality=quality)
+        return out.getvalue()
+    return _to_webp
+
+
+def configure_evidence(store=None, screenshots: Optional[Dict[str, Any]] = None) -> None:
+    """Activa (o desactiva con ``None``) el store y fija la política de capturas."""
+    _WRITER.flush()
+    _WRITER.store = store
+    policy = dict(_POLICY, **(screenshots or {}))
+    if policy['mode'] not in SCREENSHOT_MODES:
+        policy['mode'] = 'full'
+    policy['sample_every'] = max(1, int(policy['sample_every']))
+    policy['quality'] = int(policy['quality'])
+    _POLICY.update(policy)
+    with _SHOTS_LOCK:
+        _SHOTS.update({'taken': 0, 'skipped': 0, 'clipped': 0})
+
+
+def screenshot_mode() -> str:
+    return _POLICY['mode']
+
+
+def _should_capture(failed: bool, always: bool) -> bool:
+    mode = _POLICY['mode']
+    if mode == 'none':
+        ok = False
+    elif mode == 'sampled' and not (failed or always):
+        ok = next(_SEQ) % _POLICY['sample_every'] == 0
+    else:
+        ok = True
+    with _SHOTS_LOCK:
+        _SHOTS['taken' if ok else 'skipped'] += 1
+    return ok
+
+
+def _shot_plan(path: Union[str, Path], box: Optional[Dict[str, float]]):
+    """(kwargs de ``page.screenshot``, ruta final, transform del writer)."""
+    fmt, quality = _POLICY['format'], _POLICY['quality']
+    transform = None
+    if fmt == 'webp':
+        transform = _pillow_webp(quality)
+        fmt = 'png' if transform else 'jpeg'
+        ext = '.webp' if transform else '.jpg'
+    else:
+        ext = '.jpg' if fmt in ('jpeg', 'jpg') else '.png'
+        fmt = 'jpeg' if ext == '.jpg' else 'png'
+    kwargs: Dict[str, Any] = {'type': fmt}
+    if fmt == 'jpeg':
+        kwargs['quality'] = quality
+    if _POLICY['mode'] == 'clip':
+        if box:
+            pad = 16
+            x, y = max(0.0, box['x0'] - pad), max(0.0, box['y0'] - pad)
+            kwargs.update(full_page=True, clip={'x': x, 'y': y, 'width': box['x1'] + pad - x, 'height': box['y1'] + pad - y})
+            with _SHOTS_LOCK:
+                _SHOTS['clipped'] += 1
+    else:
+        kwargs['full_page'] = True
+    return kwargs, str(Path(path).with_suffix(ext)), transform
+
+
+def submit_evidence(path: Union[str, Path], data: Payload,
+                    transform: Optional[Callable[[bytes], bytes]] = None) -> None:
+    _WRITER.submit(path, data, transform)
+
+
+def flush_evidence(timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Vacía la cola del writer global y devuelve su resumen (``flushed``)."""
+    ok = _WRITER.flush(timeout)
+    with _SHOTS_LOCK:
+        shots = dict(_SHOTS, mode=_POLICY['mode'], format=_POLICY['format'])
+    return dict(_WRITER.summary(), flushed=ok, screenshots=shots)
+
+
+def capture_page(page, path: Union[str, Path], *, clip_css: str = '', failed: bool = False, always: bool = False) -> str:
+    """Captura según la política (sync) y encola la escritura.
+
+    ``path`` es el nombre lógico ``.png``; devuelve la ruta final (con la
+    extensión del formato) o ``''`` si la política la omitió o falló.
+    """
+    if not _should_capture(failed, always):
+        return ''
+    try:
+        box = None
+        if _POLICY['mode'] == 'clip' and clip_css:
+            box = page.evaluate(_CLIP_JS, {'css': clip_css, 'limit': 4})
+        kwargs, target, transform = _shot_plan(path, box)
+        submit_evidence(target, page.screenshot(**kwargs), transform)
+        return target
+    except Exception:
+        return ''
+
+
+async def capture_page_async(page, path: Union[str, Path], *, clip_css: str = '', failed: bool = False,
+                             always: bool = False) -> str:
+    if not _should_capture(failed, always):
+        return ''
+    try:
+        box = None
+        if _POLICY['mode'] == 'clip' and clip_css:
+            box = await page.evaluate(_CLIP_JS, {'css': clip_css, 'limit': 4})
+        kwargs, target, transform = _shot_plan(path, box)
+        submit_evidence(target, await page.screenshot(**kwargs), transform)
+        return target
+    except Exception:
+        return ''
@@ -0,0 +1,235 @@
+"""Store de evidencia direccionado por contenido.
+
+Los volcados HTML y capturas se guardan una sola vez por contenido en
+``<evidence_dir>/_blobs/<hh>/<sha256><ext>[.gz|.zst]``; cada corrida tiene un
+``manifest.jsonl`` que mapea el nombre lógico (``pinned_<item_id>.png``,
+``html/search_arroz.html``) al blob. El HTML se comprime (zstd si está
+instalado ``zstandard``, si no gzip); las imágenes ya vienen comprimidas y
+solo se deduplican.
+
+La carpeta de corrida de un archivo es su directorio, o el padre si el
+directorio se llama ``html`` (``evidence/<periodo>_<fecha>/html/x.html``).
+
+``compact()`` implementa la retención de ``evidence-compact``: migra
+archivos sueltos de corridas anteriores al store, poda corridas más viejas
+que ``keep_days`` conservando la última de cada mes y borra los blobs que
+ya no referencia ningún manifest. Solo se podan carpetas de corrida
+(``<periodo>_<fecha>``); los manifests de otras carpetas (p. ej.
+``evidence/session/``) siguen contando como referencias.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+try:  # opcional
+    import zstandard as _zstd
+except Exception:  # pragma: no cover - depende del entorno
+    _zstd = None
+
+BLOB_DIR = '_blobs'
+MANIFEST = 'manifest.jsonl'
+_TEXT_EXT = {'.html', '.htm', '.json', '.txt'}
+_RUN_RE = re.compile(r'^(\d{4}-\d{2})_(\d{4}-\d{2}-\d{2})$')
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == 'zst':
+        return _zstd.ZstdCompressor(level=10).compress(raw)
+    if codec == 'gz':
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    return raw
+
+
+def _decompress(blob: bytes, name: str) -> bytes:
+    if name.endswith('.zst'):
+        if _zstd is None:
+            raise RuntimeError('blob zstd sin el paquete zstandard instalado')
+        return _zstd.ZstdDecompressor().decompress(blob)
+    if name.endswith('.gz'):
+        return gzip.decompress(blob)
+    return blob
+
+
+class EvidenceStore:
+    def __init__(self, root: Union[str, Path], compress: str = 'gzip'):
+        self.root = Path(root)
+        self.blobs = self.root / BLOB_DIR
+        self.codec = 'zst' if (compress == 'zstd' and _zstd is not None) else ('gz' if compress != 'none' else '')
+
+    # --- ubicación -----------------------------------------------------------
+
+    def locate(self, path: Union[str, Path]) -> Optional[Tuple[Path, str]]:
+        """``(carpeta_de_corrida, nombre)`` o ``None`` si ``path`` está fuera del root."""
+        p = Path(path)
+        try:
+            p.resolve().relative_to(self.root.resolve())
+        except ValueError:
+            return None
+        run_dir = p.parent.parent if p.parent.name == 'html' else p.parent
+        return run_dir, p.relative_to(run_dir).as_posix()
+
+    # --- escritura -------------------------------------------------------------
+
+    def put(self, path: Union[str, Path], raw: bytes) -> Dict[str, Any]:
+        """Guarda ``raw`` para ``path`` y registra la entrada en el manifest."""
+        run_dir, name = self.locate(path) or (Path(path).parent, Path(path).name)
+        digest = hashlib.sha256(raw).hexdigest()
+        ext = Path(name).suffix.lower()
+        codec = self.codec if ext in _TEXT_EXT else ''
+        rel = f"{digest[:2]}/{digest}{ext}" + (f'.{codec}' if codec else '')
+        target = self.blobs / rel
+        stored = 0
+        if not target.exists():
+            data = _compress(raw, codec)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(target.name + f'.{os.getpid()}.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, target)
+            stored = len(data)
+        entry = {'name': name, 'blob': rel, 'sha256': digest, 'size': len(raw), 'stored': stored, 'ts': time.time()}
+        run_dir.mkdir(parents=True, exist_ok=True)
+        with open(run_dir / MANIFEST, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+    # --- lectura ---------------------------------------------------------------
+
+    def manifest(self, run_dir: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+        """Entradas del manifest por nombre (la última gana)."""
+        out: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(Path(run_dir) / MANIFEST, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue
+                    out[e['name']] = e
+        except OSError:
+            pass
+        return out
+
+    def names(self, run_dir: Union[str, Path]) -> List[str]:
+        """Nombres de evidencia de una corrida: manifest + archivos sueltos."""
+        run_dir = Path(run_dir)
+        names = set(self.manifest(run_dir))
+        for sub in (run_dir, run_dir / 'html'):
+            if sub.is_dir():
+                for p in sub.iterdir():
+                    if p.is_file() and p.name != MANIFEST and not p.name.endswith('.jsonl'):
+                        names.add(p.relative_to(run_dir).as_posix())
+        return sorted(names)
+
+    def path_of(self, run_dir: Union[str, Path], name: str) -> Optional[Path]:
+        """Archivo en disco de ``name``: el suelto o el blob (comprimido si es texto)."""
+        plain = Path(run_dir) / name
+        if plain.is_file():
+            return plain
+        entry = self.manifest(run_dir).get(name)
+        return self.blobs / entry['blob'] if entry else None
+
+    def read(self, run_dir: Union[str, Path], name: str,
+             manifest: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[bytes]:
+        """Contenido de ``name``; ``manifest`` evita releerlo en lecturas en lote."""
+        plain = Path(run_dir) / name
+        if plain.is_file():
+            return plain.read_bytes()
+        entry = (self.manifest(run_dir) if manifest is None else manifest).get(name)
+        if not entry:
+            return None
+        try:
+            return _decompress((self.blobs / entry['blob']).read_bytes(), entry['blob'])
+        except OSError:
+            return None
+
+    # --- retención -------------------------------------------------------------
+
+    def _run_dirs(self) -> List[Path]:
+        if not self.root.is_dir():
+            return []
+        return sorted(p for p in self.root.iterdir() if p.is_dir() and _RUN_RE.match(p.name))
+
+    def migrate(self, run_dir: Path) -> Tuple[int, int]:
+        """Pasa al store los archivos sueltos de ``run_dir``; devuelve (archivos, bytes liberados)."""
+        files = freed = 0
+        for sub in (run_dir, run_dir / 'html'):
+            if not sub.is_dir():
+                continue
+            for p in sorted(sub.iterdir()):
+                if not p.is_file() or p.suffix.lower() not in (_TEXT_EXT | {'.png', '.jpg', '.jpeg', '.webp'}):
+                    continue
+                size = p.stat().st_size
+                entry = self.put(p, p.read_bytes())
+                p.unlink()
+                files += 1
+                freed += size - entry['stored']
+        return files, freed
+
+    def compact(self, keep_days: int = 45, today: Optional[date] = None, dry_run: bool = False) -> Dict[str, Any]:
+        today = today or datetime.now().date()
+        stats = {'runs': 0, 'runs_pruned': 0, 'monthly_samples': 0, 'files_migrated': 0,
+                 'blobs_deleted': 0, 'bytes_freed': 0, 'dry_run': dry_run}
+        runs = self._run_dirs()
+        stats['runs'] = len(runs)
+        old_by_month: Dict[str, List[Path]] = {}
+        keep: List[Path] = []
+        for run in runs:
+            run_date = date.fromisoformat(_RUN_RE.match(run.name).group(2))
+            if (today - run_date).days > keep_days:
+                old_by_month.setdefault(run_date.isoformat()[:7], []).append(run)
+            else:
+                keep.append(run)
+        for month_runs in old_by_month.values():
+            # una muestra por mes: la última corrida del mes
+            month_runs.sort(key=lambda p: _RUN_RE.match(p.name).group(2))
+            keep.append(month_runs[-1])
+            stats['monthly_samples'] += 1
+            for run in month_runs[:-1]:
+                stats['runs_pruned'] += 1
+                stats['bytes_freed'] += _dir_size(run)
+                if not dry_run:
+                    shutil.rmtree(run, ignore_errors=True)
+        if dry_run:
+            return stats
+        for run in keep + [self.root]:
+            files, freed = self.migrate(run)
+            stats['files_migrated'] += files
+            stats['bytes_freed'] += freed
+        referenced = set()
+        for path in sorted(self.root.rglob(MANIFEST)):
+            if self.blobs in path.parents:
+                continue
+            entries = self.manifest(path.parent)
+            if entries:
+                self._rewrite_manifest(path.parent, entries)
+            referenced.update(e['blob'] for e in entries.values())
+        for blob in _iter_files(self.blobs):
+            rel = blob.relative_to(self.blobs).as_posix()
+            if rel not in referenced:
+                stats['blobs_deleted'] += 1
+                stats['bytes_freed'] += blob.stat().st_size
+                blob.unlink()
+        return stats
+
+    def _rewrite_manifest(self, run_dir: Path, entries: Dict[str, Dict[str, Any]]) -> None:
+        # deja una línea por nombre (el manifest es append-only durante la corrida)
+        tmp = run_dir / (MANIFEST + '.tmp')
+        tmp.write_text(''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in entries.values()), encoding='utf-8')
+        os.replace(tmp, run_dir / MANIFEST)
+
+
+def _iter_files(root: Path) -> Iterable[Path]:
+    if not root.is_dir():
+        return []
+    return [p for p in root.rglob('*') if p.is_file()]
+
+
+def _dir_size(root: Path) -> int:
+    return sum(p.stat().st_size for p in _iter_files(root))
@@ -1,5 +1,9 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from .bridge import SyncView, run_sync, unwrap
+from .product import _soup
+from .selector_plan import first_present
 
 
 def parse_price_ar(text: str):
@@ -28,36 +32,16 @@ def parse_price_ar(text: str):
 
 
 def _loc_try(card, page, specs):
-    import re as _re
-    for spec in specs:
-        if 'css' in spec:
-            l = card.locator(spec['css'])
-        elif 'text' in spec:
-            l = card.get_by_text(_re.compile(spec['text']))
-        elif 'role' in spec:
-            name = _re.compile(spec['name']) if spec.get('name') else None
-            l = card.get_by_role(spec['role'], name=name)
-        else:
-            continue
-        try:
-            if l and l.count() > 0:
-                return l.first
-        except Exception:
-            continue
-    return None
-
+    """Versión sync de :func:`~src.site.selector_plan.first_present` sobre una tarjeta."""
+    return unwrap(run_sync(first_present(SyncView(card), specs)))
 
-def extract_card_fields(page, card, selectors: Dict[str, Any]) -> Dict[str, Any]:
-    title_specs = selectors.get('title', [])
-    price_specs = selectors.get('price_now', [])
-    oos_specs = selectors.get('oos_flag', [])
-    add_specs = selectors.get('add_to_cart_button', [])
 
+async def extract_card_fields_async(card, selectors: Dict[str, Any]) -> Dict[str, Any]:
     title_text = ''
     try:
-        tl = _loc_try(card, page, title_specs)
+        tl = await first_present(card, selectors.get('title', []))
         if tl:
-            title_text = tl.inner_text().strip()
+            title_text = (await tl.inner_text()).strip()
     except Exception:
         title_text = ''
 
@@ -66,54 +50,49 @@ def extract_card_fields(page, card, selectors: Dict[str, Any]) -> Dict[str, Any]
     price_original_text = ''
     try:
         # Look for explicit "Ahora" and "Antes" in full card text
-        full = card.inner_text()
+        full = await card.inner_text()
         m_now = re.search(r"Ahora[^$]*\$\s*([\d\.,]+)", full, re.I)
         m_before = re.search(r"Antes[^$]*\$\s*([\d\.,]+)", full, re.I)
         if m_now:
             price_text = f"$ {m_now.group(1)}"
-        pl = _loc_try(card, page, price_specs)
-        if not price_text and pl:
-            price_text = pl.inner_text().strip()
+        if not price_text:
+            pl = await first_present(card, selectors.get('price_now', []))
+            if pl:
+                price_text = (await pl.inner_text()).strip()
         if m_before:
             price_original_text = f"$ {m_before.group(1)}"
         if not price_original_text:
-            pol = _loc_try(card, page, selectors.get('price_original', []))
+            pol = await first_present(card, selectors.get('price_original', []))
             if pol:
-                price_original_text = pol.inner_text().strip()
+                price_original_text = (await pol.inner_text()).strip()
     except Exception:
         price_text = ''
 
     in_stock = True
     try:
-        if _loc_try(card, page, oos_specs):
+        if await first_present(card, selectors.get('oos_flag', [])):
             in_stock = False
     except Exception:
         pass
     # Add-to-cart button heuristic
     try:
-        btn = _loc_try(card, page, add_specs)
-        if btn:
-            try:
-                if not btn.is_enabled() or not btn.is_visible():
-                    in_stock = False
-            except Exception:
-                pass
+        btn = await first_present(card, selectors.get('add_to_cart_button', []))
+        if btn and (not await btn.is_enabled() or not await btn.is_visible()):
+            in_stock = False
     except Exception:
         pass
 
     promo_flag = False
     try:
         # Heuristic: presence of Antes price or class
-        if card.get_by_text(re.compile(r'Antes', re.I)).count() > 0:
+        if await card.get_by_text(re.compile(r'Antes', re.I)).count() > 0:
             promo_flag = True
     except Exception:
         pass
 
     url = ''
     try:
-        a = card.locator('a').first
-        href = a.get_attribute('href')
-        url = href or ''
+        url = (await card.locator('a').first.get_attribute('href')) or ''
     except Exception:
         url = ''
 
@@ -131,3 +110,221 @@ def extract_card_fields(page, card, selectors: Dict[str, Any]) -> Dict[str, Any]
         'price_original': price_original,
         'price_promo': price if promo_flag else None,
     }
+
+
+def extract_card_fields(page, card, selectors: Dict[str, Any]) -> Dict[str, Any]:
+    """:func:`extract_card_fields_async` sobre un locator de ``playwright.sync_api``."""
+    return run_sync(extract_card_fields_async(SyncView(card), selectors))
+
+
+# Inputs ocultos de imetrics (dataLayer) que el sitio renderiza por cada tarjeta:
+# id="<campo>_item_imetrics_<art>" value="...". Permiten armar los candidatos
+# de una búsqueda desde un solo page.content(), sin locators por tarjeta.
+_IMETRICS_ID = re.compile(r'^([a-z_]+?)_item_imetrics_(\d+)$', re.I)
+_SINSTOCK_ID = re.compile(r'^btnagregarcarritosinstock_(.+)$', re.I)
+
+
+def _imetrics_price(val: str):
+    # imetrics usa punto de miles y coma decimal: "1.500" / "1200,00"
+    raw = (val or '').replace('$', '').replace(' ', '')
+    if not raw:
+        return None
+    try:
+        v = float(raw.replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+    return v if v > 0 else None
+
+
+def parse_imetrics_cards(html: str) -> List[Dict[str, Any]]:
+    """Candidatos de búsqueda a partir de los inputs imetrics del HTML.
+
+    Devuelve dicts con las mismas claves que :func:`extract_card_fields`, en
+    el orden en que aparecen los artículos. Lista vacía si la página no trae
+    imetrics (el llamador cae al scraping DOM).
+    """
+    if 'imetrics' not in (html or ''):
+        return []
+    soup = _soup(html)
+    items: Dict[str, Dict[str, str]] = {}
+    for node in soup.select("input[id*='_item_imetrics_']"):
+        m = _IMETRICS_ID.match(node.get('id', ''))
+        if m:
+            items.setdefault(m.group(2), {}).setdefault(m.group(1).lower(), (node.get('value') or '').strip())
+    links: Dict[str, tuple] = {}
+    for node in soup.select("a[id^='btn_nombre_imetrics_']"):
+        links.setdefault(node['id'].rsplit('_', 1)[-1], (node.get('href', ''), node.get_text(' ', strip=True)))
+    stock: Dict[str, bool] = {}
+    for node in soup.select("div[id^='btnagregarcarritosinstock_']"):
+        # el cartel "sin stock" está oculto cuando hay stock
+        m = _SINSTOCK_ID.match(node.get('id', ''))
+        if m:
+            stock.setdefault(m.group(1), 'display:none' in (node.get('style') or '').replace(' ', '').lower())
+
+    cards: List[Dict[str, Any]] = []
+    for art, f in items.items():
+        href, link_text = links.get(art, ('', ''))
+        title = f.get('name') or link_text
+        price_list = _imetrics_price(f.get('precio', ''))
+        offer = _imetrics_price(f.get('precio_oferta', ''))
+        price = offer or price_list
+        if not title or not price:
+            continue
+        before = max([v for v in (price_list, _imetrics_price(f.get('precio_anterior', ''))) if v] or [price])
+        price_original = before if before > price else price
+        promo_flag = price_original > price
+        cards.append({
+            'title': title,
+            'price_final': price,
+            'promo_flag': promo_flag,
+            'in_stock': stock.get(f.get('sku', ''), True),
+            'url': href,
+            'price_original': price_original,
+            'price_promo': price if promo_flag else None,
+        })
+    return cards
+
+
+# --- Extracción offline de tarjetas (un page.content() por página) ---------
+
+# get_by_role aproximado con css para el HTML estático
+_ROLE_CSS = {
+    'button': "button, [role=button], input[type=button], input[type=submit]",
+    'link': "a[href], [role=link]",
+    'textbox': "input:not([type]), input[type=text], input[type=search], textarea, [role=textbox]",
+}
+
+
+def compile_card_plan(selectors: Dict[str, Any]) -> Dict[str, Any]:
+    """Precompila los specs de ``selectors.json`` que usa una tarjeta.
+
+    Cada clave queda como lista de tuplas ``(kind, css, regex)`` para no
+    recompilar regex por tarjeta. Los specs sin equivalente estático
+    (placeholder) se descartan.
+    """
+    def _specs(key):
+        out = []
+        for spec in selectors.get(key, []):
+            if 'css' in spec:
+                out.append(('css', spec['css'], None))
+            elif 'text' in spec:
+                out.append(('text', None, re.compile(spec['text'])))
+            elif 'role' in spec and spec['role'] in _ROLE_CSS:
+                out.append(('role', _ROLE_CSS[spec['role']], re.compile(spec['name']) if spec.get('name') else None))
+        return out
+
+    return {
+        'card_root': [spec['css'] for spec in selectors.get('product_card_root', []) if 'css' in spec],
+        'title': _specs('title'),
+        'price_now': _specs('price_now'),
+        'price_original': _specs('price_original'),
+        'oos_flag': _specs('oos_flag'),
+        'add_to_cart_button': _specs('add_to_cart_button'),
+    }
+
+
+def _node_name(node) -> str:
+    return (node.get('aria-label') or node.get('value') or node.get_text(' ', strip=True) or '').strip()
+
+
+def _node_first(card, specs):
+    for kind, css, pat in specs:
+        if kind == 'text':
+            hit = card.find(string=pat)
+            if hit is not None:
+                return hit.parent
+            continue
+        try:
+            nodes = card.select(css)
+        except Exception:
+            continue
+        for node in nodes:
+            if kind == 'css' or pat is None or pat.search(_node_name(node)):
+                return node
+    return None
+
+
+def _node_hidden(node, card) -> bool:
+    # is_visible() offline: display:none / hidden en el nodo o sus ancestros dentro de la tarjeta
+    while node is not None:
+        style = (node.get('style') or '').replace(' ', '').lower()
+        if 'display:none' in style or 'visibility:hidden' in style or node.has_attr('hidden'):
+            return True
+        if node is card:
+            break
+        node = node.parent
+    return False
+
+
+def _card_fields(card, plan: Dict[str, Any]) -> Dict[str, Any]:
+    # Mismo criterio que extract_card_fields, sobre el árbol estático
+    title_text = ''
+    tl = _node_first(card, plan['title'])
+    if tl is not None:
+        title_text = tl.get_text(' ', strip=True)
+
+    price_text = ''
+    price_original_text = ''
+    full = card.get_text(' ')
+    m_now = re.search(r"Ahora[^$]*\$\s*([\d\.,]+)", full, re.I)
+    m_before = re.search(r"Antes[^$]*\$\s*([\d\.,]+)", full, re.I)
+    if m_now:
+        price_text = f"$ {m_now.group(1)}"
+    if not price_text:
+        pl = _node_first(card, plan['price_now'])
+        if pl is not None:
+            price_text = pl.get_text('', strip=True)
+    if m_before:
+        price_original_text = f"$ {m_before.group(1)}"
+    if not price_original_text:
+        pol = _node_first(card, plan['price_original'])
+        if pol is not None:
+            price_original_text = pol.get_text('', strip=True)
+
+    in_stock = _node_first(card, plan['oos_flag']) is None
+    btn = _node_first(card, plan['add_to_cart_button'])
+    if btn is not None and (btn.has_attr('disabled') or _node_hidden(btn, card)):
+        in_stock = False
+
+    promo_flag = card.find(string=re.compile(r'Antes', re.I)) is not None
+
+    a = card.find('a')
+    url = (a.get('href') or '') if a is not None else ''
+
+    price = parse_price_ar(price_text) if price_text else None
+    price_original = parse_price_ar(price_original_text) if price_original_text else None
+    if price and not price_original:
+        price_original = price
+
+    return {
+        'title': title_text,
+        'price_final': price,
+        'promo_flag': promo_flag or (price_original and price and price_original > price),
+        'in_stock': in_stock,
+        'url': url,
+        'price_original': price_original,
+        'price_promo': price if promo_flag else None,
+    }
+
+
+def extract_cards_html(html: str, plan: Dict[str, Any], limit: int = 60) -> List[Dict[str, Any]]:
+    """Campos de todas las tarjetas de un HTML de resultados.
+
+    ``plan`` sale de :func:`compile_card_plan`. Usa el primer selector de
+    ``product_card_root`` con coincidencias (o ``article``) y devuelve, por
+    tarjeta, el mismo dict que :func:`extract_card_fields`.
+    """
+    soup = _soup(html or '')
+    for tag in soup(['script', 'style', 'noscript']):
+        tag.decompose()
+    cards = []
+    for css in plan['card_root']:
+        try:
+            cards = soup.select(css)
+        except Exception:
+            continue
+        if cards:
+            break
+    if not cards:
+        cards = soup.select('article')
+    return [_card_fields(card, plan) for card in cards[:limit]]
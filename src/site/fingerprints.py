@@ -0,0 +1,116 @@
+"""Huellas por URL de producto para re-fetch condicional.
+
+``data/fingerprints.json`` guarda, por URL, los validadores HTTP (ETag /
+Last-Modified), un hash del bloque de precio extraído y el último resultado.
+Con eso:
+
+- el fetch HTTP manda ``If-None-Match`` / ``If-Modified-Since`` y un 304
+  reutiliza el último resultado;
+- si el precio no cambió se omiten la captura full-page y el volcado HTML
+  (queda registrada la última evidencia);
+- ``is_due`` espacia el re-chequeo de ítems estables (backoff exponencial)
+  y mantiene diarios los volátiles.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_STORE = Path("data/fingerprints.json")
+
+# campos que definen "cambió el precio" para una página de producto
+_PRICE_FIELDS = ('title', 'price_final', 'price_original', 'promo_flag', 'in_stock')
+
+
+def price_hash(res: Dict[str, Any]) -> str:
+    block = '|'.join(str(res.get(k)) for k in _PRICE_FIELDS)
+    return hashlib.sha1(block.encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    def __init__(self, path: Path = DEFAULT_STORE, base_hours: float = 20, max_days: float = 7):
+        self.path = Path(path)
+        self.base_hours = float(base_hours)
+        self.max_days = float(max_days)
+        self._lock = threading.Lock()
+        self.stats = {'unchanged': 0, 'changed': 0, 'not_modified': 0}
+        try:
+            self.data: Dict[str, Dict[str, Any]] = json.loads(self.path.read_text(encoding='utf-8'))
+        except Exception:
+            self.data = {}
+
+    def get(self, url: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.data.get(url) or {})
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Headers condicionales para el GET (vacío si no hay validadores)."""
+        fp = self.get(url)
+        headers = {}
+        if fp.get('etag'):
+            headers['If-None-Match'] = fp['etag']
+        if fp.get('last_modified'):
+            headers['If-Modified-Since'] = fp['last_modified']
+        return headers
+
+    def last_result(self, url: str) -> Optional[Dict[str, Any]]:
+        """Último resultado con precio (``None`` si no lo hay)."""
+        res = self.get(url).get('result')
+        return dict(res) if res and res.get('price_final') else None
+
+    def observe(self, url: str, res: Dict[str, Any], *, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                not_modified: bool = False, now: Optional[float] = None) -> bool:
+        """Registra una extracción; devuelve ``True`` si el precio cambió (o es nueva).
+
+        Solo para resultados con ``price_final``: un fallo no es una huella.
+        """
+        now = now or time.time()
+        h = price_hash(res)
+        with self._lock:
+            fp = self.data.setdefault(url, {})
+            changed = (not not_modified) and fp.get('hash') != h
+            if changed:
+                fp['stable_runs'] = 0
+                fp['last_changed'] = now
+            else:
+                fp['stable_runs'] = int(fp.get('stable_runs', 0)) + 1
+            fp['hash'] = h
+            fp['last_checked'] = now
+            fp['result'] = {k: res.get(k) for k in ('title', 'price_final', 'price_original', 'price_promo', 'promo_flag', 'in_stock', 'url')}
+            if etag:
+                fp['etag'] = etag
+            if last_modified:
+                fp['last_modified'] = last_modified
+            key = 'not_modified' if not_modified else ('changed' if changed else 'unchanged')
+            self.stats[key] += 1
+        return changed
+
+    def note_evidence(self, url: str, path: str) -> None:
+        with self._lock:
+            self.data.setdefault(url, {})['evidence'] = path
+
+    def interval_hours(self, url: str) -> float:
+        fp = self.get(url)
+        stable = int(fp.get('stable_runs', 0))
+        # sin stock se sigue de cerca: puede volver en cualquier momento
+        if (fp.get('result') or {}).get('in_stock') is False:
+            stable = 0
+        return min(self.max_days * 24, self.base_hours * (2 ** min(stable, 16)))
+
+    def is_due(self, url: str, now: Optional[float] = None) -> bool:
+        fp = self.get(url)
+        if not fp.get('last_checked') or not fp.get('result'):
+            return True
+        now = now or time.time()
+        return (now - float(fp['last_checked'])) >= self.interval_hours(url) * 3600
+
+    def save(self) -> None:
+        with self._lock:
+            payload = json.dumps(self.data, ensure_ascii=False, indent=1)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(str(self.path) + '.tmp')
+        tmp.write_text(payload, encoding='utf-8')
+        os.replace(tmp, self.path)
@@ -0,0 +1,126 @@
+"""Descarga de páginas de producto por HTTP, sin navegador.
+
+Las páginas ``art_NNNN`` se renderizan en el servidor, así que alcanza con
+un GET con las cookies de sucursal guardadas por ``branch.py`` en
+``storage_state.json``. Si no aparece el precio, el job queda marcado como
+*miss* para que el llamador lo reintente con Playwright; un 404/410 es un
+producto dado de baja y no se reintenta.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .evidence import submit_evidence
+from .product import GONE_STATUSES, parse_product_html
+
+DEFAULT_STORAGE_STATE = Path("data/storage_state.json")
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+def build_session(storage_state_path: Optional[Path] = DEFAULT_STORAGE_STATE, pool_size: int = 8,
+                  user_agent: str = DEFAULT_USER_AGENT) -> requests.Session:
+    """Sesión keep-alive con pool de conexiones y cookies del storage_state."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': user_agent, 'Accept-Language': 'es-AR,es;q=0.9'})
+    if storage_state_path and Path(storage_state_path).exists():
+        try:
+            state = json.loads(Path(storage_state_path).read_text(encoding='utf-8'))
+        except Exception:
+            state = {}
+        for c in state.get('cookies', []):
+            try:
+                session.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path', '/'))
+            except Exception:
+                continue
+    return session
+
+
+def fetch_product_http(session: requests.Session, url: str, selectors: Dict[str, Any], html_dump_dir: str = '',
+                       save_basename: str = '', timeout: float = 15, fingerprints=None) -> Tuple[Optional[Dict[str, Any]], int]:
+    """GET + parse de una página de producto: ``(resultado, status HTTP)``.
+
+    El resultado es ``None`` si no hubo precio (o el status no fue 200).
+
+    Con ``fingerprints`` el GET es condicional: un 304 devuelve el último
+    resultado guardado y un precio sin cambios no vuelve a volcar el HTML.
+    """
+    headers = fingerprints.validators(url) if fingerprints is not None else {}
+    resp = session.get(url, timeout=timeout, headers=headers or None)
+    if resp.status_code == 304 and fingerprints is not None:
+        res = fingerprints.last_result(url)
+        if res and res.get('price_final'):
+            fingerprints.observe(url, res, not_modified=True)
+            return res, resp.status_code
+        resp = session.get(url, timeout=timeout)
+    if resp.status_code != 200:
+        return None, resp.status_code
+    resp.encoding = resp.encoding or 'utf-8'
+    html = resp.text
+    res = parse_product_html(html, url, selectors)
+    if not res.get('price_final'):
+        return None, resp.status_code
+    if fingerprints is not None and not fingerprints.observe(
+            url, res, etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified')):
+        return res, resp.status_code
+    if html_dump_dir and save_basename:
+        submit_evidence(os.path.join(html_dump_dir, f'{save_basename}.html'), html)
+    return res, resp.status_code
+
+
+def fetch_pinned_http(jobs: List[Dict[str, Any]], selectors: Dict[str, Any], html_dump_dir: str = '',
+                      workers: int = 8, storage_state_path: Optional[Path] = DEFAULT_STORAGE_STATE,
+                      fingerprints=None, on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Procesa ``jobs`` por HTTP en paralelo.
+
+    Devuelve ``{'outcomes': [...], 'misses': [idx...], 'gone': [idx...], 'seconds': float}``;
+    ``outcomes`` respeta el orden de ``jobs`` (con el ``status`` HTTP),
+    ``misses`` son los índices que necesitan fallback a navegador y ``gone``
+    los que respondieron 404/410 (error ``HTTP <status>``, sin fallback).
+    """
+    t0 = time.perf_counter()
+    n = max(1, int(workers or 1))
+    session = build_session(storage_state_path, pool_size=n)
+
+    def _one(i: int) -> Dict[str, Any]:
+        job = jobs[i]
+        t_item = time.perf_counter()
+        try:
+            res, status = fetch_product_http(session, job['url'], selectors, html_dump_dir, job.get('save_basename', ''),
+                                             fingerprints=fingerprints)
+            out = {'result': res, 'error': f'HTTP {status}' if status in GONE_STATUSES else None, 'status': status,
+                   'worker': 'http', 'seconds': round(time.perf_counter() - t_item, 3)}
+        except Exception as e:
+            out = {'result': None, 'error': str(e), 'status': None, 'worker': 'http',
+                   'seconds': round(time.perf_counter() - t_item, 3)}
+        if on_result and out['result'] is not None:
+            try:
+                on_result(i, out)
+            except Exception:
+                pass
+        return out
+
+    try:
+        with ThreadPoolExecutor(max_workers=n) as ex:
+            outcomes = list(ex.map(_one, range(len(jobs))))
+    finally:
+        session.close()
+    gone = [i for i, o in enumerate(outcomes) if o['status'] in GONE_STATUSES]
+    misses = [i for i, o in enumerate(outcomes) if o['result'] is None and o['status'] not in GONE_STATUSES]
+    return {
+        'outcomes': outcomes,
+        'misses': misses,
+        'gone': gone,
+        'seconds': round(time.perf_counter() - t0, 3),
+    }
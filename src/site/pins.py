@@ -0,0 +1,141 @@
+"""Alta y baja automática de pins a partir del historial de corridas.
+
+``data/pin_history.json`` guarda, por ítem, las últimas observaciones
+(una por fecha y etapa): la URL que ganó la búsqueda o la del pin visitado y
+si hubo precio con stock (``ok``), sin stock (``oos``), la página respondió
+404/410 (``dead``, producto dado de baja) o la visita falló o no dio precio
+por otro motivo (``error``: timeouts, selectores, bloqueos; no cuenta para
+la baja).
+
+Con eso :class:`PinManager` decide al cierre de cada corrida:
+
+- promover a pin el ganador de búsqueda que repitió la misma URL con stock
+  en las últimas ``promote_after`` corridas;
+- bajar el pin cuya URL quedó ``dead`` ``demote_dead_after`` veces seguidas
+  o sin stock ``demote_oos_after`` veces seguidas; la URL queda vetada para
+  ese ítem por ``ban_days`` días (``apply`` la saca del mapa de pins y no se
+  vuelve a promover) y el ítem vuelve a resolverse por búsqueda. Vencido el
+  veto, la URL puede volver a pin si la búsqueda la repite.
+"""
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .product import GONE_STATUSES
+
+DEFAULT_HISTORY = Path("data/pin_history.json")
+
+# observaciones guardadas por ítem
+HISTORY_LEN = 10
+
+
+def outcome_status(result: Optional[Dict[str, Any]], error: Optional[str] = None, status: Optional[int] = None) -> str:
+    """``dead`` solo con un 404/410 (``status`` del GET o ``http_status`` del navegador)."""
+    if status is None:
+        status = (result or {}).get('http_status')
+    if status in GONE_STATUSES:
+        return 'dead'
+    if error or not result or not result.get('price_final'):
+        return 'error'
+    return 'ok' if result.get('in_stock', True) else 'oos'
+
+
+class PinManager:
+    def __init__(self, run_date: str, path: Path = DEFAULT_HISTORY, promote_after: int = 3,
+                 demote_dead_after: int = 2, demote_oos_after: int = 5, ban_days: int = 30):
+        self.path = Path(path)
+        self.run_date = run_date
+        self.promote_after = max(1, int(promote_after))
+        self.demote_dead_after = max(1, int(demote_dead_after))
+        self.demote_oos_after = max(1, int(demote_oos_after))
+        self.ban_days = max(1, int(ban_days))
+        self.stats = {'observed': 0, 'promoted': 0, 'demoted': 0, 'banned_skipped': 0, 'bans_expired': 0}
+        try:
+            self.data: Dict[str, Dict[str, Any]] = json.loads(self.path.read_text(encoding='utf-8'))
+        except Exception:
+            self.data = {}
+
+    def _item(self, item_id: str) -> Dict[str, Any]:
+        return self.data.setdefault(item_id, {'runs': [], 'banned': {}})
+
+    def _bans(self, item: Dict[str, Any]) -> Dict[str, str]:
+        """URL → fecha de la baja, sin los vetos vencidos."""
+        bans = item.setdefault('banned', {})
+        # historial previo al vencimiento: el veto corre desde hoy
+        for url in item.pop('banned_urls', []):
+            bans.setdefault(url, self.run_date)
+        for url, since in list(bans.items()):
+            if (date.fromisoformat(self.run_date) - date.fromisoformat(since)).days >= self.ban_days:
+                del bans[url]
+                self.stats['bans_expired'] += 1
+        return bans
+
+    def _observe(self, item_id: str, stage: str, url: str, status: str) -> None:
+        if not item_id or not url:
+            return
+        runs = self._item(item_id)['runs']
+        # una observación por fecha y etapa: re-correr el mismo día no suma consistencia
+        runs[:] = [r for r in runs if not (r['date'] == self.run_date and r['stage'] == stage)]
+        runs.append({'date': self.run_date, 'stage': stage, 'url': url, 'status': status})
+        del runs[:-HISTORY_LEN]
+        self.stats['observed'] += 1
+
+    def observe_search(self, item_id: str, row: Dict[str, Any]) -> None:
+        self._observe(item_id, 'search', row.get('url') or '', outcome_status(row))
+
+    def observe_pinned(self, item_id: str, url: str, result: Optional[Dict[str, Any]], error: Optional[str] = None,
+                       status: Optional[int] = None) -> None:
+        self._observe(item_id, 'pinned', url, outcome_status(result, error, status))
+
+    def apply(self, pins_map: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """``pins_map`` sin las URLs vetadas (esos ítems vuelven a búsqueda)."""
+        out = {}
+        for iid, pin in pins_map.items():
+            if (pin or {}).get('url') and iid in self.data and pin['url'] in self._bans(self.data[iid]):
+                self.stats['banned_skipped'] += 1
+                continue
+            out[iid] = pin
+        return out
+
+    def _streak(self, runs: List[Dict[str, Any]], stage: str, url: str, status: str) -> int:
+        n = 0
+        for r in reversed([r for r in runs if r['stage'] == stage]):
+            if r['url'] != url or r['status'] != status:
+                break
+            n += 1
+        return n
+
+    def decide(self, pins_map: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Promociones y bajas según el historial; ``pins_map`` es el de esta corrida."""
+        promote: List[Dict[str, Any]] = []
+        demote: List[Dict[str, Any]] = []
+        for iid, item in self.data.items():
+            runs = item['runs']
+            pinned_url = (pins_map.get(iid) or {}).get('url') or ''
+            if pinned_url:
+                for status, limit in (('dead', self.demote_dead_after), ('oos', self.demote_oos_after)):
+                    if self._streak(runs, 'pinned', pinned_url, status) >= limit:
+                        self._bans(item)[pinned_url] = self.run_date
+                        # si el veto vence y la URL vuelve a pin, la racha arranca de cero
+                        runs[:] = [r for r in runs if not (r['stage'] == 'pinned' and r['url'] == pinned_url)]
+                        item['demoted'] = {'date': self.run_date, 'url': pinned_url, 'reason': status}
+                        demote.append({'item_id': iid, 'url': pinned_url, 'reason': status})
+                        break
+                continue
+            searches = [r for r in runs if r['stage'] == 'search']
+            url = searches[-1]['url'] if searches else ''
+            if not url or url in self._bans(item) or self._streak(runs, 'search', url, 'ok') < self.promote_after:
+                continue
+            item['promoted'] = {'date': self.run_date, 'url': url}
+            promote.append({'item_id': iid, 'url': url})
+        self.stats['promoted'] += len(promote)
+        self.stats['demoted'] += len(demote)
+        return {'promote': promote, 'demote': demote}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(str(self.path) + '.tmp')
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=1), encoding='utf-8')
+        os.replace(tmp, self.path)
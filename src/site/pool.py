@@ -0,0 +1,162 @@
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .evidence import screenshot_mode
+from .product import extract_product_page
+from .routing import apply_block_profile
+
+DEFAULT_STORAGE_STATE = Path("data/storage_state.json")
+
+
+def _playwright_page_factory(headless: bool, storage_state_path: Optional[Path], block_profile: str,
+                             cdp_url: Optional[str], screenshots: bool) -> Callable[[], Tuple[Any, Callable[[], None]]]:
+    """Factory de ``(page, close)`` con Playwright; se llama desde el hilo del worker."""
+    def _open() -> Tuple[Any, Callable[[], None]]:
+        # Playwright sync no es thread-safe: cada worker levanta su propia instancia
+        from playwright.sync_api import sync_playwright
+
+        p = sync_playwright().start()
+        browser = None
+        page = None
+
+        def _close() -> None:
+            try:
+                if cdp_url and page:
+                    page.close()
+            except Exception:
+                pass
+            try:
+                # con cdp_url solo desconecta; el navegador compartido sigue vivo
+                if browser:
+                    browser.close()
+            except Exception:
+                pass
+            try:
+                p.stop()
+            except Exception:
+                pass
+
+        try:
+            if cdp_url:
+                # sesión de session-serve: contexto compartido, página y route propios
+                browser = p.chromium.connect_over_cdp(cdp_url)
+                page = browser.contexts[0].new_page()
+                apply_block_profile(page, block_profile, screenshots=screenshots)
+            else:
+                browser = p.chromium.launch(headless=headless)
+                context_kwargs: Dict[str, Any] = {}
+                if storage_state_path and storage_state_path.exists():
+                    context_kwargs['storage_state'] = str(storage_state_path)
+                context = browser.new_context(**context_kwargs)
+                apply_block_profile(context, block_profile, screenshots=screenshots)
+                page = context.new_page()
+        except BaseException:
+            _close()
+            raise
+        return page, _close
+    return _open
+
+
+def _worker(idx: int, jobs: "queue.Queue[int]", job_list: List[Dict[str, Any]], outcomes: List[Optional[Dict[str, Any]]],
+            stats: List[Dict[str, Any]], selectors: Dict[str, Any], evidence_dir: str, html_dump_dir: str,
+            open_page: Callable[[], Tuple[Any, Callable[[], None]]], fingerprints,
+            on_result: Optional[Callable[[int, Dict[str, Any]], None]]) -> None:
+    t0 = time.perf_counter()
+    st = {'worker': idx, 'items': 0, 'errors': 0, 'busy_seconds': 0.0, 'startup_seconds': 0.0}
+    stats[idx] = st
+    close = None
+    try:
+        page, close = open_page()
+        st['startup_seconds'] = round(time.perf_counter() - t0, 3)
+        while True:
+            try:
+                i = jobs.get_nowait()
+            except queue.Empty:
+                break
+            job = job_list[i]
+            t_item = time.perf_counter()
+            try:
+                res = extract_product_page(
+                    page,
+                    url=job['url'],
+                    selectors=selectors,
+                    evidence_dir=evidence_dir,
+                    html_dump_dir=html_dump_dir,
+                    save_basename=job.get('save_basename', ''),
+                    fingerprints=fingerprints,
+                )
+                outcomes[i] = {'result': res, 'error': None, 'worker': idx}
+            except Exception as e:
+                st['errors'] += 1
+                outcomes[i] = {'result': None, 'error': str(e), 'worker': idx}
+            st['items'] += 1
+            st['busy_seconds'] += time.perf_counter() - t_item
+            if on_result:
+                try:
+                    on_result(i, outcomes[i])
+                except Exception:
+                    pass
+    except Exception as e:
+        st['fatal'] = str(e)
+    finally:
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+        st['busy_seconds'] = round(st['busy_seconds'], 3)
+        st['seconds'] = round(time.perf_counter() - t0, 3)
+
+
+def extract_pinned_pool(jobs: List[Dict[str, Any]], selectors: Dict[str, Any], evidence_dir: str, html_dump_dir: str,
+                        workers: int = 4, headless: bool = True,
+                        storage_state_path: Optional[Path] = DEFAULT_STORAGE_STATE,
+                        block_profile: str = 'lean', cdp_url: Optional[str] = None,
+                        fingerprints=None, on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                        open_page: Optional[Callable[[], Tuple[Any, Callable[[], None]]]] = None) -> Dict[str, Any]:
+    """Extrae páginas de producto en paralelo con ``workers`` navegadores.
+
+    Cada job es un dict con ``url`` y ``save_basename``. Devuelve
+    ``{'outcomes': [...], 'workers': [...], 'seconds': float}`` donde
+    ``outcomes`` respeta el orden de ``jobs`` (``result``/``error``/``worker``)
+    y ``workers`` trae el tiempo de cada worker para el log de la corrida.
+    ``on_result(i, outcome)`` se llama desde el worker apenas termina cada job.
+    ``open_page()`` devuelve ``(page, close)`` y se llama una vez por worker
+    desde su hilo; por defecto levanta Chromium con Playwright.
+    """
+    t0 = time.perf_counter()
+    n = max(1, min(int(workers or 1), len(jobs) or 1))
+    q: "queue.Queue[int]" = queue.Queue()
+    for i in range(len(jobs)):
+        q.put(i)
+    outcomes: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    stats: List[Dict[str, Any]] = [{} for _ in range(n)]
+    if open_page is None:
+        open_page = _playwright_page_factory(headless, Path(storage_state_path) if storage_state_path else None,
+                                             block_profile, cdp_url,
+                                             screenshots=bool(evidence_dir) and screenshot_mode() != 'none')
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(i, q, jobs, outcomes, stats, selectors, evidence_dir, html_dump_dir, open_page, fingerprints, on_result),
+            name=f"pins-worker-{i}",
+            daemon=True,
+        )
+        for i in range(n)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for i, out in enumerate(outcomes):
+        if out is None:
+            # el worker murió antes de tomar el job (p.ej. fallo al lanzar Chromium)
+            outcomes[i] = {'result': None, 'error': 'not processed', 'worker': None}
+    return {
+        'outcomes': outcomes,
+        'workers': stats,
+        'seconds': round(time.perf_counter() - t0, 3),
+    }
@@ -1,30 +1,22 @@
 import os
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 from urllib.parse import urljoin
 
+from .bridge import SyncView, run_sync, unwrap
+from .evidence import capture_page_async, submit_evidence
+from .selector_plan import first_present, spec_rx
+from .waits import css_of, wait_for_css_async
+
+PRICE_READY_CSS = "[id^='btnagregarcarritosinstock_']"
+# el producto no existe más: ni reintentos ni navegador dan otra cosa
+GONE_STATUSES = (404, 410)
+
 
 def _page_first(page, specs):
-    import re as _re
-    for spec in specs:
-        if 'css' in spec:
-            l = page.locator(spec['css'])
-        elif 'role' in spec:
-            name = _re.compile(spec['name']) if spec.get('name') else None
-            l = page.get_by_role(spec['role'], name=name)
-        elif 'text' in spec:
-            l = page.get_by_text(_re.compile(spec['text']))
-        elif 'placeholder' in spec:
-            l = page.get_by_placeholder(_re.compile(spec['placeholder']))
-        else:
-            continue
-        try:
-            if l and l.count() > 0:
-                return l.first
-        except Exception:
-            continue
-    return None
+    """Versión sync de :func:`~src.site.selector_plan.first_present`."""
+    return unwrap(run_sync(first_present(SyncView(page), specs)))
 
 
 def _parse_price(text: str) -> Optional[float]:
@@ -34,16 +26,130 @@ def _parse_price(text: str) -> Optional[float]:
     return float(m.group(1).replace('.', '').replace(',', '.'))
 
 
-def extract_product_page(page, url: str, selectors: Dict[str, Any], evidence_dir: str = '', html_dump_dir: str = '', save_basename: str = '') -> Dict[str, Any]:
-    page.goto(url, wait_until='domcontentloaded')
-    page.wait_for_timeout(1000)
+def _prices_from_html(full: str) -> Tuple[Optional[float], Optional[float]]:
+    # "Ahora" es el precio final; "Antes" el original tachado
+    m_now = re.search(r"Ahora[^$]*\$\s*([\d\.,]+)", full, re.I)
+    m_before = re.search(r"Antes[^$]*\$\s*([\d\.,]+)", full, re.I)
+    price_now = _parse_price(f"$ {m_now.group(1)}") if m_now else None
+    price_before = _parse_price(f"$ {m_before.group(1)}") if m_before else None
+    return price_now, price_before
+
+
+def _soup(html: str):
+    from bs4 import BeautifulSoup
+    try:
+        return BeautifulSoup(html, 'lxml')
+    except Exception:
+        return BeautifulSoup(html, 'html.parser')
+
+
+def _soup_first(soup, specs):
+    # Equivalente offline de _page_first: solo css y text tienen sentido sin DOM vivo
+    for spec in specs:
+        if 'css' in spec:
+            try:
+                node = soup.select_one(spec['css'])
+            except Exception:
+                continue
+            if node is not None:
+                return node
+        elif 'text' in spec:
+            pat = spec_rx(spec, 'text')
+            node = soup.find(string=pat)
+            if node is not None:
+                return node.parent
+    return None
+
+
+def parse_product_html(html: str, url: str, selectors: Dict[str, Any]) -> Dict[str, Any]:
+    """Parsea una página de producto ya descargada (sin navegador).
+
+    Devuelve el mismo dict que :func:`extract_product_page`.
+    """
+    soup = _soup(html)
+    for tag in soup(['script', 'style', 'noscript']):
+        tag.decompose()
+
+    title = ''
+    og = soup.find('meta', attrs={'property': 'og:title'})
+    if og and og.get('content'):
+        title = og['content'].strip()
+    if not title:
+        h1 = soup.find('h1')
+        if h1:
+            title = h1.get_text(' ', strip=True)
+    if not title:
+        tl = _soup_first(soup, selectors.get('title', []))
+        if tl is not None:
+            title = tl.get_text(' ', strip=True)
+
+    text = soup.get_text(' ')
+    price_final, price_original = _prices_from_html(text)
+    if not price_final:
+        pl = _soup_first(soup, selectors.get('price_now', []))
+        if pl is not None:
+            price_final = _parse_price(pl.get_text())
+    if not price_original:
+        pol = _soup_first(soup, selectors.get('price_original', []))
+        if pol is not None:
+            price_original = _parse_price(pol.get_text())
+    if price_final and not price_original:
+        price_original = price_final
+
+    # Stock: el sitio deja oculto (display:none) el bloque "Sin Stock" si hay stock
+    in_stock = True
+    sinstock = soup.select_one("div[id^='btnagregarcarritosinstock_']")
+    if sinstock is not None and 'display:none' not in (sinstock.get('style') or '').replace(' ', '').lower():
+        in_stock = False
+    for spec in selectors.get('oos_flag', []):
+        if 'css' in spec:
+            try:
+                if soup.select_one(spec['css']) is not None:
+                    in_stock = False
+            except Exception:
+                continue
+
+    promo_flag = bool(re.search(r'\bAntes\b', text, re.I)) or bool(price_original and price_final and price_original > price_final)
+
+    return {
+        'title': title,
+        'price_final': price_final,
+        'price_original': price_original,
+        'price_promo': price_final if promo_flag else None,
+        'promo_flag': promo_flag,
+        'in_stock': in_stock,
+        'url': url,
+    }
+
+
+async def save_evidence_async(page, evidence_dir: str, html_dump_dir: str, basename: str, clip_css: str = '',
+                              failed: bool = False) -> Tuple[str, str]:
+    """Captura según la política y vuelca el HTML; devuelve ``(html, ruta_captura)``."""
+    shot = ''
+    if evidence_dir and basename:
+        shot = await capture_page_async(page, os.path.join(evidence_dir, f'{basename}.png'), clip_css=clip_css, failed=failed)
+    html = ''
+    if html_dump_dir and basename:
+        try:
+            html = await page.content()
+            submit_evidence(os.path.join(html_dump_dir, f'{basename}.html'), html)
+        except Exception:
+            pass
+    return html, shot
+
+
+async def extract_product_page_async(page, url: str, selectors: Dict[str, Any], evidence_dir: str = '', html_dump_dir: str = '', save_basename: str = '', fingerprints=None) -> Dict[str, Any]:
+    response = await page.goto(url, wait_until='domcontentloaded')
+    http_status = getattr(response, 'status', None)
+    if http_status not in GONE_STATUSES:
+        await wait_for_css_async(page, css_of(selectors.get('price_now', []), PRICE_READY_CSS), 'product', 1000)
 
     # Title (prefer og:title, then h1, then configured selectors)
     title = ''
     try:
         og = page.locator('meta[property="og:title"]').first
-        if og.count() > 0:
-            t = og.get_attribute('content')
+        if await og.count() > 0:
+            t = await og.get_attribute('content')
             if t:
                 title = t.strip()
     except Exception:
@@ -51,16 +157,15 @@ def extract_product_page(page, url: str, selectors: Dict[str, Any], evidence_dir
     if not title:
         try:
             h1 = page.locator('h1').first
-            if h1 and h1.count() > 0:
-                title = h1.inner_text().strip()
+            if await h1.count() > 0:
+                title = (await h1.inner_text()).strip()
         except Exception:
             pass
     if not title:
         try:
-            title_specs = selectors.get('title', [])
-            tl = _page_first(page, title_specs)
+            tl = await first_present(page, selectors.get('title', []))
             if tl:
-                title = tl.inner_text().strip()
+                title = (await tl.inner_text()).strip()
         except Exception:
             pass
 
@@ -68,20 +173,15 @@ def extract_product_page(page, url: str, selectors: Dict[str, Any], evidence_dir
     price_final = None
     price_original = None
     try:
-        full = page.content()
-        m_now = re.search(r"Ahora[^$]*\$\s*([\d\.,]+)", full, re.I)
-        m_before = re.search(r"Antes[^$]*\$\s*([\d\.,]+)", full, re.I)
-        if m_now:
-            price_final = _parse_price(f"$ {m_now.group(1)}")
-        pl = _page_first(page, selectors.get('price_now', []))
-        if pl and not price_final:
-            price_final = _parse_price(pl.inner_text())
-        if m_before:
-            price_original = _parse_price(f"$ {m_before.group(1)}")
+        price_final, price_original = _prices_from_html(await page.content())
+        if not price_final:
+            pl = await first_present(page, selectors.get('price_now', []))
+            if pl:
+                price_final = _parse_price(await pl.inner_text())
         if not price_original:
-            pol = _page_first(page, selectors.get('price_original', []))
+            pol = await first_present(page, selectors.get('price_original', []))
             if pol:
-                price_original = _parse_price(pol.inner_text())
+                price_original = _parse_price(await pol.inner_text())
         if price_final and not price_original:
             price_original = price_final
     except Exception:
@@ -90,42 +190,27 @@ def extract_product_page(page, url: str, selectors: Dict[str, Any], evidence_dir
     # OOS via button
     in_stock = True
     try:
-        btn = _page_first(page, selectors.get('add_to_cart_button', []))
+        btn = await first_present(page, selectors.get('add_to_cart_button', []))
         if btn:
             try:
-                enabled = btn.is_enabled()
-                visible = btn.is_visible()
-                in_stock = bool(enabled and visible)
+                in_stock = bool(await btn.is_enabled() and await btn.is_visible())
             except Exception:
                 in_stock = True
     except Exception:
         pass
     try:
-        if _page_first(page, selectors.get('oos_flag', [])):
+        if await first_present(page, selectors.get('oos_flag', [])):
             in_stock = False
     except Exception:
         pass
 
     promo_flag = False
     try:
-        promo_flag = page.get_by_text(re.compile(r'Antes', re.I)).count() > 0 or (price_original and price_final and price_original > price_final)
+        promo_flag = (await page.get_by_text(re.compile(r'Antes', re.I)).count()) > 0 or bool(price_original and price_final and price_original > price_final)
     except Exception:
         pass
 
-    # Evidence
-    if evidence_dir and save_basename:
-        try:
-            page.screenshot(path=os.path.join(evidence_dir, f'{save_basename}.png'), full_page=True)
-        except Exception:
-            pass
-    if html_dump_dir and save_basename:
-        try:
-            with open(os.path.join(html_dump_dir, f'{save_basename}.html'), 'w', encoding='utf-8') as f:
-                f.write(page.content())
-        except Exception:
-            pass
-
-    return {
+    res = {
         'title': title,
         'price_final': price_final,
         'price_original': price_original,
@@ -133,4 +218,21 @@ def extract_product_page(page, url: str, selectors: Dict[str, Any], evidence_dir
         'promo_flag': promo_flag,
         'in_stock': in_stock,
         'url': url,
+        'http_status': http_status,
     }
+
+    # Evidence (se omite si el bloque de precio no cambió desde la última corrida);
+    # sin precio no hay huella: siempre se guarda la evidencia del fallo
+    if not price_final or fingerprints is None or fingerprints.observe(url, res):
+        _html, shot = await save_evidence_async(page, evidence_dir, html_dump_dir, save_basename,
+                                                css_of(selectors.get('title', []) + selectors.get('price_now', [])),
+                                                failed=not price_final)
+        if price_final and fingerprints is not None and shot:
+            fingerprints.note_evidence(url, shot)
+    return res
+
+
+def extract_product_page(page, url: str, selectors: Dict[str, Any], evidence_dir: str = '', html_dump_dir: str = '', save_basename: str = '', fingerprints=None) -> Dict[str, Any]:
+    """:func:`extract_product_page_async` sobre una página de ``playwright.sync_api``."""
+    return run_sync(extract_product_page_async(SyncView(page), url, selectors, evidence_dir, html_dump_dir,
+                                               save_basename, fingerprints))
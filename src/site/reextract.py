@@ -0,0 +1,163 @@
+"""Re-extracción en lote de la evidencia HTML archivada.
+
+Después de corregir un parser (``parse_title_size``, ``parse_price_ar``,
+``_parse_price``) los precios de meses anteriores se vuelven a derivar de
+los volcados ``html/pinned_*.html`` y ``html/search_*.html`` de cada
+corrida. ``plan_tasks`` arma una tarea por archivo (el ítem sale del nombre:
+``pinned_<item_id>`` o la búsqueda de una fila del catálogo) y
+``reextract`` las reparte en un ``ProcessPoolExecutor``: cada worker lee el
+volcado del store, lo parsea con el mismo código que la corrida en vivo y
+devuelve la fila de precio ya costeada. Cada worker abre el store una vez y
+lee el ``manifest.jsonl`` una vez por corrida (las tareas vienen agrupadas
+por corrida), no una vez por archivo. Los pins de cada tarea son los del
+período de su corrida.
+
+Los resultados llegan en el orden de las tareas (``map`` con ``chunksize``)
+y se entregan uno a uno a ``on_row``, así el CLI escribe los CSV diarios a
+medida que avanza sin juntar todo en memoria. Dentro de una corrida los
+pinned van primero y la búsqueda de un ítem ya resuelto por su pin se
+descarta, igual que en ``run``.
+"""
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..normalize.pricing import compute_item_costs
+from ..normalize.units import parse_title_size
+from .evidence_store import EvidenceStore
+from .extract import compile_card_plan, extract_cards_html, parse_imetrics_cards
+from .product import parse_product_html
+from .scoring import set_scoring_policy
+from .search import _build_query, _candidates, _choose, search_basename
+
+_RUN_RE = re.compile(r'^(\d{4}-\d{2})_(\d{4}-\d{2}-\d{2})$')
+
+# contexto de cada worker (selectores, plan de tarjetas, exclusiones, modo)
+_CTX: Dict[str, Any] = {}
+
+
+def _init_worker(ctx: Dict[str, Any]) -> None:
+    _CTX.clear()
+    _CTX.update(ctx)
+    _CTX['plan'] = compile_card_plan(ctx['selectors'])
+    _CTX['stores'] = {}
+    _CTX['manifest'] = (None, {})
+    set_scoring_policy(ctx.get('scoring_policy', 'default'))
+
+
+def _read(task: Dict[str, Any]) -> Optional[bytes]:
+    store = _CTX['stores'].get(task['root'])
+    if store is None:
+        store = _CTX['stores'][task['root']] = EvidenceStore(task['root'])
+    # las tareas de una corrida son contiguas: basta con el manifest de la última
+    run_dir, manifest = _CTX['manifest']
+    if run_dir != task['run_dir']:
+        manifest = store.manifest(task['run_dir'])
+        _CTX['manifest'] = (task['run_dir'], manifest)
+    return store.read(task['run_dir'], task['name'], manifest=manifest)
+
+
+def plan_tasks(run_dirs: Iterable[Path], store: EvidenceStore, catalog: List[Dict[str, Any]],
+               pins_for_period: Callable[[str], Dict[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Una tarea por volcado HTML reconocible; pinned antes que búsquedas en cada corrida.
+
+    ``pins_for_period(period)`` da los pins vigentes en el período de cada
+    corrida (se consulta una vez por período).
+    """
+    cat_index = {r['item_id']: r for r in catalog}
+    by_search = {search_basename(_build_query(r)): r for r in catalog}
+    pins_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    tasks: List[Dict[str, Any]] = []
+    for run_dir in run_dirs:
+        m = _RUN_RE.match(Path(run_dir).name)
+        if not m:
+            continue
+        base = {'root': str(store.root), 'run_dir': str(run_dir), 'period': m.group(1), 'date': m.group(2)}
+        if m.group(1) not in pins_cache:
+            pins_cache[m.group(1)] = pins_for_period(m.group(1))
+        pins_map = pins_cache[m.group(1)]
+        pinned, searches = [], []
+        for name in store.names(run_dir):
+            stem = name[len('html/'):-len('.html')] if name.startswith('html/') and name.endswith('.html') else ''
+            if stem.startswith('pinned_'):
+                iid = stem[len('pinned_extra_'):] if stem.startswith('pinned_extra_') else stem[len('pinned_'):]
+                pin = pins_map.get(iid) or {}
+                pinned.append(dict(base, kind='pinned', name=name, item_id=iid, url=pin.get('url', ''),
+                                   row=cat_index.get(iid) or {'item_id': iid, 'name': pin.get('title') or iid,
+                                                               'expected_qty': 0.0, 'monthly_qty_base': 0.0}))
+            elif stem in by_search:
+                searches.append(dict(base, kind='search', name=name, item_id=by_search[stem]['item_id'], row=by_search[stem]))
+        tasks.extend(pinned + searches)
+    return tasks
+
+
+def _extract(task: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        raw = _read(task)
+        if raw is None:
+            return {'row': None, 'error': 'blob ausente'}
+        html = raw.decode('utf-8', errors='ignore')
+        row = task['row']
+        if task['kind'] == 'pinned':
+            res = parse_product_html(html, task['url'], _CTX['selectors'])
+            qb, un = parse_title_size(res.get('title') or '')
+            if not (res.get('price_final') and qb):
+                return {'row': None, 'error': None}
+            res.update({'item_id': task['item_id'], 'name': row['name'], 'query': 'PINNED', 'qty_base': qb, 'unit': un,
+                        'expected_qty': row['expected_qty'], 'monthly_qty_base': row['monthly_qty_base'], 'substitution': ''})
+        else:
+            candidates = []
+            if _CTX.get('mode') == 'imetrics':
+                candidates = _candidates(row, parse_imetrics_cards(html), _CTX['exclude_keywords'], _CTX['base_url'])
+            if not candidates:
+                candidates = _candidates(row, extract_cards_html(html, _CTX['plan']), _CTX['exclude_keywords'], _CTX['base_url'])
+            res = _choose(row, _build_query(row), candidates)
+            if res is None:
+                return {'row': None, 'error': None}
+        return {'row': compute_item_costs([res])[0], 'error': None}
+    except Exception as e:
+        return {'row': None, 'error': str(e)}
+
+
+def reextract(tasks: List[Dict[str, Any]], ctx: Dict[str, Any], on_row: Callable[[Dict[str, Any], Dict[str, Any]], None],
+              workers: Optional[int] = None, chunksize: int = 16,
+              on_error: Optional[Callable[[Dict[str, Any], str], None]] = None) -> Dict[str, Any]:
+    """Procesa ``tasks`` con ``workers`` procesos (1 = en el proceso actual).
+
+    ``ctx`` lleva ``selectors`` (dict plano), ``exclude_keywords``,
+    ``base_url``, ``mode`` y ``scoring_policy``. Devuelve archivos, filas,
+    errores, segundos y archivos por segundo.
+    """
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    stats = {'files': 0, 'rows': 0, 'skipped': 0, 'errors': 0, 'workers': workers}
+    resolved: Dict[str, set] = {}
+    t0 = time.perf_counter()
+
+    def _consume(results: Iterable[Dict[str, Any]]) -> None:
+        for task, out in zip(tasks, results):
+            stats['files'] += 1
+            if out['error']:
+                stats['errors'] += 1
+                if on_error:
+                    on_error(task, out['error'])
+                continue
+            done = resolved.setdefault(task['run_dir'], set())
+            if out['row'] is None or task['item_id'] in done:
+                stats['skipped'] += 1
+                continue
+            done.add(task['item_id'])
+            stats['rows'] += 1
+            on_row(task, out['row'])
+
+    if workers == 1:
+        _init_worker(ctx)
+        _consume(map(_extract, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ctx,)) as ex:
+            _consume(ex.map(_extract, tasks, chunksize=max(1, chunksize)))
+    stats['seconds'] = round(time.perf_counter() - t0, 3)
+    stats['files_per_sec'] = round(stats['files'] / stats['seconds'], 1) if stats['seconds'] else 0.0
+    return stats
@@ -0,0 +1,104 @@
+"""Reproceso offline de una corrida desde su evidencia HTML.
+
+``replay`` toma ``evidence/<periodo>_<fecha>/`` y vuelve a pasar los
+volcados ``html/pinned_*.html`` y ``html/search_*.html`` por el mismo código
+de extracción y elección que la corrida en vivo (``parse_product_html``,
+``parse_imetrics_cards`` / ``extract_cards_html``, ``_candidates`` y
+``_choose``), sin navegador ni red. Los volcados se leen con
+:class:`~src.site.evidence_store.EvidenceStore`, así que sirven tanto
+archivos sueltos como corridas ya compactadas.
+
+Limitaciones conocidas:
+
+- con huellas activas la corrida en vivo no vuelca el HTML de productos cuyo
+  precio no cambió; para esos ítems se usa el resultado del journal de la
+  corrida (``data/raw/run_<carpeta>/items.jsonl``) si existe;
+- de una búsqueda solo se guarda la primera página de resultados, así que en
+  modo ``dom`` las tarjetas de páginas siguientes no participan.
+
+``diff_breakdown`` compara el desglose reproducido con el de la corrida en
+vivo para usar el replay como prueba de regresión de selectores y matching.
+"""
+import csv
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .extract import compile_card_plan, extract_cards_html, parse_imetrics_cards
+from .product import parse_product_html
+from .search import _build_query, _candidates, _choose, _log_choice, search_basename
+
+# columnas del desglose que definen "mismo resultado"
+DIFF_FIELDS = ('title', 'url', 'price_final', 'price_original', 'qty_base', 'in_stock', 'promo_flag', 'cost_item_ae')
+
+
+def _read_html(store, run_dir: Path, basename: str) -> Optional[str]:
+    raw = store.read(run_dir, f'html/{basename}.html')
+    return raw.decode('utf-8', errors='ignore') if raw is not None else None
+
+
+def replay_pinned(run_dir: Union[str, Path], store, pin_jobs: List[Dict[str, Any]], selectors: Dict[str, Any],
+                  journal: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Un ``{'result', 'error', 'source'}`` por job, en el orden de ``pin_jobs``."""
+    run_dir = Path(run_dir)
+    journal = journal or {}
+    outcomes: List[Dict[str, Any]] = []
+    for job in pin_jobs:
+        html = _read_html(store, run_dir, job['save_basename'])
+        if html is not None:
+            outcomes.append({'result': parse_product_html(html, job['url'], selectors), 'error': None, 'source': 'html'})
+            continue
+        rec = journal.get(job['item_id'])
+        if rec and rec.get('stage') == 'pinned' and rec.get('result'):
+            outcomes.append({'result': dict(rec['result']), 'error': None, 'source': 'journal'})
+        else:
+            outcomes.append({'result': None, 'error': 'sin evidencia HTML', 'source': ''})
+    return outcomes
+
+
+def replay_searches(run_dir: Union[str, Path], store, catalog: List[Dict[str, Any]], selectors: Dict[str, Any],
+                    exclude_keywords: List[str], log_path: str, base_url: str = '', mode: str = 'dom') -> List[Dict[str, Any]]:
+    """Un ``{'result', 'error', 'source'}`` por fila de ``catalog``."""
+    run_dir = Path(run_dir)
+    plan = compile_card_plan(selectors)
+    outcomes: List[Dict[str, Any]] = []
+    for row in catalog:
+        query = _build_query(row)
+        html = _read_html(store, run_dir, search_basename(query))
+        if html is None:
+            outcomes.append({'result': None, 'error': 'sin evidencia HTML', 'source': ''})
+            continue
+        candidates = []
+        if mode == 'imetrics':
+            candidates = _candidates(row, parse_imetrics_cards(html), exclude_keywords, base_url)
+        if not candidates:
+            candidates = _candidates(row, extract_cards_html(html, plan), exclude_keywords, base_url)
+        chosen = _choose(row, query, candidates)
+        _log_choice(log_path, row, chosen)
+        outcomes.append({'result': chosen, 'error': None, 'source': 'html'})
+    return outcomes
+
+
+def _read_breakdown(path: Union[str, Path]) -> Dict[str, Dict[str, str]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {r['item_id']: r for r in csv.DictReader(f)}
+    except OSError:
+        return {}
+
+
+def diff_breakdown(live_path: Union[str, Path], replay_path: Union[str, Path]) -> Dict[str, Any]:
+    """Ítems agregados, faltantes y cambiados (por ``DIFF_FIELDS``) entre dos desgloses."""
+    live, rep = _read_breakdown(live_path), _read_breakdown(replay_path)
+    changed = {}
+    for iid in sorted(set(live) & set(rep)):
+        fields = {k: [live[iid].get(k), rep[iid].get(k)] for k in DIFF_FIELDS if live[iid].get(k) != rep[iid].get(k)}
+        if fields:
+            changed[iid] = fields
+    return {
+        'live_items': len(live),
+        'replay_items': len(rep),
+        'added': sorted(set(rep) - set(live)),
+        'missing': sorted(set(live) - set(rep)),
+        'changed': changed,
+        'identical': not changed and set(live) == set(rep),
+    }
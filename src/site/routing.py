@@ -0,0 +1,133 @@
+"""Perfil de bloqueo de requests para los contextos de scraping.
+
+Se aplica al crear el contexto (``context.route``) y corta imágenes, media,
+fuentes y trackers de terceros (OneSignal, GTM, Clarity, VWO, Facebook...)
+que no aportan datos de precio. Si la corrida guarda capturas, imágenes y
+fuentes se dejan pasar para que la evidencia sea legible (salvo ``strict``).
+
+Perfiles (``[browser] block_profile`` en ``config.toml``):
+
+- ``off``: no bloquea nada.
+- ``trackers``: solo hosts de terceros.
+- ``lean`` (default): trackers + media; imágenes y fuentes solo sin capturas.
+- ``strict``: trackers + imágenes/media/fuentes aun con capturas.
+"""
+import threading
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+TRACKER_HOSTS = (
+    'onesignal.com',
+    'googletagmanager.com',
+    'google-analytics.com',
+    'doubleclick.net',
+    'apis.google.com',
+    'clarity.ms',
+    'visualwebsiteoptimizer.com',
+    'vwo.com',
+    'facebook.net',
+    'facebook.com',
+    'hotjar.com',
+)
+
+# Tamaño medio estimado por tipo (bytes): un request abortado no informa tamaño
+_EST_BYTES = {'image': 45_000, 'media': 400_000, 'font': 35_000, 'script': 60_000}
+_EST_DEFAULT = 8_000
+
+PROFILES = ('off', 'trackers', 'lean', 'strict')
+
+_LOCK = threading.Lock()
+_STATS: Dict[str, Any] = {'requests_blocked': 0, 'bytes_saved_est': 0, 'by_type': {}, 'by_host': {}}
+
+
+def _is_tracker(url: str) -> str:
+    host = (urlsplit(url).hostname or '').lower()
+    for t in TRACKER_HOSTS:
+        if host == t or host.endswith('.' + t):
+            return t
+    return ''
+
+
+def blocked_types(profile: str, screenshots: bool) -> frozenset:
+    if profile == 'strict' or (profile == 'lean' and not screenshots):
+        return frozenset({'image', 'media', 'font'})
+    if profile == 'lean':
+        return frozenset({'media'})
+    return frozenset()
+
+
+def should_block(url: str, resource_type: str, profile: str, screenshots: bool = True) -> str:
+    """Motivo del bloqueo (``tracker:<host>`` / ``type:<tipo>``) o ``''``."""
+    if profile not in PROFILES or profile == 'off':
+        return ''
+    tracker = _is_tracker(url)
+    if tracker:
+        return f'tracker:{tracker}'
+    if resource_type in blocked_types(profile, screenshots):
+        return f'type:{resource_type}'
+    return ''
+
+
+def _record(reason: str, resource_type: str) -> None:
+    with _LOCK:
+        _STATS['requests_blocked'] += 1
+        _STATS['bytes_saved_est'] += _EST_BYTES.get(resource_type, _EST_DEFAULT)
+        _STATS['by_type'][resource_type] = _STATS['by_type'].get(resource_type, 0) + 1
+        if reason.startswith('tracker:'):
+            host = reason.split(':', 1)[1]
+            _STATS['by_host'][host] = _STATS['by_host'].get(host, 0) + 1
+
+
+def reset_routing() -> None:
+    with _LOCK:
+        _STATS.update({'requests_blocked': 0, 'bytes_saved_est': 0, 'by_type': {}, 'by_host': {}})
+
+
+def routing_summary() -> Dict[str, Any]:
+    with _LOCK:
+        return {
+            'requests_blocked': _STATS['requests_blocked'],
+            'bytes_saved_est': _STATS['bytes_saved_est'],
+            'by_type': dict(_STATS['by_type']),
+            'by_host': dict(_STATS['by_host']),
+        }
+
+
+def apply_block_profile(context, profile: str = 'lean', screenshots: bool = True) -> None:
+    """Registra el handler de bloqueo en un ``BrowserContext`` sync."""
+    if not profile or profile == 'off':
+        return
+
+    def _handler(route):
+        req = route.request
+        reason = should_block(req.url, req.resource_type, profile, screenshots)
+        try:
+            if reason:
+                _record(reason, req.resource_type)
+                route.abort()
+            else:
+                route.continue_()
+        except Exception:
+            pass
+
+    context.route('**/*', _handler)
+
+
+async def apply_block_profile_async(context, profile: str = 'lean', screenshots: bool = True) -> None:
+    """Igual que :func:`apply_block_profile` para ``playwright.async_api``."""
+    if not profile or profile == 'off':
+        return
+
+    async def _handler(route):
+        req = route.request
+        reason = should_block(req.url, req.resource_type, profile, screenshots)
+        try:
+            if reason:
+                _record(reason, req.resource_type)
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            pass
+
+    await context.route('**/*', _handler)
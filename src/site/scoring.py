@@ -0,0 +1,126 @@
+"""Puntaje de candidatos de búsqueda en lote.
+
+En lugar de un ``re.search`` por keyword, por tarjeta y por fila del
+catálogo, el vocabulario (keywords preferidas de las filas + exclusiones)
+se compila en una sola alternancia con lookahead; cada título se recorre
+una vez y devuelve el conjunto de keywords presentes. Las keywords
+contenidas en otra más larga (``arroz`` en ``arroz largo``) se agregan por
+clausura, así el resultado coincide con buscar cada una por separado.
+
+``score_matrix(rows, cards)`` arma la matriz fila × tarjeta y la mejor
+tarjeta por fila (mayor puntaje, desempate por menor precio unitario) en
+una pasada. ``run`` (``_candidates``/``_choose`` de :mod:`src.site.search`)
+y ``dry-run`` usan las mismas funciones con la política activa
+(``set_scoring_policy``).
+"""
+import functools
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+POLICIES: Dict[str, Dict[str, float]] = {
+    # pesos históricos de _score_card
+    'default': {'keyword': 2.0, 'exclude': -2.0, 'size_match': 2.0, 'size_near': 1.0, 'oos': -3.0, 'tolerance': 0.85},
+    # el scorer que tenía dry-run: sin banda de tamaño cercano ni penalidad por stock
+    'legacy_dry_run': {'keyword': 2.0, 'exclude': -2.0, 'size_match': 2.0, 'size_near': 0.0, 'oos': 0.0, 'tolerance': 0.85},
+}
+
+_POLICY: Dict[str, float] = dict(POLICIES['default'])
+
+NO_UNIT_PRICE = 1e12
+
+
+def set_scoring_policy(policy: Any = 'default') -> Dict[str, float]:
+    """Fija la política activa (nombre de ``POLICIES`` o dict de pesos)."""
+    base = POLICIES.get(policy) if isinstance(policy, str) else dict(POLICIES['default'], **(policy or {}))
+    if base is None:
+        raise ValueError(f"Politica de puntaje desconocida: {policy}")
+    _POLICY.clear()
+    _POLICY.update(base)
+    return dict(_POLICY)
+
+
+def scoring_policy() -> Dict[str, float]:
+    return dict(_POLICY)
+
+
+class KeywordMatcher:
+    """Una alternancia compilada para todo el vocabulario."""
+
+    def __init__(self, keywords: Iterable[str]):
+        vocab = sorted({k.lower() for k in keywords if k}, key=lambda k: (-len(k), k))
+        self.vocab = tuple(vocab)
+        self._rx = re.compile('(?=(' + '|'.join(re.escape(k) for k in vocab) + '))', re.I) if vocab else None
+        # keywords contenidas en otra: si matchea la larga, matchea la corta
+        self._inside = {k: frozenset(o for o in vocab if o != k and o in k) for k in vocab}
+
+    def hits(self, title: str) -> FrozenSet[str]:
+        if self._rx is None or not title:
+            return frozenset()
+        found = {m.group(1).lower() for m in self._rx.finditer(title)}
+        for k in list(found):
+            found.update(self._inside.get(k, ()))
+        return frozenset(found)
+
+
+@functools.lru_cache(maxsize=256)
+def _matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def _size_points(exp_qty: float, qty_base: float, tol: float, policy: Dict[str, float]) -> float:
+    if not (qty_base and exp_qty):
+        return 0.0
+    ratio = min(qty_base, exp_qty) / max(qty_base, exp_qty)
+    if ratio >= tol:
+        return policy['size_match']
+    if ratio >= min(0.75, tol - 0.15):
+        return policy['size_near']
+    return 0.0
+
+
+def _row_params(row: Dict[str, Any], policy: Dict[str, float]) -> Tuple[List[str], float, float]:
+    pref = [k.lower() for k in row.get('preferred_keywords') or [] if k]
+    try:
+        exp_qty = float(row.get('expected_qty') or 0)
+    except (TypeError, ValueError):
+        exp_qty = 0.0
+    try:
+        tol = float(row.get('size_tolerance') or policy['tolerance'])
+    except (TypeError, ValueError):
+        tol = policy['tolerance']
+    return pref, exp_qty, tol
+
+
+def score_matrix(rows: Sequence[Dict[str, Any]], cards: Sequence[Dict[str, Any]], exclude_keywords: Sequence[str],
+                 policy: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Puntajes fila × tarjeta y mejor tarjeta por fila.
+
+    ``cards`` trae ``title``, ``in_stock``, ``qty_base`` y ``unit_price``
+    (``None`` si no hay). Devuelve ``{'scores': [[...]], 'best': [idx|None]}``.
+    """
+    policy = policy or _POLICY
+    excl = [k.lower() for k in exclude_keywords if k]
+    vocab = tuple(sorted({k for r in rows for k in _row_params(r, policy)[0]} | set(excl)))
+    matcher = _matcher(vocab)
+    card_hits = [matcher.hits(c.get('title') or '') for c in cards]
+    # parte que no depende de la fila: exclusiones y stock
+    card_base = [policy['exclude'] * sum(1 for k in excl if k in h) + (0.0 if c.get('in_stock', True) else policy['oos'])
+                 for c, h in zip(cards, card_hits)]
+    unit_prices = [c.get('unit_price') or NO_UNIT_PRICE for c in cards]
+    scores: List[List[float]] = []
+    best: List[Optional[int]] = []
+    for row in rows:
+        pref, exp_qty, tol = _row_params(row, policy)
+        row_scores = []
+        for c, h, base in zip(cards, card_hits, card_base):
+            s = base + policy['keyword'] * sum(1 for k in pref if k in h)
+            row_scores.append(s + _size_points(exp_qty, c.get('qty_base') or 0.0, tol, policy))
+        scores.append(row_scores)
+        best.append(min(range(len(cards)), key=lambda i: (-row_scores[i], unit_prices[i])) if cards else None)
+    return {'scores': scores, 'best': best}
+
+
+def score_one(row: Dict[str, Any], title: str, in_stock: bool, qty_base: float, exclude_keywords: Sequence[str]) -> float:
+    """Puntaje de una tarjeta para una fila (misma lógica que :func:`score_matrix`)."""
+    card = {'title': title, 'in_stock': in_stock, 'qty_base': qty_base}
+    return score_matrix([row], [card], exclude_keywords)['scores'][0][0]
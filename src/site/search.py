@@ -1,42 +1,34 @@
 import os
 import re
-from typing import Dict, Any, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
-from .extract import parse_price_ar, extract_card_fields
+from cba_shared.engine import unit_price
+
+from .bridge import SyncView, run_sync, unwrap
+from .extract import extract_card_fields_async, parse_imetrics_cards, compile_card_plan, extract_cards_html
+from .evidence import capture_page_async, screenshot_mode
+from .product import save_evidence_async
+from .scoring import NO_UNIT_PRICE, score_matrix
+from .selector_plan import first_attached
 from .utils import json_log
-from ..normalize.units import parse_title_size
+from .waits import (RESULTS_CSS, css_of, settle, settle_async, settle_mark, settle_mark_async, wait_for_count_growth_async,
+                    wait_for_css_async)
+from ..normalize.units import parse_many
 
 
 def _try_loc(page, specs):
-    import re as _re
-    for spec in specs:
-        loc = None
-        if 'placeholder' in spec:
-            loc = page.get_by_placeholder(_re.compile(spec['placeholder']))
-        elif 'role' in spec:
-            name = _re.compile(spec['name']) if spec.get('name') else None
-            loc = page.get_by_role(spec['role'], name=name)
-        elif 'text' in spec:
-            loc = page.get_by_text(_re.compile(spec['text']))
-        elif 'css' in spec:
-            loc = page.locator(spec['css'])
-        if loc:
-            try:
-                loc.first.wait_for(state='attached', timeout=2000)
-                return loc.first
-            except Exception:
-                continue
-    return None
-
-
-def _dismiss_overlays(page):
+    """Versión sync de :func:`~src.site.selector_plan.first_attached`."""
+    return unwrap(run_sync(first_attached(SyncView(page), specs)))
+
+
+async def _dismiss_overlays(page):
     try:
-        page.evaluate("document.querySelectorAll('[data-modal], .modal-overlay').forEach(el => el.style.display='none')")
+        await page.evaluate("document.querySelectorAll('[data-modal], .modal-overlay').forEach(el => el.style.display='none')")
     except Exception:
         pass
     try:
-        page.evaluate("document.querySelectorAll('#onesignal-slidedown-container, .onesignal-slidedown-container').forEach(el => el.remove())")
+        await page.evaluate("document.querySelectorAll('#onesignal-slidedown-container, .onesignal-slidedown-container').forEach(el => el.remove())")
     except Exception:
         pass
     close_specs = [
@@ -45,10 +37,11 @@ def _dismiss_overlays(page):
     ]
     for spec in close_specs:
         try:
-            loc = _try_loc(page, [spec])
-            if loc and loc.is_visible():
-                loc.click()
-                page.wait_for_timeout(200)
+            loc = await first_attached(page, [spec])
+            if loc and await loc.is_visible():
+                mark = await settle_mark_async(page)
+                await loc.click()
+                await settle_async(page, 'overlay_close', 200, mark)
         except Exception:
             continue
 
@@ -81,185 +74,232 @@ def _build_query(row: Dict[str, Any]) -> str:
     return f"{base}{unit_str}".strip()
 
 
-def _score_card(row: Dict[str, Any], title: str, in_stock: bool, unit_price: float, qty_base: float, exclude_keywords: List[str]) -> float:
-    score = 0.0
-    for kw in row['preferred_keywords']:
-        if kw and re.search(re.escape(kw), title, re.I):
-            score += 2.0
-    for ex in exclude_keywords:
-        if ex and re.search(re.escape(ex), title, re.I):
-            score -= 2.0
-    # size proximity
-    exp_qty = float(row.get('expected_qty') or 0)
-    tol = float(row.get('size_tolerance') or 0.85)
-    if qty_base and exp_qty:
-        ratio = min(qty_base, exp_qty) / max(qty_base, exp_qty)
-        if ratio >= tol:
-            score += 2.0
-        elif ratio >= min(0.75, tol - 0.15):
-            score += 1.0
-    # stock
-    if not in_stock:
-        score -= 3.0
-    # lower unit price better (we don't add to score, used for tiebreak)
-    return score
-
-
-def run_searches(page, period: str, catalog: List[Dict[str, Any]], selectors: Dict[str, Any], evidence_dir: str, html_dump_dir: str, exclude_keywords: List[str], log_path: str, base_url: str = "") -> List[Dict[str, Any]]:
+def search_basename(query: str) -> str:
+    """Nombre base de la evidencia de una búsqueda (``search_<query>``)."""
+    return 'search_' + re.sub(r'[^a-z0-9]+', '_', query.lower())
+
+
+def _card_inputs(fields: Dict[str, Any], base_url: str, size: Tuple[float, str]) -> Dict[str, Any]:
+    # Build absolute URL if relative
+    if fields.get('url') and base_url and fields['url'].startswith('/'):
+        fields['url'] = urljoin(base_url, fields['url'])
+    qty_base, unit = size
+    return {'title': fields.get('title', ''), 'in_stock': fields.get('in_stock', True), 'qty_base': qty_base or 0.0,
+            'unit': unit or '', 'unit_price': unit_price(fields.get('price_final'), qty_base), 'fields': fields}
+
+
+def _candidates(row: Dict[str, Any], fields_list: List[Dict[str, Any]], exclude_keywords: List[str],
+                base_url: str = "") -> List[Tuple[float, float, Dict[str, Any], float, str]]:
+    """Tuplas de candidatos con todas las tarjetas puntuadas en un solo lote."""
+    sizes = parse_many(f.get('title', '') for f in fields_list)
+    cards = [_card_inputs(f, base_url, size) for f, size in zip(fields_list, sizes)]
+    scores = score_matrix([row], cards, exclude_keywords)['scores'][0] if cards else []
+    return [(s, c['unit_price'] or NO_UNIT_PRICE, c['fields'], c['qty_base'], c['unit']) for s, c in zip(scores, cards)]
+
+
+def _choose(row: Dict[str, Any], query: str, candidates: List[Tuple[float, float, Dict[str, Any], float, str]]) -> Optional[Dict[str, Any]]:
+    if not candidates:
+        return None
+    best = min(candidates, key=lambda t: (-t[0], t[1]))
+    fields = best[2]
+    fields.update({
+        'item_id': row['item_id'],
+        'name': row['name'],
+        'query': query,
+        'qty_base': best[3],
+        'unit': best[4],
+        'expected_qty': row['expected_qty'],
+        'monthly_qty_base': row['monthly_qty_base'],
+        'substitution': ''
+    })
+    return fields
+
+
+def _log_choice(log_path: str, row: Dict[str, Any], chosen: Optional[Dict[str, Any]]) -> None:
+    if not chosen and row['fallback_keywords']:
+        json_log(log_path, 'substitution', {'item_id': row['item_id'], 'reason': 'no acceptable candidate'})
+    if chosen:
+        json_log(log_path, 'selected', {
+            'item_id': chosen['item_id'],
+            'title': chosen.get('title'),
+            'price_final': chosen.get('price_final'),
+            'qty_base': chosen.get('qty_base'),
+            'unit': chosen.get('unit')
+        })
+
+
+async def _cards_locator(page, card_specs):
+    for spec in card_specs:
+        if 'css' not in spec:
+            continue
+        try:
+            cand = page.locator(spec['css'])
+            if await cand.count() > 0:
+                await cand.first.wait_for(state='attached', timeout=5000)
+                return cand
+        except Exception:
+            continue
+    # fallback to article
+    return page.locator('article')
+
+
+async def _scroll_all(page, cards_loc) -> None:
+    # attempt to load more results via infinite scroll if applicable
+    try:
+        prev = await cards_loc.count()
+        for _ in range(6):  # up to ~6 pages
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            count = await wait_for_count_growth_async(page, cards_loc, prev, 'scroll', 700)
+            if count <= prev:
+                break
+            prev = count
+    except Exception:
+        pass
+
+
+async def _next_page(page, selectors: Dict[str, Any]) -> bool:
+    # try go next page
+    next_btn = await first_attached(page, selectors.get('pagination_next', []))
+    try:
+        if not next_btn or not await next_btn.is_enabled():
+            return False
+        mark = await settle_mark_async(page)
+        await next_btn.click()
+        # la grilla de la página anterior sigue ahí hasta que llega la nueva
+        await settle_async(page, 'paginate_click', 800, mark)
+        await wait_for_css_async(page, RESULTS_CSS, 'paginate', 800)
+    except Exception:
+        return False
+    return True
+
+
+async def _dom_candidates(page, row: Dict[str, Any], selectors: Dict[str, Any], exclude_keywords: List[str], base_url: str,
+                          plan: Optional[Dict[str, Any]] = None) -> List[Tuple[float, float, Dict[str, Any], float, str]]:
+    # Con ``plan`` (compile_card_plan) cada página de resultados se lee con un
+    # único page.content() y las tarjetas se parsean offline.
+    card_specs = selectors.get('product_card_root', [])
+    cards_loc = await _cards_locator(page, card_specs)
+    await _scroll_all(page, cards_loc)
+    found: List[Dict[str, Any]] = []
+    # current page + try next pages if available
+    for _page_i in range(1, 4):
+        if plan is not None:
+            found.extend(extract_cards_html(await page.content(), plan))
+        else:
+            total = min(await cards_loc.count(), 60)
+            for i in range(total):
+                found.append(await extract_card_fields_async(cards_loc.nth(i), selectors))
+        if not await _next_page(page, selectors):
+            break
+        # refresh cards locator for new page and scroll again
+        cards_loc = await _cards_locator(page, card_specs)
+        await _scroll_all(page, cards_loc)
+    return _candidates(row, found, exclude_keywords, base_url)
+
+
+async def _imetrics_candidates(page, html: str, row: Dict[str, Any], selectors: Dict[str, Any], exclude_keywords: List[str],
+                               base_url: str) -> List[Tuple[float, float, Dict[str, Any], float, str]]:
+    # mismas páginas que el modo DOM; si la primera no trae imetrics, lista vacía (fallback)
+    found = parse_imetrics_cards(html)
+    for _page_i in range(2, 4):
+        if not found or not await _next_page(page, selectors):
+            break
+        found.extend(parse_imetrics_cards(await page.content()))
+    return _candidates(row, found, exclude_keywords, base_url)
+
+
+async def search_one_async(page, row: Dict[str, Any], selectors: Dict[str, Any], evidence_dir: str, html_dump_dir: str,
+                           exclude_keywords: List[str], log_path: str, base_url: str = "", mode: str = "dom",
+                           goto_base: bool = True, plan: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Busca una fila del catálogo en ``page`` y devuelve el candidato elegido (o ``None``).
+
+    ``goto_base`` navega primero a ``base_url`` (página nueva del motor
+    async); la versión sync reutiliza la página ya posicionada.
+    """
+    query = _build_query(row)
+    if base_url and goto_base:
+        await page.goto(base_url, wait_until='domcontentloaded')
+    await _dismiss_overlays(page)
+    sinput = await first_attached(page, selectors.get('search_input', []))
+    if not sinput:
+        raise RuntimeError('No se encontró input de búsqueda (search_input).')
+    await sinput.click()
+    await sinput.fill('')
+    await sinput.type(query)
+    mark = await settle_mark_async(page)
+    await sinput.press('Enter')
+
+    # wait basic grid content (la home también tiene <article>: primero la navegación)
+    await settle_async(page, 'search_submit', 1000, mark)
+    await wait_for_css_async(page, RESULTS_CSS, 'search', 1000)
+    await _dismiss_overlays(page)
+
+    # evidence
+    base_name = search_basename(query)
+    clip_css = css_of(selectors.get('product_card_root', []), 'div.producto.item')
+    html, shot = await save_evidence_async(page, evidence_dir, html_dump_dir, base_name, clip_css)
+
+    candidates = []
+    if mode == 'imetrics':
+        candidates = await _imetrics_candidates(page, html or await page.content(), row, selectors, exclude_keywords, base_url)
+        if not candidates:
+            json_log(log_path, 'imetrics_fallback', {'item_id': row['item_id'], 'query': query})
+    if not candidates:
+        if plan is None and mode == 'snapshot':
+            plan = compile_card_plan(selectors)
+        candidates = await _dom_candidates(page, row, selectors, exclude_keywords, base_url, plan)
+
+    chosen = _choose(row, query, candidates)
+    _log_choice(log_path, row, chosen)
+    if not chosen and not shot and screenshot_mode() == 'sampled' and evidence_dir:
+        # muestreo: las sustituciones siempre quedan con captura
+        await capture_page_async(page, os.path.join(evidence_dir, f'{base_name}.png'), clip_css=clip_css, failed=True)
+    return chosen
+
+
+def run_searches(page, period: str, catalog: List[Dict[str, Any]], selectors: Dict[str, Any], evidence_dir: str, html_dump_dir: str, exclude_keywords: List[str], log_path: str, base_url: str = "", mode: str = "dom",
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """Busca cada fila del catálogo y elige el mejor candidato.
+
+    ``mode="imetrics"`` arma los candidatos desde los inputs imetrics del
+    HTML de resultados (un ``page.content()`` por página, siguiendo
+    ``pagination_next`` como el modo DOM); si la primera no los trae
+    se usa el scraping DOM tarjeta por tarjeta (``mode="dom"``).
+    ``mode="snapshot"`` navega igual que DOM pero parsea cada página de
+    resultados offline con el plan compilado de ``selectors``.
+    ``on_result(chosen)`` se llama por cada ítem elegido (journal de la corrida).
+    Cada búsqueda es :func:`search_one_async` sobre ``page`` (sync).
+    """
     # Selección de sucursal Ushuaia (9410)
     location_btn = _try_loc(page, selectors.get('location_button', []))
     if location_btn:
+        mark = settle_mark(page)
         location_btn.click()
-        page.wait_for_timeout(500)
+        settle(page, 'branch_click', 500, mark)
         postal_input = _try_loc(page, selectors.get('postal_input', []))
         if postal_input:
+            mark = settle_mark(page)
             postal_input.fill('9410')
-            page.wait_for_timeout(500)
+            settle(page, 'branch_click', 500, mark)
         branch_opt = _try_loc(page, selectors.get('branch_option', []))
         if branch_opt:
+            mark = settle_mark(page)
             branch_opt.click()
-            page.wait_for_timeout(300)
+            settle(page, 'branch_click', 300, mark)
             confirm_btn = _try_loc(page, selectors.get('confirm_button', []))
             if confirm_btn:
+                mark = settle_mark(page)
                 confirm_btn.click()
-                page.wait_for_timeout(500)
-    search_input_specs = selectors.get('search_input', [])
-    card_specs = selectors.get('product_card_root', [])
+                settle(page, 'branch_click', 500, mark)
+    plan = compile_card_plan(selectors) if mode == 'snapshot' else None
+    view = SyncView(page)
 
     results: List[Dict[str, Any]] = []
-
-    _dismiss_overlays(page)
-
     for row in catalog:
-        _dismiss_overlays(page)
-        query = _build_query(row)
-        sinput = _try_loc(page, search_input_specs)
-        if not sinput:
-            raise RuntimeError('No se encontró input de búsqueda (search_input).')
-        sinput.click()
-        sinput.fill('')
-        sinput.type(query)
-        sinput.press('Enter')
-
-        # wait basic grid content
-        page.wait_for_load_state('domcontentloaded')
-        page.wait_for_timeout(1000)
-        _dismiss_overlays(page)
-
-        # evidence
-        safe_q = re.sub(r'[^a-z0-9]+', '_', query.lower())
-        page.screenshot(path=os.path.join(evidence_dir, f'search_{safe_q}.png'), full_page=True)
-        with open(os.path.join(html_dump_dir, f'search_{safe_q}.html'), 'w', encoding='utf-8') as f:
-            f.write(page.content())
-
-        # collect cards
-        cards_loc = None
-        for spec in card_specs:
-            try:
-                cand = page.locator(spec.get('css') or '[data-product-card]') if 'css' in spec else None
-                if cand and cand.count() > 0:
-                    cand.first.wait_for(state='attached', timeout=5000)
-                    cards_loc = cand
-                    break
-            except Exception:
-                continue
-        if not cards_loc:
-            # fallback to article
-            cards_loc = page.locator('article')
-
-        # attempt to load more results via infinite scroll if applicable
-        try:
-            prev = -1
-            for _ in range(6):  # up to ~6 pages
-                count = cards_loc.count()
-                if count <= prev:
-                    break
-                prev = count
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                page.wait_for_timeout(700)
-        except Exception:
-            pass
-
-        candidates = []
-        # current page + try next pages if available
-        for _page_i in range(1, 4):
-            total = min(cards_loc.count(), 60)
-            for i in range(total):
-                card = cards_loc.nth(i)
-                fields = extract_card_fields(page, card, selectors)
-                # Build absolute URL if relative
-                if fields.get('url') and base_url and fields['url'].startswith('/'):
-                    fields['url'] = urljoin(base_url, fields['url'])
-                title = fields.get('title', '')
-                price = fields.get('price_final')
-                in_stock = fields.get('in_stock', True)
-                qty_base, unit = parse_title_size(title)
-                unit_price = (price / qty_base) if price and qty_base else None
-                score = _score_card(row, title, in_stock, unit_price if unit_price else 0, qty_base or 0, exclude_keywords)
-                candidates.append((score, unit_price if unit_price else 1e12, fields, qty_base or 0.0, unit or ''))
-            # try go next page
-            pagination_next_specs = selectors.get('pagination_next', [])
-            next_btn = _try_loc(page, pagination_next_specs)
-            try:
-                if next_btn and next_btn.is_enabled():
-                    next_btn.click()
-                    page.wait_for_load_state('domcontentloaded')
-                    page.wait_for_timeout(800)
-                    # refresh cards locator for new page
-                    cards_loc = None
-                    for spec in card_specs:
-                        try:
-                            cand = page.locator(spec.get('css') or '[data-product-card]') if 'css' in spec else None
-                            if cand and cand.count() > 0:
-                                cand.first.wait_for(state='attached', timeout=5000)
-                                cards_loc = cand
-                                break
-                        except Exception:
-                            continue
-                    if not cards_loc:
-                        cards_loc = page.locator('article')
-                    # scroll again on new page
-                    try:
-                        prev = -1
-                        for _ in range(6):
-                            count = cards_loc.count()
-                            if count <= prev:
-                                break
-                            prev = count
-                            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                            page.wait_for_timeout(700)
-                    except Exception:
-                        pass
-                else:
-                    break
-            except Exception:
-                break
-
-        chosen = None
-        if candidates:
-            candidates.sort(key=lambda t: (-t[0], t[1]))
-            best = candidates[0]
-            fields = best[2]
-            fields.update({
-                'item_id': row['item_id'],
-                'name': row['name'],
-                'query': query,
-                'qty_base': best[3],
-                'unit': best[4],
-                'expected_qty': row['expected_qty'],
-                'monthly_qty_base': row['monthly_qty_base'],
-                'substitution': ''
-            })
-            chosen = fields
-        if not chosen and row['fallback_keywords']:
-            json_log(log_path, 'substitution', {'item_id': row['item_id'], 'reason': 'no acceptable candidate'})
+        chosen = run_sync(search_one_async(view, row, selectors, evidence_dir, html_dump_dir, exclude_keywords,
+                                           log_path, base_url, mode, goto_base=False, plan=plan))
         if chosen:
-            json_log(log_path, 'selected', {
-                'item_id': chosen['item_id'],
-                'title': chosen.get('title'),
-                'price_final': chosen.get('price_final'),
-                'qty_base': chosen.get('qty_base'),
-                'unit': chosen.get('unit')
-            })
             results.append(chosen)
+            if on_result:
+                on_result(chosen)
     return results
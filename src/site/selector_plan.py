@@ -0,0 +1,244 @@
+"""Plan de selectores precompilado para ``config/selectors.json``.
+
+``load_selector_plan()`` compila el JSON una vez por corrida: cada spec pasa a
+ser un :class:`CompiledSpec` (dict de solo lectura con sus regex ya armadas,
+con y sin ``re.I``) y cada clave queda con sus specs en el orden a probar.
+El :class:`SelectorPlan` se usa donde antes se pasaba el dict de selectores
+(``plan.get('title', [])`` devuelve la lista de specs compiladas), así que
+:func:`first_present`, :func:`first_attached` (y sus wrappers sync
+``_try_loc``, ``_loc_try``, ``_page_first``) y ``_locator_from_spec`` lo
+consumen sin cambiar de firma.
+
+Los helpers registran por spec aciertos, fallos y el tiempo perdido en cada
+fallo (el timeout de ``_try_loc`` / ``_locate_first``) con
+:func:`note_match`. ``plan.stats()`` va al log de la corrida (evento
+``selector_stats``: qué índice del archivo acertó por clave) y
+``plan.save()`` acumula el historial, con decaimiento, en
+``data/selector_plan.json`` junto con el md5 de ``selectors.json``.
+
+La corrida siguiente ordena cada clave por costo esperado: primero los specs
+con mayor probabilidad de acierto por milisegundo de intento, de modo que un
+selector viejo que siempre agota su timeout pasa al final. Si el md5 cambió,
+el historial se descarta y se vuelve al orden del archivo.
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+DEFAULT_PLAN_STORE = Path("data/selector_plan.json")
+
+_RX_FIELDS = ('text', 'name', 'placeholder', 'has_text')
+
+# costo asumido de un acierto y de un fallo sin historial (ms)
+HIT_MS = 50.0
+DEFAULT_MISS_MS = 1000.0
+# peso del historial previo al acumular una corrida nueva
+DECAY = 0.8
+
+
+@functools.lru_cache(maxsize=512)
+def _compile(pattern: str, flags: int) -> 're.Pattern[str]':
+    return re.compile(pattern, flags)
+
+
+def spec_rx(spec: Dict[str, Any], field: str, flags: int = 0) -> 're.Pattern[str]':
+    """Regex de ``spec[field]``: precompilada en el plan o cacheada para dicts sueltos."""
+    compiled = getattr(spec, '_rx', None)
+    if compiled is not None:
+        return compiled[(field, flags)]
+    return _compile(spec[field], flags)
+
+
+def note_match(spec: Dict[str, Any], hit: bool, ms: float = 0.0) -> None:
+    """Registra si ``spec`` encontró nodo y cuánto tardó (no-op para dicts sin plan)."""
+    plan = getattr(spec, '_plan', None)
+    if plan is not None:
+        plan.record(spec.key, spec.index, hit, ms)
+
+
+def locator_for(root, spec: Dict[str, Any]):
+    """Locator de ``spec`` sobre ``root`` (página o tarjeta); ``None`` si el spec no aplica."""
+    if 'css' in spec:
+        return root.locator(spec['css'])
+    if 'role' in spec:
+        name = spec_rx(spec, 'name') if spec.get('name') else None
+        return root.get_by_role(spec['role'], name=name)
+    if 'text' in spec:
+        return root.get_by_text(spec_rx(spec, 'text'))
+    if 'placeholder' in spec and hasattr(root, 'get_by_placeholder'):
+        return root.get_by_placeholder(spec_rx(spec, 'placeholder'))
+    return None
+
+
+async def first_present(root, specs):
+    """Primer spec con nodos ya presentes en ``root`` (sin esperar)."""
+    for spec in specs:
+        loc = locator_for(root, spec)
+        if loc is None:
+            continue
+        t0 = time.perf_counter()
+        try:
+            if await loc.count() > 0:
+                note_match(spec, True)
+                return loc.first
+        except Exception:
+            pass
+        note_match(spec, False, (time.perf_counter() - t0) * 1000)
+    return None
+
+
+async def first_attached(root, specs, timeout: float = 2000):
+    """Primer spec cuyo nodo aparece dentro de ``timeout`` ms."""
+    for spec in specs:
+        loc = locator_for(root, spec)
+        if loc is None:
+            continue
+        t0 = time.perf_counter()
+        try:
+            await loc.first.wait_for(state='attached', timeout=timeout)
+            note_match(spec, True)
+            return loc.first
+        except Exception:
+            note_match(spec, False, (time.perf_counter() - t0) * 1000)
+    return None
+
+
+def _priority(hits: float, tries: float, miss_ms: float, default_miss_ms: float) -> float:
+    # probabilidad de acierto (Laplace) sobre el costo esperado de probar el spec
+    p = (hits + 1) / (tries + 2)
+    misses = tries - hits
+    avg_miss = miss_ms / misses if misses > 0 else default_miss_ms
+    return p / (p * HIT_MS + (1 - p) * max(avg_miss, 1.0))
+
+
+class CompiledSpec(dict):
+    """Spec de solo lectura con clave, índice en el archivo y regex compiladas."""
+
+    def __init__(self, key: str, index: int, spec: Dict[str, Any], plan: Optional['SelectorPlan'] = None):
+        super().__init__(spec)
+        self.key = key
+        self.index = index
+        self._plan = plan
+        self._rx = {}
+        for field in _RX_FIELDS:
+            if spec.get(field):
+                self._rx[(field, 0)] = _compile(spec[field], 0)
+                self._rx[(field, re.I)] = _compile(spec[field], re.I)
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('CompiledSpec es de solo lectura')
+
+    __setitem__ = __delitem__ = update = pop = popitem = setdefault = clear = _readonly
+
+    def __reduce__(self):
+        # los workers de otros procesos reciben el spec sin estadísticas
+        return (CompiledSpec, (self.key, self.index, dict(self)))
+
+
+class SelectorPlan(Mapping):
+    def __init__(self, selectors: Dict[str, Any], md5: str = '', history: Optional[Dict[str, Any]] = None,
+                 store: Union[str, Path] = DEFAULT_PLAN_STORE):
+        self.md5 = md5
+        self.store = Path(store)
+        self._lock = threading.Lock()
+        self._raw: Dict[str, Any] = {}
+        self._specs: Dict[str, tuple] = {}
+        self._hits: Dict[str, List[int]] = {}
+        self._tries: Dict[str, List[int]] = {}
+        self._miss_ms: Dict[str, List[float]] = {}
+        self._history = history or {}
+        for key, value in selectors.items():
+            if isinstance(value, list) and all(isinstance(v, dict) for v in value):
+                specs = [CompiledSpec(key, i, v, self) for i, v in enumerate(value)]
+                order = self.rank(key, len(specs))
+                self._specs[key] = tuple(specs[i] for i in order)
+                self._hits[key] = [0] * len(specs)
+                self._tries[key] = [0] * len(specs)
+                self._miss_ms[key] = [0.0] * len(specs)
+            else:
+                self._raw[key] = value
+
+    # --- Mapping ---------------------------------------------------------------
+
+    def __getitem__(self, key: str):
+        if key in self._specs:
+            return list(self._specs[key])
+        return self._raw[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._specs
+        yield from self._raw
+
+    def __len__(self) -> int:
+        return len(self._specs) + len(self._raw)
+
+    # --- orden y estadísticas ----------------------------------------------------
+
+    def rank(self, key: str, n: int) -> List[int]:
+        """Orden de prueba por costo esperado histórico; empate por orden del archivo."""
+        hist = self._history.get(key) or {}
+        hits, tries = hist.get('hits') or [], hist.get('tries') or []
+        miss_ms = hist.get('miss_ms') or [0.0] * n
+        if not (len(hits) == len(tries) == len(miss_ms) == n) or not any(tries):
+            return list(range(n))
+        misses = sum(t - h for h, t in zip(hits, tries))
+        default = sum(miss_ms) / misses if misses > 0 and sum(miss_ms) > 0 else DEFAULT_MISS_MS
+        prio = [_priority(hits[i], tries[i], miss_ms[i], default) for i in range(n)]
+        return sorted(range(n), key=lambda i: (-prio[i], i))
+
+    def order(self, key: str) -> List[int]:
+        return [s.index for s in self._specs.get(key, ())]
+
+    def record(self, key: str, index: int, hit: bool, ms: float = 0.0) -> None:
+        with self._lock:
+            self._tries[key][index] += 1
+            if hit:
+                self._hits[key][index] += 1
+            else:
+                self._miss_ms[key][index] += ms
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Por clave usada en la corrida: aciertos/intentos/ms perdidos por índice del archivo y orden aplicado."""
+        with self._lock:
+            return {k: {'hits': list(self._hits[k]), 'tries': list(self._tries[k]),
+                        'miss_ms': [round(v, 1) for v in self._miss_ms[k]], 'order': self.order(k)}
+                    for k in self._specs if any(self._tries[k])}
+
+    def save(self) -> None:
+        """Acumula las estadísticas de la corrida en el store junto con el md5."""
+        keys: Dict[str, Any] = {}
+        with self._lock:
+            for k in self._specs:
+                hist = self._history.get(k) or {}
+                n = len(self._hits[k])
+                cur = {'hits': self._hits[k], 'tries': self._tries[k], 'miss_ms': self._miss_ms[k]}
+                keys[k] = {}
+                for field, now in cur.items():
+                    prev = hist.get(field) if len(hist.get(field) or []) == n else [0] * n
+                    keys[k][field] = [round(a * DECAY + b, 3) for a, b in zip(prev, now)]
+        self.store.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(str(self.store) + '.tmp')
+        tmp.write_text(json.dumps({'selectors_md5': self.md5, 'keys': keys}, ensure_ascii=False, indent=1), encoding='utf-8')
+        os.replace(tmp, self.store)
+
+
+def load_selector_plan(path: Union[str, Path] = 'config/selectors.json',
+                       store: Union[str, Path] = DEFAULT_PLAN_STORE) -> SelectorPlan:
+    """Compila ``selectors.json``; reutiliza el historial si el md5 coincide."""
+    raw = Path(path).read_bytes()
+    md5 = hashlib.md5(raw).hexdigest()
+    history: Dict[str, Any] = {}
+    try:
+        saved = json.loads(Path(store).read_text(encoding='utf-8'))
+        if saved.get('selectors_md5') == md5:
+            history = saved.get('keys') or {}
+    except Exception:
+        pass
+    return SelectorPlan(json.loads(raw.decode('utf-8')), md5=md5, history=history, store=store)
@@ -0,0 +1,332 @@
+"""Sesión de navegador persistente compartida entre corridas.
+
+``session-serve`` deja un Chromium con ``--remote-debugging-port`` abierto y
+con la sucursal verificada en su contexto por defecto. ``run --attach`` y
+``pins-run --attach`` se conectan por CDP (``connect_over_cdp``) en lugar de
+lanzar un navegador y volver a elegir sucursal.
+
+El estado se publica en ``data/session.json`` (``cdp_url``, pid, páginas
+servidas, leases activos), siempre bajo ``session.json.lock``. El daemon
+verifica periódicamente que el proceso responda y que el header siga
+mostrando la sucursal, y recicla el navegador después de ``recycle_after``
+páginas cuando no hay clientes conectados; mientras re-verifica (estado
+``verifying``) no se otorgan leases.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .utils import json_log
+
+SESSION_FILE = Path("data/session.json")
+DEFAULT_PORT = 9222
+# un lease sin liberar por más de esto se considera de un cliente muerto
+LEASE_STALE_SECONDS = 3 * 3600
+# las secciones críticas son lecturas/escrituras de session.json (milisegundos)
+LOCK_STALE_SECONDS = 60
+
+
+# --- estado compartido ------------------------------------------------------
+
+def _pid_alive(pid: int) -> Optional[bool]:
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        # os.kill(pid, 0) en Windows manda CTRL_C_EVENT: no se puede saber
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _read_lock(lock: str) -> Optional[str]:
+    try:
+        with open(lock, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _lock_is_stale(lock: str, content: Optional[str]) -> bool:
+    # el lock guarda "<pid> <time>"; se rompe solo si ese pid ya no existe o,
+    # sin poder verificarlo (Windows), si quedó tomado mucho más que cualquier
+    # sección crítica
+    if content is None:
+        return False
+    try:
+        pid_s, _, ts_s = content.partition(' ')
+        pid, ts = int(pid_s), float(ts_s)
+    except ValueError:
+        # recién creado y todavía sin contenido: mirar el mtime
+        try:
+            return time.time() - os.path.getmtime(lock) > LOCK_STALE_SECONDS
+        except OSError:
+            return False
+    alive = _pid_alive(pid)
+    if alive is None:
+        return time.time() - ts > LOCK_STALE_SECONDS
+    return not alive
+
+
+def _break_stale(lock: str, content: str) -> None:
+    # se aparta con rename (atómico) y se confirma que era el mismo lock
+    # huérfano; si en el medio otro proceso lo tomó, se le devuelve
+    orphan = f'{lock}.{os.getpid()}.stale'
+    try:
+        os.replace(lock, orphan)
+    except OSError:
+        return
+    if _read_lock(orphan) != content:
+        try:
+            os.link(orphan, lock)
+        except OSError:
+            pass
+    try:
+        os.unlink(orphan)
+    except OSError:
+        pass
+
+
+def _lock(path: Path) -> int:
+    """Lock de ``session.json``: espera mientras el proceso dueño siga vivo."""
+    lock = str(path) + '.lock'
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            content = _read_lock(lock)
+            if _lock_is_stale(lock, content):
+                _break_stale(lock, content)
+            else:
+                time.sleep(0.05)
+            continue
+        os.write(fd, f'{os.getpid()} {time.time():.3f}'.encode())
+        return fd
+
+
+def _unlock(path: Path, fd: int) -> None:
+    os.close(fd)
+    try:
+        os.unlink(str(path) + '.lock')
+    except OSError:
+        pass
+
+
+def read_session(path: Path = SESSION_FILE) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except Exception:
+        return None
+
+
+def _write_session(state: Dict[str, Any], path: Path = SESSION_FILE) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(str(path) + '.tmp')
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _update_session(fn: Callable[[Dict[str, Any]], None], path: Path = SESSION_FILE) -> Optional[Dict[str, Any]]:
+    fd = _lock(path)
+    try:
+        state = read_session(path)
+        if state is None:
+            return None
+        fn(state)
+        _write_session(state, path)
+        return state
+    finally:
+        _unlock(path, fd)
+
+
+def cdp_alive(cdp_url: str, timeout: float = 2.0) -> bool:
+    try:
+        with urllib.request.urlopen(cdp_url.rstrip('/') + '/json/version', timeout=timeout) as resp:
+            return resp.status == 200
+    except Exception:
+        return False
+
+
+def live_session(path: Path = SESSION_FILE) -> Optional[Dict[str, Any]]:
+    """Estado de la sesión si el daemon está arriba y responde por CDP."""
+    state = read_session(path)
+    if not state or state.get('status') != 'ready' or not state.get('cdp_url'):
+        return None
+    return state if cdp_alive(state['cdp_url']) else None
+
+
+def _live_leases(state: Dict[str, Any]) -> Dict[str, float]:
+    now = time.time()
+    return {k: v for k, v in (state.get('leases') or {}).items() if now - v < LEASE_STALE_SECONDS}
+
+
+def acquire_lease(path: Path = SESSION_FILE) -> Optional[str]:
+    """Registra un cliente conectado; devuelve su id de lease.
+
+    ``None`` si la sesión no está ``ready`` (p. ej. el daemon está
+    re-verificando la sucursal en el contexto compartido).
+    """
+    lease = f"{os.getpid()}-{time.time():.3f}"
+
+    def _add(state):
+        if state.get('status') == 'ready':
+            state.setdefault('leases', {})[lease] = time.time()
+    state = _update_session(_add, path)
+    return lease if state is not None and lease in state.get('leases', {}) else None
+
+
+def _begin_verify(state: Dict[str, Any]) -> None:
+    # bajo el lock: sin clientes, la sesión deja de aceptar leases hasta
+    # terminar de navegar el contexto compartido
+    if state.get('status') == 'ready' and not _live_leases(state):
+        state['status'] = 'verifying'
+
+
+def release_lease(lease: Optional[str], pages: int = 0, path: Path = SESSION_FILE) -> None:
+    def _drop(state):
+        state.get('leases', {}).pop(lease, None)
+        state['pages_served'] = int(state.get('pages_served', 0)) + int(pages)
+    if lease:
+        _update_session(_drop, path)
+
+
+def count_loads(page) -> None:
+    """Cuenta navegaciones de ``page`` para el reciclado por páginas."""
+    setattr(page, '_session_loads', 0)
+
+    def _on_load(_p):
+        page._session_loads += 1
+    try:
+        page.on('load', _on_load)
+    except Exception:
+        pass
+
+
+def release_page(page) -> int:
+    """Cierra solo la página y se desconecta: el navegador compartido sigue vivo.
+
+    Devuelve las navegaciones contadas por :func:`count_loads`.
+    """
+    pages = getattr(page, '_session_loads', 0)
+    for closer in (lambda: page.close(), lambda: page._branch_browser.close(), lambda: page._branch_playwright.stop()):
+        try:
+            closer()
+        except Exception:
+            pass
+    return pages
+
+
+# --- daemon -----------------------------------------------------------------
+
+def _chromium_executable() -> str:
+    from playwright.sync_api import sync_playwright
+    p = sync_playwright().start()
+    try:
+        return p.chromium.executable_path
+    finally:
+        p.stop()
+
+
+def _launch(port: int, headless: bool, user_data_dir: str) -> subprocess.Popen:
+    args = [
+        _chromium_executable(),
+        f'--remote-debugging-port={port}',
+        f'--user-data-dir={user_data_dir}',
+        '--no-first-run',
+        '--no-default-browser-check',
+        '--disable-background-networking',
+    ]
+    if headless:
+        args.append('--headless=new')
+    args.append('about:blank')
+    return subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_cdp(cdp_url: str, timeout: float = 20.0) -> bool:
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        if cdp_alive(cdp_url, timeout=1.0):
+            return True
+        time.sleep(0.25)
+    return False
+
+
+def serve(*, verify_branch: Callable[[str], bool], log_path: str, port: int = DEFAULT_PORT, recycle_after: int = 300,
+          health_interval: float = 120, headless: bool = True, session_path: Path = SESSION_FILE,
+          max_cycles: Optional[int] = None) -> int:
+    """Loop del daemon ``session-serve``.
+
+    ``verify_branch(cdp_url)`` se conecta por CDP, asegura la sucursal en el
+    contexto por defecto y devuelve ``True`` si quedó verificada (el CLI usa
+    ``ensure_branch(cdp_url=...)``). Se llama al arrancar cada ciclo y en cada
+    chequeo de salud.
+    """
+    cdp_url = f'http://127.0.0.1:{port}'
+    cycles = 0
+    try:
+        while max_cycles is None or cycles < max_cycles:
+            cycles += 1
+            profile_dir = tempfile.mkdtemp(prefix='ipc_session_')
+            proc = _launch(port, headless, profile_dir)
+            t0 = time.perf_counter()
+            state: Dict[str, Any] = {
+                'status': 'starting', 'cdp_url': cdp_url, 'pid': proc.pid, 'daemon_pid': os.getpid(),
+                'started': time.time(), 'cycle': cycles, 'pages_served': 0, 'leases': {},
+                'recycle_after': recycle_after, 'branch_verified_at': None,
+            }
+            _write_session(state, session_path)
+            try:
+                if not _wait_cdp(cdp_url):
+                    json_log(log_path, 'session_launch_failed', {'port': port})
+                    time.sleep(min(health_interval, 30))
+                    continue
+                ok = verify_branch(cdp_url)
+                _update_session(lambda s: s.update({'status': 'ready' if ok else 'branch_failed',
+                                                    'branch_verified_at': time.time() if ok else None}), session_path)
+                json_log(log_path, 'session_ready', {'cdp_url': cdp_url, 'cycle': cycles, 'branch_ok': ok,
+                                                     'seconds': round(time.perf_counter() - t0, 3)})
+                if not ok:
+                    continue
+                while True:
+                    time.sleep(health_interval)
+                    st = _update_session(_begin_verify, session_path) or {}
+                    if proc.poll() is not None or not cdp_alive(cdp_url):
+                        json_log(log_path, 'session_unhealthy', {'reason': 'process', 'cycle': cycles})
+                        break
+                    if st.get('status') != 'verifying':
+                        # no navegar el contexto compartido mientras hay clientes
+                        continue
+                    if int(st.get('pages_served', 0)) >= recycle_after:
+                        json_log(log_path, 'session_recycle', {'pages_served': st.get('pages_served'), 'cycle': cycles})
+                        break
+                    if not verify_branch(cdp_url):
+                        json_log(log_path, 'session_unhealthy', {'reason': 'branch', 'cycle': cycles})
+                        break
+                    _update_session(lambda s: s.update({'status': 'ready', 'branch_verified_at': time.time()}), session_path)
+            finally:
+                _update_session(lambda s: s.update({'status': 'recycling'}), session_path)
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except Exception:
+                    proc.kill()
+                shutil.rmtree(profile_dir, ignore_errors=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            Path(session_path).unlink()
+        except OSError:
+            pass
+        json_log(log_path, 'session_stopped', {'cycles': cycles})
+    return 0
@@ -0,0 +1,166 @@
+"""Esperas por señal en lugar de ``wait_for_timeout`` fijos.
+
+Cada espera resuelve apenas se cumple una condición concreta (aparece un
+nodo, crece la cantidad de tarjetas, llega una respuesta de red después de un
+click) y registra cuánto tardó realmente junto con el sleep fijo que
+reemplaza; solo las esperas cuya señal llegó cuentan como ahorro.
+``waits_summary()`` resume esos tiempos para el log de la corrida (evento
+``waits_summary``).
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .bridge import SyncView, run_sync
+
+_LOCK = threading.Lock()
+_STATS: Dict[str, Dict[str, float]] = {}
+
+# solo el selector: una página sin resultados agota el timeout (y no ahorra nada)
+_PRESENT_JS = """
+(css) => {
+  try { return !!document.querySelector(css); } catch (e) { return false; }
+}
+"""
+
+# marca previa a un click: cantidad de respuestas de red ya terminadas
+_MARK_JS = """
+() => {
+  try { performance.setResourceTimingBufferSize(5000); } catch (e) {}
+  window.__waitsMark = performance.getEntriesByType('resource').length;
+  return window.__waitsMark;
+}
+"""
+
+# señal posterior al click: navegó (documento nuevo, sin marca) o terminó una
+# respuesta de red nueva
+_SETTLED_JS = """
+(n) => {
+  if (window.__waitsMark === undefined) return document.readyState !== 'loading';
+  return performance.getEntriesByType('resource').length > n;
+}
+"""
+
+RESULTS_CSS = "div.producto.item, input[id^='precio_item_imetrics_'], [data-product-card], article"
+
+
+def record_wait(name: str, fixed_ms: float, actual_ms: float, fired: bool, timed_out: bool = False) -> None:
+    """Registra una espera; solo las que vieron su señal (``fired``) suman ahorro."""
+    with _LOCK:
+        st = _STATS.setdefault(name, {'count': 0, 'fired': 0, 'timeouts': 0, 'fixed_ms': 0.0, 'actual_ms': 0.0, 'saved_ms': 0.0})
+        st['count'] += 1
+        st['fired'] += int(fired)
+        st['timeouts'] += int(timed_out)
+        st['fixed_ms'] += fixed_ms
+        st['actual_ms'] += actual_ms
+        if fired:
+            st['saved_ms'] += fixed_ms - actual_ms
+
+
+def reset_waits() -> None:
+    with _LOCK:
+        _STATS.clear()
+
+
+def waits_summary() -> Dict[str, Any]:
+    """Totales por tipo de espera y ahorro contra los sleeps fijos."""
+    with _LOCK:
+        waits = {k: {kk: round(vv, 1) for kk, vv in v.items()} for k, v in _STATS.items()}
+    return {
+        'waits': waits,
+        'fixed_ms': round(sum(v['fixed_ms'] for v in waits.values()), 1),
+        'actual_ms': round(sum(v['actual_ms'] for v in waits.values()), 1),
+        'saved_ms': round(sum(v['saved_ms'] for v in waits.values()), 1),
+    }
+
+
+def css_of(specs: List[Dict[str, Any]], extra: str = '') -> str:
+    parts = [s['css'] for s in specs if 'css' in s]
+    if extra:
+        parts.append(extra)
+    return ', '.join(parts)
+
+
+def _ms(t0: float) -> float:
+    return (time.perf_counter() - t0) * 1000
+
+
+# --- async (motor único: product/extract/search, ver bridge.py) -----------
+
+async def wait_for_css_async(page, css: str, name: str, fixed_ms: float, timeout: float = 3000) -> bool:
+    """Espera a que exista ``css``; ``False`` si se agotó ``timeout``."""
+    t0 = time.perf_counter()
+    ok = True
+    try:
+        await page.wait_for_function(_PRESENT_JS, arg=css or 'body', timeout=timeout)
+    except Exception:
+        ok = False
+    record_wait(name, fixed_ms, _ms(t0), ok, timed_out=not ok)
+    return ok
+
+
+async def settle_mark_async(page) -> Optional[int]:
+    """Marca antes de un click para :func:`settle_async` (``None`` si no se pudo)."""
+    try:
+        return int(await page.evaluate(_MARK_JS))
+    except Exception:
+        return None
+
+
+async def settle_async(page, name: str, fixed_ms: float, mark: Optional[int]) -> bool:
+    """Tras un click: vuelve apenas hay navegación o una respuesta de red nueva.
+
+    Sin señal espera como mucho ``fixed_ms`` (el sleep que reemplaza), así
+    que nunca tarda más que antes; el ahorro solo cuenta si la señal llegó.
+    """
+    t0 = time.perf_counter()
+    fired = False
+    if mark is None:
+        await page.wait_for_timeout(fixed_ms)
+    else:
+        try:
+            await page.wait_for_function(_SETTLED_JS, arg=mark, timeout=fixed_ms)
+            fired = True
+        except Exception:
+            pass
+    record_wait(name, fixed_ms, _ms(t0), fired)
+    return fired
+
+
+async def wait_for_count_growth_async(page, loc, prev: int, name: str, fixed_ms: float, poll_ms: float = 100) -> int:
+    """Scroll infinito: vuelve apenas ``loc`` supera ``prev`` tarjetas.
+
+    Si no crece, espera como máximo ``fixed_ms`` (el sleep anterior); ese
+    chequeo final es el fin normal del scroll, no un timeout.
+    """
+    t0 = time.perf_counter()
+    count = prev
+    while True:
+        try:
+            count = await loc.count()
+        except Exception:
+            break
+        if count > prev or _ms(t0) >= fixed_ms:
+            break
+        # wait_for_timeout y no asyncio.sleep: el motor también corre sobre páginas sync
+        await page.wait_for_timeout(poll_ms)
+    record_wait(name, fixed_ms, _ms(t0), count > prev)
+    return count
+
+
+# --- sync (branch.py): wrappers del mismo código ---------------------------
+
+def wait_for_css(page, css: str, name: str, fixed_ms: float, timeout: float = 3000) -> bool:
+    return run_sync(wait_for_css_async(SyncView(page), css, name, fixed_ms, timeout))
+
+
+def settle_mark(page) -> Optional[int]:
+    return run_sync(settle_mark_async(SyncView(page)))
+
+
+def settle(page, name: str, fixed_ms: float, mark: Optional[int]) -> bool:
+    return run_sync(settle_async(SyncView(page), name, fixed_ms, mark))
+
+
+def wait_for_count_growth(page, loc, prev: int, name: str, fixed_ms: float, poll_ms: float = 100) -> int:
+    return run_sync(wait_for_count_growth_async(SyncView(page), SyncView(loc), prev, name, fixed_ms, poll_ms))
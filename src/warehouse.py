@@ -0,0 +1,351 @@
+"""Almacén local de precios en SQLite (modo WAL).
+
+Reemplaza a los CSV como fuente de verdad: cada corrida inserta sus filas
+costeadas en un solo lote (``record_run``) y el índice del período
+(``record_index``); ``breakdown_<periodo>.csv``, ``daily_prices_<fecha>.csv``
+y ``series_cba.csv`` pasan a ser exportaciones generadas desde acá
+(``breakdown``, ``daily_prices``, ``series``) y el reporte consulta el mes
+anterior y la serie sin volver a leer archivos.
+
+El esquema replica ``ipc-ushuaia/src/db/migrations/0001_init.sql``
+(``products``, ``skus``, ``runs``, ``prices``, ``index_values``) con estas
+diferencias:
+
+- ``products`` es un ítem del catálogo (``item_id``) y ``skus`` una página
+  de producto (``code`` = ``art_<id>`` de la URL);
+- ``prices`` guarda además las columnas del desglose (título, cantidades,
+  costo por AE, metadatos del pin) y la fecha de la corrida, con índice
+  ``(sku_id, run_date)`` para el historial; la unicidad es por
+  ``(run_id, item_id)`` porque dos ítems pueden apuntar al mismo producto, y
+  ``price_final`` admite NULL como las filas sin precio del desglose;
+- ``index_values`` lleva el período para armar la serie (la última corrida
+  de cada período).
+
+``runs`` es único por ``(run_date, branch)``: re-correr el mismo día reemplaza
+los precios de esa corrida, igual que antes se sobrescribía el CSV del día.
+"""
+import csv
+import glob
+import os
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_DB = 'data/warehouse.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    item_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    brand TEXT,
+    category TEXT
+);
+
+CREATE TABLE IF NOT EXISTS skus (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER REFERENCES products(id) ON DELETE CASCADE,
+    code TEXT NOT NULL UNIQUE,
+    description TEXT,
+    url TEXT,
+    pack_size REAL,
+    pack_unit TEXT,
+    is_active INTEGER DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS idx_skus_product_id ON skus(product_id);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_date TEXT NOT NULL,
+    period TEXT NOT NULL,
+    branch TEXT NOT NULL DEFAULT '',
+    status TEXT,
+    UNIQUE(run_date, branch)
+);
+
+CREATE TABLE IF NOT EXISTS prices (
+    id INTEGER PRIMARY KEY,
+    sku_id INTEGER REFERENCES skus(id) ON DELETE CASCADE,
+    run_id INTEGER REFERENCES runs(id) ON DELETE CASCADE,
+    run_date TEXT NOT NULL,
+    period TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    name TEXT,
+    query TEXT,
+    title TEXT,
+    url TEXT,
+    price_final REAL,
+    price_original REAL,
+    price_promo REAL,
+    promo TEXT,
+    stock INTEGER,
+    promo_flag INTEGER,
+    qty_base REAL,
+    unit TEXT,
+    unit_price_base REAL,
+    expected_qty REAL,
+    cost_item_ae REAL,
+    substitution TEXT,
+    brand_tier TEXT,
+    cba_flag TEXT,
+    category TEXT,
+    timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(run_id, item_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_prices_sku_date ON prices(sku_id, run_date);
+CREATE INDEX IF NOT EXISTS idx_prices_item_date ON prices(item_id, run_date);
+
+CREATE TABLE IF NOT EXISTS index_values (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL UNIQUE REFERENCES runs(id) ON DELETE CASCADE,
+    period TEXT NOT NULL,
+    cba_ae REAL,
+    cba_family REAL,
+    index_value REAL,
+    var_mm REAL,
+    var_ia REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_index_values_period ON index_values(period);
+"""
+
+# columnas del desglose tal como las exporta write_breakdown
+BREAKDOWN_FIELDS = (
+    'period', 'item_id', 'name', 'query', 'title', 'url', 'brand_tier', 'cba_flag', 'category', 'in_stock', 'promo_flag',
+    'price_original', 'price_promo', 'price_final', 'unit_price_base', 'qty_base', 'expected_qty', 'cost_item_ae', 'substitution',
+)
+
+_ART_RE = re.compile(r'/art_(\d+)')
+
+_FLOAT_COLS = ('price_final', 'price_original', 'price_promo', 'qty_base', 'unit_price_base', 'expected_qty', 'cost_item_ae')
+
+
+def connect(path: str = DEFAULT_DB) -> sqlite3.Connection:
+    """Abre (o crea) el almacén en modo WAL con el esquema al día."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    # WAL: el reporte puede leer mientras otra corrida escribe
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def sku_code(row: Dict[str, Any]) -> str:
+    url = row.get('url') or ''
+    m = _ART_RE.search(url)
+    return f"art_{m.group(1)}" if m else (url or f"item:{row.get('item_id')}")
+
+
+def _float(v: Any) -> Optional[float]:
+    if v in (None, ''):
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _flag(v: Any) -> Optional[int]:
+    if v in (None, ''):
+        return None
+    if isinstance(v, str):
+        return int(v.strip().lower() in ('1', 'true', 'yes', 'si', 'sí', 's'))
+    return int(bool(v))
+
+
+def record_run(conn: sqlite3.Connection, *, period: str, run_date: str, rows: List[Dict[str, Any]],
+               branch: str = '', status: str = 'ok') -> int:
+    """Inserta las filas costeadas de una corrida en un solo lote; devuelve ``run_id``."""
+    rows = [r for r in rows if r.get('item_id')]
+    with conn:
+        conn.execute(
+            'INSERT INTO runs (run_date, period, branch, status) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(run_date, branch) DO UPDATE SET period = excluded.period, status = excluded.status',
+            (run_date, period, branch, status),
+        )
+        run_id = conn.execute('SELECT id FROM runs WHERE run_date = ? AND branch = ?', (run_date, branch)).fetchone()[0]
+        conn.execute('DELETE FROM prices WHERE run_id = ?', (run_id,))
+        conn.executemany(
+            'INSERT INTO products (item_id, name, brand, category) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(item_id) DO UPDATE SET name = excluded.name, brand = excluded.brand, category = excluded.category',
+            [(r['item_id'], r.get('name') or r['item_id'], r.get('brand_tier') or '', r.get('category') or '') for r in rows],
+        )
+        product_ids = {iid: pid for pid, iid in conn.execute('SELECT id, item_id FROM products')}
+        conn.executemany(
+            'INSERT INTO skus (product_id, code, description, url, pack_size, pack_unit) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(code) DO UPDATE SET description = excluded.description, url = excluded.url, '
+            'pack_size = excluded.pack_size, pack_unit = excluded.pack_unit, is_active = 1',
+            [(product_ids[r['item_id']], sku_code(r), r.get('title') or '', r.get('url') or '', _float(r.get('qty_base')), r.get('unit'))
+             for r in rows],
+        )
+        sku_ids = {code: sid for sid, code in conn.execute('SELECT id, code FROM skus')}
+        conn.executemany(
+            'INSERT INTO prices (sku_id, run_id, run_date, period, item_id, name, query, title, url, price_final, price_original, '
+            'price_promo, promo, stock, promo_flag, qty_base, unit, unit_price_base, expected_qty, cost_item_ae, substitution, '
+            'brand_tier, cba_flag, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(
+                sku_ids[sku_code(r)], run_id, run_date, period, r['item_id'], r.get('name'), r.get('query'), r.get('title'),
+                r.get('url'), _float(r.get('price_final')), _float(r.get('price_original')), _float(r.get('price_promo')),
+                'promo' if _flag(r.get('promo_flag')) else None, _flag(r.get('in_stock')), _flag(r.get('promo_flag')),
+                _float(r.get('qty_base')), r.get('unit'), _float(r.get('unit_price_base')), _float(r.get('expected_qty')),
+                _float(r.get('cost_item_ae')), r.get('substitution') or '', r.get('brand_tier') or '', r.get('cba_flag') or '',
+                r.get('category') or '',
+            ) for r in rows],
+        )
+    return run_id
+
+
+def _period_minus(period: str, months: int) -> str:
+    y, m = (int(x) for x in period.split('-'))
+    total = y * 12 + (m - 1) - months
+    return f"{total // 12:04d}-{(total % 12) + 1:02d}"
+
+
+def _latest_index(conn: sqlite3.Connection) -> Dict[str, sqlite3.Row]:
+    # la última corrida de cada período define su valor en la serie
+    rows = conn.execute(
+        'SELECT iv.*, r.run_date FROM index_values iv JOIN runs r ON r.id = iv.run_id '
+        'ORDER BY iv.period, r.run_date, iv.run_id'
+    ).fetchall()
+    return {r['period']: r for r in rows}
+
+
+def record_index(conn: sqlite3.Connection, run_id: int, period: str, cba_ae: float, cba_family: float) -> Dict[str, Any]:
+    """Guarda CBA e índice (base = primer período) de la corrida; devuelve la fila de la serie."""
+    hist = {p: r for p, r in _latest_index(conn).items() if p != period}
+    periods = sorted(hist)
+    base = hist[periods[0]]['cba_ae'] if periods and periods[0] < period else cba_ae
+    idx = (cba_ae / base) * 100.0 if base else 100.0
+    prev = [p for p in periods if p < period]
+    mom = (cba_ae / hist[prev[-1]]['cba_ae'] - 1.0) * 100.0 if prev and hist[prev[-1]]['cba_ae'] else None
+    prev12 = hist.get(_period_minus(period, 12))
+    yoy = (cba_ae / prev12['cba_ae'] - 1.0) * 100.0 if prev12 and prev12['cba_ae'] else None
+    with conn:
+        conn.execute(
+            'INSERT INTO index_values (run_id, period, cba_ae, cba_family, index_value, var_mm, var_ia) VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(run_id) DO UPDATE SET period = excluded.period, cba_ae = excluded.cba_ae, cba_family = excluded.cba_family, '
+            'index_value = excluded.index_value, var_mm = excluded.var_mm, var_ia = excluded.var_ia',
+            (run_id, period, cba_ae, cba_family, idx, mom, yoy),
+        )
+    return _series_row(period, cba_ae, cba_family, idx, mom, yoy)
+
+
+def _series_row(period, cba_ae, cba_family, idx, mom, yoy) -> Dict[str, Any]:
+    # mismo formato que escribía metrics.index.update_series
+    return {
+        'period': period,
+        'cba_ae': f"{cba_ae:.2f}",
+        'cba_family': f"{cba_family:.2f}",
+        'idx': f"{idx:.2f}",
+        'mom': '' if mom is None else f"{mom:.2f}",
+        'yoy': '' if yoy is None else f"{yoy:.2f}",
+    }
+
+
+def series(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Serie por período (última corrida de cada uno), ordenada."""
+    return [_series_row(p, r['cba_ae'], r['cba_family'], r['index_value'], r['var_mm'], r['var_ia'])
+            for p, r in sorted(_latest_index(conn).items())]
+
+
+def _price_dicts(cur) -> List[Dict[str, Any]]:
+    out = []
+    for r in cur:
+        d = dict(r)
+        d['in_stock'] = None if d['stock'] is None else bool(d['stock'])
+        d['promo_flag'] = None if d['promo_flag'] is None else bool(d['promo_flag'])
+        out.append(d)
+    return out
+
+
+def latest_run(conn: sqlite3.Connection, period: str) -> Optional[int]:
+    row = conn.execute('SELECT id FROM runs WHERE period = ? ORDER BY run_date DESC, id DESC LIMIT 1', (period,)).fetchone()
+    return row[0] if row else None
+
+
+def breakdown(conn: sqlite3.Connection, period: str) -> List[Dict[str, Any]]:
+    """Desglose del período: filas de su última corrida, en el orden de carga."""
+    run_id = latest_run(conn, period)
+    if run_id is None:
+        return []
+    rows = _price_dicts(conn.execute('SELECT * FROM prices WHERE run_id = ? ORDER BY id', (run_id,)))
+    return [{k: r.get(k) for k in BREAKDOWN_FIELDS} for r in rows]
+
+
+def daily_prices(conn: sqlite3.Connection, run_date: str) -> List[Dict[str, Any]]:
+    """Filas de las corridas de ``run_date`` (todas las sucursales)."""
+    return _price_dicts(conn.execute('SELECT * FROM prices WHERE run_date = ? ORDER BY run_id, id', (run_date,)))
+
+
+def price_history(conn: sqlite3.Connection, item_id: Optional[str] = None, sku: Optional[str] = None,
+                  since: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Historial de precios por ítem o por SKU (``art_<id>``), usando los índices por fecha."""
+    sql = 'SELECT p.* FROM prices p'
+    where, args = [], []
+    if sku:
+        sql += ' JOIN skus s ON s.id = p.sku_id'
+        where.append('s.code = ?')
+        args.append(sku)
+    if item_id:
+        where.append('p.item_id = ?')
+        args.append(item_id)
+    if since:
+        where.append('p.run_date >= ?')
+        args.append(since)
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    return _price_dicts(conn.execute(sql + ' ORDER BY p.run_date, p.id', args))
+
+
+def import_csv_history(conn: sqlite3.Connection, exports_dir: str, branch: str = '') -> Dict[str, int]:
+    """Carga una sola vez los CSV existentes (diarios, desgloses y serie) al almacén."""
+    stats = {'runs': 0, 'rows': 0, 'periods': 0}
+
+    def _read(path: str) -> List[Dict[str, Any]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    by_date: Dict[str, List[Dict[str, Any]]] = {}
+    for path in sorted(glob.glob(os.path.join(exports_dir, 'daily_prices_*.csv'))):
+        m = re.search(r'daily_prices_(\d{4}-\d{2}-\d{2})\.csv$', path)
+        if m:
+            by_date[m.group(1)] = _read(path)
+    # el desglose del período completa las columnas que el diario no tiene
+    for path in sorted(glob.glob(os.path.join(exports_dir, 'breakdown_*.csv'))):
+        m = re.search(r'breakdown_(\d{4}-\d{2})\.csv$', path)
+        if not m:
+            continue
+        period = m.group(1)
+        dates = sorted(d for d in by_date if d.startswith(period))
+        date = dates[-1] if dates else f"{period}-01"
+        daily = {r.get('item_id'): r for r in by_date.get(date, [])}
+        by_date[date] = [dict(daily.get(r.get('item_id')) or {}, **{k: v for k, v in r.items() if v != ''}) for r in _read(path)]
+    for date, rows in sorted(by_date.items()):
+        period = (rows[0].get('period') if rows else '') or date[:7]
+        record_run(conn, period=period, run_date=date, rows=rows, branch=branch, status='imported')
+        stats['runs'] += 1
+        stats['rows'] += len(rows)
+    series_path = os.path.join(exports_dir, 'series_cba.csv')
+    if os.path.exists(series_path):
+        for r in _read(series_path):
+            run_id = latest_run(conn, r['period'])
+            if run_id is None:
+                run_id = record_run(conn, period=r['period'], run_date=f"{r['period']}-01", rows=[], branch=branch, status='imported')
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO index_values (run_id, period, cba_ae, cba_family, index_value, var_mm, var_ia) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (run_id, r['period'], _float(r.get('cba_ae')), _float(r.get('cba_family')), _float(r.get('idx')),
+                     _float(r.get('mom')), _float(r.get('yoy'))),
+                )
+            stats['periods'] += 1
+    return stats
+
+
+def is_empty(conn: sqlite3.Connection) -> bool:
+    return conn.execute('SELECT COUNT(*) FROM runs').fetchone()[0] == 0
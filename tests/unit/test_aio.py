@@ -0,0 +1,128 @@
+"""Motor único: wrappers sync y run_engine con pines + búsquedas en una llamada."""
+import asyncio
+
+from src.site import aio
+from src.site.bridge import SyncView, run_sync
+from src.site.product import extract_product_page
+
+HTML = """<html><head><meta property="og:title" content="Arroz Gallo 1 kg"></head>
+<body><div>Antes $ 1.800,00</div><div>Ahora $ 1.500,00</div></body></html>"""
+
+
+class FakeLoc:
+    def __init__(self, n=0, text="", attrs=None):
+        self.n = n
+        self.text = text
+        self.attrs = attrs or {}
+        self.first = self
+
+    def count(self):
+        return self.n
+
+    def inner_text(self):
+        return self.text
+
+    def get_attribute(self, name):
+        return self.attrs.get(name)
+
+
+class FakePage:
+    def __init__(self, html=HTML, broken=()):
+        self.html = html
+        self.broken = broken
+        self.visited = []
+        self.closed = False
+
+    def goto(self, url, wait_until=None):
+        if url in self.broken:
+            raise RuntimeError("net::ERR_CONNECTION_RESET")
+        self.visited.append(url)
+
+    def wait_for_function(self, js, arg=None, timeout=None):
+        return True
+
+    def locator(self, css):
+        if css.startswith("meta"):
+            return FakeLoc(1, attrs={"content": "Arroz Gallo 1 kg"})
+        return FakeLoc(0)
+
+    def get_by_text(self, rx):
+        return FakeLoc(1 if rx.search(self.html) else 0)
+
+    def content(self):
+        return self.html
+
+    def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, broken=()):
+        self.pages = []
+        self.broken = broken
+
+    async def new_page(self):
+        page = FakePage(broken=self.broken)
+        self.pages.append(page)
+        # páginas de la API sync vistas como async: mismo contrato que playwright.async_api
+        return SyncView(page)
+
+
+def _fake_search(calls):
+    async def _search(page, row, selectors, evidence_dir, html_dump_dir, exclude, log_path, base_url, mode, goto_base, plan):
+        calls.append((row["item_id"], goto_base))
+        if row["item_id"] == "yerba":
+            raise RuntimeError("No se encontró input de búsqueda (search_input).")
+        return {"item_id": row["item_id"], "price_final": 10.0}
+    return _search
+
+
+def test_run_sync_and_sync_wrapper_use_the_async_engine():
+    async def _count(loc):
+        return await loc.count()
+
+    assert run_sync(_count(SyncView(FakeLoc(2)))) == 2
+    res = extract_product_page(FakePage(), "https://x/art_1", selectors={})
+    assert (res["title"], res["price_final"], res["price_original"], res["promo_flag"]) == ("Arroz Gallo 1 kg", 1500.0, 1800.0, True)
+
+
+def test_run_engine_async_runs_both_stages_in_one_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(aio, "search_one_async", _fake_search(calls))
+    jobs = [{"item_id": iid, "url": f"https://x/{iid}"} for iid in ("arroz", "leche", "azucar")]
+    ctx = FakeContext(broken={"https://x/leche"})
+    catalog = [{"item_id": "leche"}, {"item_id": "yerba"}]
+    seen_pinned = []
+
+    def plan_searches(outcomes):
+        # las búsquedas se arman con los pines ya resueltos
+        seen_pinned.extend(o["error"] for o in outcomes)
+        return catalog
+
+    out = asyncio.run(aio.run_engine_async(selectors={}, evidence_dir="", html_dump_dir="", log_path="",
+                                           pinned_jobs=jobs, plan_searches=plan_searches, concurrency=2, context=ctx,
+                                           on_pinned=lambda i, o: None))
+    assert [o["result"]["url"] if o["result"] else None for o in out["pinned"]] == ["https://x/arroz", None, "https://x/azucar"]
+    assert seen_pinned == [None, "net::ERR_CONNECTION_RESET", None]
+    assert out["catalog"] == catalog
+    assert [o["error"] for o in out["searches"]] == [None, "No se encontró input de búsqueda (search_input)."]
+    assert sorted(calls) == [("leche", True), ("yerba", True)]
+    assert len(ctx.pages) == 5 and all(p.closed for p in ctx.pages)
+
+
+def test_run_engine_on_sync_page_runs_in_sequence_without_new_pages(monkeypatch):
+    calls = []
+    monkeypatch.setattr(aio, "search_one_async", _fake_search(calls))
+    page = FakePage()
+    journal = []
+    out = aio.run_engine(selectors={}, evidence_dir="", html_dump_dir="", log_path="",
+                         pinned_jobs=[{"item_id": "arroz", "url": "https://x/arroz"}],
+                         plan_searches=lambda outcomes: [{"item_id": "leche"}],
+                         on_pinned=lambda i, o: journal.append(("pinned", i)),
+                         on_search=lambda i, o: journal.append(("search", i)), page=page)
+    assert page.visited == ["https://x/arroz"] and not page.closed
+    assert out["pinned"][0]["result"]["price_final"] == 1500.0
+    # la página sync ya está en el sitio: no se vuelve a base_url
+    assert calls == [("leche", False)]
+    assert journal == [("pinned", 0), ("search", 0)]
+    assert out["seconds"] >= out["pinned_seconds"]
@@ -0,0 +1,135 @@
+"""``run`` a nivel de ``cmd_run``: ``--resume`` con el journal y el motor async."""
+import argparse
+import asyncio
+import csv
+import shutil
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from src import cli
+from src.site import aio
+from src.infra.retry import append_journal
+
+ROOT = Path(__file__).resolve().parents[2]
+PERIOD = "2024-01"
+CATALOG = """item_id,name,preferred_keywords,fallback_keywords,expected_unit,expected_qty,monthly_qty_base,size_tolerance
+arroz_1kg,Arroz 1 kg,arroz,arroz,kg,1.0,2.0,0.85
+leche_1l,Leche 1 l,leche,leche,l,1.0,10.0,0.85
+azucar_1kg,Azucar 1 kg,azucar,azucar,kg,1.0,1.5,0.85
+yerba_1kg,Yerba mate 1 kg,yerba,yerba,kg,1.0,0.75,0.85
+"""
+PINS = """item_id,url,title,brand_tier,category,cba_flag
+arroz_1kg,https://x/arroz/art_1/,Arroz Gallo x 1 kg.,estandar,,si
+azucar_1kg,https://x/azucar/art_2/,Azucar Ledesma x 1 kg.,estandar,,si
+"""
+
+
+class FakePage:
+    closed = False
+
+    @property
+    def context(self):
+        return self
+
+    @property
+    def browser(self):
+        return self
+
+    def close(self):
+        self.closed = True
+
+
+def _search_row(iid, name, price, qty, unit, monthly):
+    return {"item_id": iid, "name": name, "title": name, "price_final": price, "qty_base": qty, "unit": unit,
+            "query": name.lower(), "expected_qty": 1.0, "monthly_qty_base": monthly, "substitution": ""}
+
+
+def _workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config").mkdir()
+    shutil.copy(ROOT / "config" / "selectors.json", tmp_path / "config" / "selectors.json")
+    (tmp_path / "config.toml").write_text('base_url = "https://x/"\n[paths]\nevidence_store = "files"\n'
+                                          'screenshot_mode = "none"\n', encoding="utf-8")
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "cba_catalog.csv").write_text(CATALOG, encoding="utf-8")
+    (tmp_path / "data" / "sku_pins.csv").write_text(PINS, encoding="utf-8")
+    # las plantillas del reporte se buscan relativas al repo; el reporte no es lo que se prueba
+    monkeypatch.setattr(cli, "render_report", lambda path, *a, **kw: Path(path).write_text("ok"))
+
+
+def _args(**kw):
+    return argparse.Namespace(**dict(dict(period=PERIOD, branch=None, debug=False, skip_branch_verify=False, engine="sync",
+                                          search_mode=None, force_branch_refresh=False, attach=False, resume=False,
+                                          browser_channel=None), **kw))
+
+
+def _breakdown(tmp_path):
+    with open(tmp_path / "exports" / f"breakdown_{PERIOD}.csv", encoding="utf-8") as f:
+        return {r["item_id"]: r for r in csv.DictReader(f)}
+
+
+def test_resume_skips_journaled_items_and_merges_them(tmp_path, monkeypatch):
+    _workspace(tmp_path, monkeypatch)
+    today = datetime.now(ZoneInfo("America/Argentina/Ushuaia")).date().isoformat()
+    run_id = f"run_{PERIOD}_{today}"
+    append_journal(run_id, {"item_id": "arroz_1kg", "stage": "pinned",
+                            "result": {"url": "https://x/arroz/art_1/", "title": "Arroz Gallo x 1 kg.", "price_final": 1500.0}})
+    append_journal(run_id, {"item_id": "leche_1l", "stage": "search",
+                            "result": _search_row("leche_1l", "Leche 1 l", 1200.0, 1.0, "l", 10.0)})
+    # pin que respondió sin precio: no cuenta como resuelto
+    append_journal(run_id, {"item_id": "azucar_1kg", "stage": "pinned",
+                            "result": {"url": "https://x/azucar/art_2/", "title": "Azucar Ledesma x 1 kg.", "price_final": None}})
+
+    calls = {}
+
+    def _fake_engine(**kw):
+        calls["pinned"] = [j["item_id"] for j in kw["pinned_jobs"]]
+        outcomes = [{"result": {"url": j["url"], "title": "Azucar Ledesma x 1 kg.", "price_final": 900.0},
+                     "error": None, "seconds": 0.0} for j in kw["pinned_jobs"]]
+        catalog = kw["plan_searches"](outcomes)
+        calls["search"] = [r["item_id"] for r in catalog]
+        searches = [{"result": _search_row(r["item_id"], r["name"], 5000.0, 1.0, "kg", r["monthly_qty_base"]),
+                     "error": None, "seconds": 0.0} for r in catalog]
+        return {"pinned": outcomes, "searches": searches, "catalog": catalog,
+                "pinned_seconds": 0.0, "search_seconds": 0.0, "seconds": 0.0}
+
+    monkeypatch.setattr(cli, "ensure_branch", lambda **kw: FakePage())
+    monkeypatch.setattr(cli, "run_engine", _fake_engine)
+    assert cli.cmd_run(_args(resume=True)) == 0
+
+    # el pin y la búsqueda ya journaleados no vuelven al motor; el pin sin precio sí
+    assert calls == {"pinned": ["azucar_1kg"], "search": ["yerba_1kg"]}
+    rows = _breakdown(tmp_path)
+    assert set(rows) == {"arroz_1kg", "leche_1l", "azucar_1kg", "yerba_1kg"}
+    assert float(rows["arroz_1kg"]["price_final"]) == 1500.0
+    assert float(rows["leche_1l"]["price_final"]) == 1200.0
+
+
+def test_async_engine_runs_after_sync_branch_selection(tmp_path, monkeypatch):
+    _workspace(tmp_path, monkeypatch)
+    loop = asyncio.new_event_loop()
+
+    def _sync_branch(**kw):
+        # playwright.sync_api deja su loop marcado como corriendo en el hilo principal
+        asyncio.events._set_running_loop(loop)
+        return FakePage()
+
+    async def _fake_engine_async(**kw):
+        assert kw["page"] is None
+        outcomes = [{"result": {"url": j["url"], "title": "Arroz Gallo x 1 kg.", "price_final": 1500.0},
+                     "error": None, "seconds": 0.0} for j in kw["pinned_jobs"]]
+        catalog = kw["plan_searches"](outcomes)
+        searches = [{"result": _search_row(r["item_id"], r["name"], 1000.0, 1.0, r["expected_unit"], r["monthly_qty_base"]),
+                     "error": None, "seconds": 0.0} for r in catalog]
+        return {"pinned": outcomes, "searches": searches, "catalog": catalog,
+                "pinned_seconds": 0.0, "search_seconds": 0.0, "seconds": 0.0}
+
+    monkeypatch.setattr(cli, "ensure_branch", _sync_branch)
+    monkeypatch.setattr(aio, "run_engine_async", _fake_engine_async)
+    try:
+        assert cli.cmd_run(_args(engine="async")) == 0
+    finally:
+        asyncio.events._set_running_loop(None)
+        loop.close()
+    assert set(_breakdown(tmp_path)) == {"arroz_1kg", "leche_1l", "azucar_1kg", "yerba_1kg"}
@@ -0,0 +1,69 @@
+"""Writer de evidencia en segundo plano con cola acotada."""
+from src.site.evidence import EvidenceWriter, capture_page, configure_evidence, flush_evidence
+
+
+def test_writer_flushes_all_files(tmp_path):
+    w = EvidenceWriter(max_bytes=1024)
+    for i in range(20):
+        w.submit(tmp_path / "html" / f"p{i}.html", "x" * 300)
+    w.submit(tmp_path / "shot.png", b"\x89PNG" + b"\0" * 10)
+    assert w.flush(timeout=5) is True
+    assert len(list((tmp_path / "html").iterdir())) == 20
+    assert (tmp_path / "shot.png").read_bytes().startswith(b"\x89PNG")
+    summary = w.summary()
+    assert summary["files"] == 21
+    assert summary["pending"] == 0
+    # nunca retiene más que el tope (salvo un único item más grande)
+    assert summary["max_pending_bytes"] <= 1024
+
+
+def test_transform_runs_in_writer_and_errors_are_counted(tmp_path):
+    w = EvidenceWriter()
+    w.submit(tmp_path / "a.txt", b"abc", transform=bytes.upper)
+    w.submit(tmp_path / "b.txt", b"abc", transform=lambda b: 1 / 0)
+    w.flush(timeout=5)
+    assert (tmp_path / "a.txt").read_bytes() == b"ABC"
+    assert not (tmp_path / "b.txt").exists()
+    assert w.summary()["errors"] == 1
+
+
+class FakeShotPage:
+    def __init__(self, box=None):
+        self.box = box
+        self.calls = []
+
+    def evaluate(self, js, arg):
+        return self.box
+
+    def screenshot(self, **kwargs):
+        self.calls.append(kwargs)
+        return b"img"
+
+
+def test_sampled_policy_keeps_one_in_n_plus_failures(tmp_path):
+    configure_evidence(screenshots={"mode": "sampled", "sample_every": 3, "format": "png"})
+    try:
+        page = FakeShotPage()
+        taken = [capture_page(page, tmp_path / f"p{i}.png") for i in range(6)]
+        assert sum(1 for t in taken if t) == 2
+        assert capture_page(page, tmp_path / "fail.png", failed=True).endswith("fail.png")
+        assert flush_evidence()["screenshots"]["skipped"] == 4
+    finally:
+        configure_evidence(screenshots={"mode": "full", "format": "png", "quality": 70})
+
+
+def test_clip_policy_uses_region_and_jpeg(tmp_path):
+    configure_evidence(screenshots={"mode": "clip", "format": "jpeg", "quality": 60})
+    try:
+        page = FakeShotPage(box={"x0": 100, "y0": 400, "x1": 500, "y1": 600})
+        target = capture_page(page, tmp_path / "pinned_arroz.png", clip_css="h1")
+        assert target.endswith("pinned_arroz.jpg")
+        kwargs = page.calls[0]
+        assert kwargs["type"] == "jpeg" and kwargs["quality"] == 60
+        assert kwargs["clip"] == {"x": 84, "y": 384, "width": 432, "height": 232}
+        # sin region encontrada: solo el viewport
+        capture_page(FakeShotPage(), tmp_path / "otro.png", clip_css="h1")
+        flush_evidence()
+        assert (tmp_path / "pinned_arroz.jpg").read_bytes() == b"img"
+    finally:
+        configure_evidence(screenshots={"mode": "full", "format": "png", "quality": 70})
@@ -0,0 +1,58 @@
+"""Store de evidencia por contenido: deduplicación, manifest y retención."""
+from datetime import date
+
+from src.site.evidence import EvidenceWriter
+from src.site.evidence_store import MANIFEST, EvidenceStore
+
+HTML = "<html><body>" + "<div class='producto item'>Arroz</div>" * 200 + "</body></html>"
+
+
+def test_writer_stores_deduplicated_compressed_blobs(tmp_path):
+    store = EvidenceStore(tmp_path)
+    w = EvidenceWriter(store=store)
+    run = tmp_path / "2025-09_2025-09-11"
+    w.submit(run / "html" / "pinned_arroz.html", HTML)
+    w.submit(run / "html" / "pinned_arroz_2.html", HTML)
+    w.submit(run / "pinned_arroz.png", b"\x89PNG-bytes")
+    w.flush(timeout=5)
+    assert not (run / "html" / "pinned_arroz.html").exists()
+    assert store.names(run) == ["html/pinned_arroz.html", "html/pinned_arroz_2.html", "pinned_arroz.png"]
+    assert store.read(run, "html/pinned_arroz_2.html").decode("utf-8") == HTML
+    blobs = [p for p in (tmp_path / "_blobs").rglob("*") if p.is_file()]
+    assert len(blobs) == 2
+    assert sum(p.stat().st_size for p in blobs) < len(HTML) // 4
+    assert w.summary()["dedup"] == 1
+    # la ruta que informa verify tiene que existir en disco
+    shot = store.path_of(run, "pinned_arroz.png")
+    assert shot.parent.parent.name == "_blobs" and shot.read_bytes() == b"\x89PNG-bytes"
+    assert store.path_of(run, "falta.png") is None
+
+
+def test_compact_keeps_one_sample_per_month_and_gcs_blobs(tmp_path):
+    store = EvidenceStore(tmp_path)
+    for name, body in [("2025-06_2025-06-03", "a"), ("2025-06_2025-06-20", "b"), ("2025-09_2025-09-11", "c")]:
+        store.put(tmp_path / name / "html" / "pinned_x.html", (HTML + body).encode())
+    # archivo suelto de una corrida anterior al store
+    (tmp_path / "2025-09_2025-09-11" / "pinned_x.png").write_bytes(b"png")
+
+    stats = store.compact(keep_days=30, today=date(2025, 9, 30))
+    assert stats["runs_pruned"] == 1
+    assert stats["monthly_samples"] == 1
+    assert stats["files_migrated"] == 1
+    assert stats["blobs_deleted"] == 1
+    assert not (tmp_path / "2025-06_2025-06-03").exists()
+    assert store.read(tmp_path / "2025-06_2025-06-20", "html/pinned_x.html").endswith(b"b")
+    assert store.read(tmp_path / "2025-09_2025-09-11", "pinned_x.png") == b"png"
+    assert (tmp_path / "2025-09_2025-09-11" / MANIFEST).read_text(encoding="utf-8").count("\n") == 2
+
+
+def test_compact_keeps_blobs_referenced_outside_run_dirs(tmp_path):
+    store = EvidenceStore(tmp_path)
+    store.put(tmp_path / "session" / "login.html", (HTML + "session").encode())
+    store.put(tmp_path / "2025-06_2025-06-03" / "html" / "pinned_x.html", (HTML + "a").encode())
+    store.put(tmp_path / "2025-06_2025-06-20" / "html" / "pinned_x.html", (HTML + "b").encode())
+
+    stats = store.compact(keep_days=30, today=date(2025, 9, 30))
+    assert stats["runs_pruned"] == 1 and stats["blobs_deleted"] == 1
+    assert (tmp_path / "session" / MANIFEST).exists()
+    assert store.read(tmp_path / "session", "login.html").endswith(b"session")
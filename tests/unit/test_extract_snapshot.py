@@ -0,0 +1,54 @@
+"""Extracción offline de tarjetas con el plan compilado de selectors.json."""
+import json
+from pathlib import Path
+
+from src.site.extract import compile_card_plan, extract_cards_html
+
+SELECTORS = json.loads((Path(__file__).resolve().parents[2] / "config" / "selectors.json").read_text(encoding="utf-8"))
+
+HTML = """
+<html><body>
+  <article>
+    <a href="/almacen/arroz/art_2440/"><h3>Arroz Largo Fino x 1 kg</h3></a>
+    <div>Antes $ 2.150,00</div>
+    <div>Ahora $ 1.500,00</div>
+    <button class="add">Agregar</button>
+  </article>
+  <article>
+    <a href="/almacen/fideos/art_10/"><h3>Fideos Tallarines x 500 g</h3></a>
+    <span class="precio destacado">$ 980,50</span>
+    <div class="oos">Sin stock</div>
+  </article>
+  <article>
+    <a href="/almacen/leche/art_20/"><h3>Leche Entera x 1 l</h3></a>
+    <span class="precio destacado">$ 1.200,00</span>
+    <button class="add" style="display:none">Agregar</button>
+  </article>
+  <script>var precio = "Antes $ 1,00";</script>
+</body></html>
+"""
+
+
+def test_extract_cards_html_same_fields_as_dom():
+    cards = extract_cards_html(HTML, compile_card_plan(SELECTORS))
+    assert len(cards) == 3
+    assert cards[0] == {
+        "title": "Arroz Largo Fino x 1 kg",
+        "price_final": 1500.0,
+        "promo_flag": True,
+        "in_stock": True,
+        "url": "/almacen/arroz/art_2440/",
+        "price_original": 2150.0,
+        "price_promo": 1500.0,
+    }
+    assert cards[1]["price_final"] == 980.5
+    assert cards[1]["in_stock"] is False
+    assert not cards[1]["promo_flag"]
+    # botón de agregar oculto cuenta como sin stock, igual que is_visible()
+    assert cards[2]["in_stock"] is False
+
+
+def test_extract_cards_html_limit():
+    plan = compile_card_plan(SELECTORS)
+    assert len(extract_cards_html(HTML, plan, limit=2)) == 2
+    assert extract_cards_html("", plan) == []
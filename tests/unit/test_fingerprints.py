@@ -0,0 +1,95 @@
+"""Huellas por URL: evidencia condicional y re-chequeo espaciado."""
+import json
+from pathlib import Path
+
+import responses
+
+from src.site import product
+from src.site.evidence import flush_evidence
+from src.site.fingerprints import FingerprintStore
+from src.site.http_fetch import build_session, fetch_product_http
+from tests.fixtures import html_fixture
+
+SELECTORS = json.loads((Path(__file__).resolve().parents[2] / "config" / "selectors.json").read_text(encoding="utf-8"))
+URL = "https://supermercado.laanonimaonline.com/almacen/arroz/art_2440/"
+RES = {"title": "Arroz x 1 kg", "price_final": 1500.0, "price_original": 1500.0, "promo_flag": False, "in_stock": True, "url": URL}
+
+
+def test_observe_and_backoff(tmp_path):
+    store = FingerprintStore(tmp_path / "fp.json", base_hours=20, max_days=7)
+    t0 = 1_000_000.0
+    assert store.is_due(URL, now=t0)
+    assert store.observe(URL, RES, now=t0) is True
+    assert store.observe(URL, dict(RES), now=t0 + 86400) is False
+    # estable una vez: el próximo chequeo vence a las 40 h
+    assert not store.is_due(URL, now=t0 + 86400 + 30 * 3600)
+    assert store.is_due(URL, now=t0 + 86400 + 41 * 3600)
+    assert store.observe(URL, dict(RES, price_final=1600.0), now=t0 + 3 * 86400) is True
+    assert store.interval_hours(URL) == 20
+    store.save()
+    assert FingerprintStore(tmp_path / "fp.json").last_result(URL)["price_final"] == 1600.0
+
+
+@responses.activate
+def test_http_conditional_get_skips_dump_when_unchanged(tmp_path):
+    store = FingerprintStore(tmp_path / "fp.json")
+    responses.get(URL, body=html_fixture("product_page.html"), status=200, headers={"ETag": '"v1"'})
+    session = build_session(None)
+    first, _ = fetch_product_http(session, URL, SELECTORS, str(tmp_path), "pinned_arroz", fingerprints=store)
+    flush_evidence()
+    assert (tmp_path / "pinned_arroz.html").exists()
+    (tmp_path / "pinned_arroz.html").unlink()
+
+    responses.replace(responses.GET, URL, status=304)
+    again, status = fetch_product_http(session, URL, SELECTORS, str(tmp_path), "pinned_arroz", fingerprints=store)
+    flush_evidence()
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    assert again["price_final"] == first["price_final"] == 1500.0
+    assert status == 304
+    assert not (tmp_path / "pinned_arroz.html").exists()
+    assert store.stats == {"unchanged": 0, "changed": 1, "not_modified": 1}
+
+
+class FakeLoc:
+    first = property(lambda self: self)
+
+    def count(self):
+        return 0
+
+
+class FakePage:
+    """Página de producto sin precio (200)."""
+
+    def goto(self, url, wait_until=None):
+        return type("Resp", (), {"status": 200})()
+
+    def wait_for_function(self, js, arg=None, timeout=None):
+        return True
+
+    def locator(self, css):
+        return FakeLoc()
+
+    def get_by_text(self, rx):
+        return FakeLoc()
+
+    def content(self):
+        return "<html><body>Sin precio</body></html>"
+
+
+def test_failed_extractions_always_save_evidence_and_are_not_cached(tmp_path, monkeypatch):
+    store = FingerprintStore(tmp_path / "fp.json")
+    saved = []
+
+    async def _save(page, evidence_dir, html_dump_dir, basename, clip_css="", failed=False):
+        saved.append(failed)
+        return "", f"{basename}.png"
+
+    monkeypatch.setattr(product, "save_evidence_async", _save)
+    for _ in range(2):
+        res = product.extract_product_page(FakePage(), URL, {}, str(tmp_path), str(tmp_path), "pinned_arroz", fingerprints=store)
+        assert res["price_final"] is None
+    assert saved == [True, True]
+    assert store.data == {} and store.last_result(URL) is None and store.is_due(URL)
+    # una huella vieja sin precio no se sirve como resultado de --due-only
+    store.data[URL] = {"last_checked": 1_000_000.0, "result": dict(RES, price_final=None)}
+    assert store.last_result(URL) is None
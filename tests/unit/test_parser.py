@@ -1,6 +1,8 @@
 """Pruebas para parser, incluyendo manejo de precios promocionales."""
 from unittest.mock import patch
 
+from cba_shared import matcher
+
 from src import parser, normalizer
 from tests.fixtures import csv_fixture, seed_products
 
@@ -137,3 +139,57 @@ def test_save_evidence_skips_missing(tmp_path):
     }
     parser.save_evidence(mapping, output_dir=str(tmp_path))
     assert len(list(tmp_path.iterdir())) == 3
+
+
+def _naive_matches(products, cba_row):
+    # el loop anterior: match_sku_to_cba sobre cada producto de la categoría
+    out = []
+    for prod in products:
+        if cba_row.get("category") and prod.get("category") and cba_row["category"].lower() != prod["category"].lower():
+            continue
+        result = parser.match_sku_to_cba(prod, cba_row)
+        if result:
+            out.append((prod["sku"], result))
+    return out
+
+
+def test_catalog_matcher_equivalent_to_full_loop():
+    catalog = [
+        {"item": "Leche", "category": "Lacteos", "preferred_keywords": "leche entera", "fallback_keywords": "leche", "min_pack_size": 1, "monthly_qty_unit": "L"},
+        {"item": "Pan", "category": "", "preferred_keywords": "pan", "fallback_keywords": "", "min_pack_size": 1, "monthly_qty_unit": "kg"},
+        {"item": "Té", "category": "Infusiones", "preferred_keywords": "té", "fallback_keywords": "", "monthly_qty_unit": "unidad"},
+        {"item": "Yerba", "category": "Infusiones", "preferred_keywords": "yerba", "fallback_keywords": ";mate;"},
+    ]
+    products = [
+        {"name": "Leche entera 900 ml", "sku": "1", "price": 90.0, "category": "Lacteos"},
+        {"name": "Leche descremada 1 l", "sku": "2", "price": 80.0, "category": "lacteos"},
+        {"name": "Leche entera x 1 l", "sku": "3", "price": 95.0, "pack_size": 1, "pack_unit": "l", "category": "Almacen"},
+        {"name": "Pan rallado 500 g", "sku": "4", "price": 50.0},
+        {"name": "Panceta 200 g", "sku": "5", "price": 70.0, "category": "Fiambres"},
+        {"name": "Té en saquitos x 25", "sku": "6", "price": 30.0, "pack_size": 25, "category": "Infusiones"},
+        {"name": "Yerba mate 1 kg", "sku": "7", "price": 300.0, "category": "Infusiones"},
+        {"name": "Mate cocido", "sku": "8", "price": 40.0, "category": "Infusiones"},
+    ]
+    matcher = parser.CatalogMatcher(catalog).index(products)
+    for cr in matcher.rows:
+        got = [(m["sku"], (m["source"], m.get("reason"))) for m in matcher.matches(cr)]
+        assert got == _naive_matches(products, cr["row"])
+    # solo se evalúan pares con alguna keyword en el nombre (no 4 × 8)
+    assert matcher.stats["pairs"] == 7
+
+
+def test_catalog_matcher_short_keywords_scan_everything():
+    matcher = parser.CatalogMatcher([{"item": "Ajo", "preferred_keywords": "aj", "fallback_keywords": ""}])
+    matcher.index([{"name": "Ajo x 3", "sku": "1"}, {"name": "Cebolla", "sku": "2"}])
+    assert matcher.candidates(matcher.rows[0]) == [0]
+    assert [m["sku"] for m in matcher.matches(matcher.rows[0])] == ["1"]
+
+
+def test_shared_matcher_small_pack_rule_is_per_project():
+    row = {"item": "Leche", "preferred_keywords": "leche", "fallback_keywords": "", "min_pack_size": 1, "monthly_qty_unit": "l"}
+    products = [{"name": "Leche entera 500 ml", "sku": "1", "price": 50.0}]
+    strict = matcher.CatalogMatcher([row], matcher.MatchRules(parser.to_base_units, parser.parse_size)).index(products)
+    assert strict.matches(strict.rows[0]) == []
+    # este proyecto acepta el pack chico si el nombre trae la keyword preferida
+    ours = parser.CatalogMatcher([row]).index(products)
+    assert [(m["sku"], m["reason"]) for m in ours.matches(ours.rows[0])] == [("1", "pack_size_diff")]
@@ -0,0 +1,144 @@
+"""Alta y baja automática de pins."""
+import csv
+import json
+
+from src.cli import write_pins
+from src.site.pins import PinManager, outcome_status
+from src.site.product import extract_product_page
+
+URL = "https://supermercado.laanonimaonline.com/almacen/arroz/art_2440/"
+OTHER = "https://supermercado.laanonimaonline.com/almacen/arroz/art_9/"
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+
+class FakeLoc:
+    first = property(lambda self: self)
+
+    def count(self):
+        return 0
+
+
+class FakePage:
+    """Página de producto vacía; ``goto`` devuelve la respuesta con ``status``."""
+
+    def __init__(self, status):
+        self.status = status
+
+    def goto(self, url, wait_until=None):
+        return FakeResponse(self.status)
+
+    def wait_for_function(self, js, arg=None, timeout=None):
+        return True
+
+    def locator(self, css):
+        return FakeLoc()
+
+    def get_by_text(self, rx):
+        return FakeLoc()
+
+    def content(self):
+        return "<html><body>Página no encontrada</body></html>"
+
+
+def _run(path, date, **kw):
+    return PinManager(date, path=path, promote_after=3, demote_dead_after=2, demote_oos_after=2, **kw)
+
+
+def test_search_winner_promoted_after_consistent_runs(tmp_path):
+    path = tmp_path / "pin_history.json"
+    for i, (url, stock) in enumerate([(OTHER, True), (URL, True), (URL, True)]):
+        pm = _run(path, f"2025-09-0{i + 1}")
+        pm.observe_search("arroz", {"url": url, "price_final": 1000.0, "in_stock": stock})
+        assert pm.decide({})["promote"] == []
+        pm.save()
+    pm = _run(path, "2025-09-04")
+    pm.observe_search("arroz", {"url": URL, "price_final": 1000.0, "in_stock": True})
+    # re-correr el mismo día no suma una corrida más
+    pm.observe_search("arroz", {"url": URL, "price_final": 1000.0, "in_stock": True})
+    assert pm.decide({})["promote"] == [{"item_id": "arroz", "url": URL}]
+    # ya pineado: no se vuelve a promover
+    assert pm.decide({"arroz": {"url": URL}})["promote"] == []
+
+
+def test_dead_pin_demoted_and_banned(tmp_path):
+    path = tmp_path / "pin_history.json"
+    pins = {"arroz": {"item_id": "arroz", "url": URL}}
+    for date, status in (("2025-09-01", 200), ("2025-09-02", 404), ("2025-09-03", None)):
+        pm = _run(path, date)
+        if status == 200:
+            pm.observe_pinned("arroz", URL, {"price_final": 1.0}, None, status)
+        elif status == 404:
+            pm.observe_pinned("arroz", URL, None, "HTTP 404", status)
+        else:
+            # navegador: el 404 llega en el resultado
+            pm.observe_pinned("arroz", URL, {"price_final": None, "http_status": 404})
+        decision = pm.decide(pins)
+        pm.save()
+    assert decision["demote"] == [{"item_id": "arroz", "url": URL, "reason": "dead"}]
+    pm = _run(path, "2025-09-04")
+    assert pm.apply(pins) == {}
+    # la URL vetada no vuelve por búsqueda
+    for d in range(3):
+        pm.run_date = f"2025-09-1{d}"
+        pm.observe_search("arroz", {"url": URL, "price_final": 1000.0, "in_stock": True})
+    assert pm.decide({})["promote"] == []
+
+
+def test_errors_and_missing_price_never_demote(tmp_path):
+    path = tmp_path / "pin_history.json"
+    pins = {"arroz": {"item_id": "arroz", "url": URL}}
+    outcomes = [(None, "Timeout 30000ms exceeded"), ({"price_final": None}, None), (None, "net::ERR_CONNECTION_RESET")]
+    for d, (result, err) in enumerate(outcomes):
+        pm = _run(path, f"2025-09-0{d + 1}")
+        pm.observe_pinned("arroz", URL, result, err)
+        assert pm.decide(pins)["demote"] == []
+        pm.save()
+    assert {r["status"] for r in pm.data["arroz"]["runs"]} == {"error"}
+
+
+def test_ban_expires_and_url_can_come_back(tmp_path):
+    path = tmp_path / "pin_history.json"
+    pins = {"arroz": {"item_id": "arroz", "url": URL}}
+    for date in ("2025-09-01", "2025-09-02"):
+        pm = _run(path, date, ban_days=10)
+        pm.observe_pinned("arroz", URL, None, "HTTP 410", 410)
+        decision = pm.decide(pins)
+        pm.save()
+    assert decision["demote"] == [{"item_id": "arroz", "url": URL, "reason": "dead"}]
+    assert _run(path, "2025-09-11", ban_days=10).apply(pins) == {}
+    pm = _run(path, "2025-09-12", ban_days=10)
+    assert pm.apply(pins) == pins and pm.stats["bans_expired"] == 1
+    # vencido el veto la búsqueda puede volver a promoverla
+    for d in range(3):
+        pm.run_date = f"2025-09-1{d + 2}"
+        pm.observe_search("arroz", {"url": URL, "price_final": 1000.0, "in_stock": True})
+    assert pm.decide({})["promote"] == [{"item_id": "arroz", "url": URL}]
+
+
+def test_legacy_banned_urls_list_starts_its_ban_today(tmp_path):
+    path = tmp_path / "pin_history.json"
+    path.write_text(json.dumps({"arroz": {"runs": [], "banned_urls": [URL]}}), encoding="utf-8")
+    pins = {"arroz": {"item_id": "arroz", "url": URL}}
+    pm = _run(path, "2025-09-01", ban_days=10)
+    assert pm.apply(pins) == {}
+    assert pm.data["arroz"]["banned"] == {URL: "2025-09-01"}
+
+
+def test_browser_extraction_reports_http_status():
+    page = FakePage(status=404)
+    res = extract_product_page(page, URL, selectors={})
+    assert res["http_status"] == 404 and outcome_status(res) == "dead"
+    assert outcome_status(extract_product_page(FakePage(status=200), URL, selectors={})) == "error"
+
+
+def test_write_pins_unpin_keeps_metadata(tmp_path):
+    path = tmp_path / "sku_pins.csv"
+    path.write_text(f"item_id,url,title,brand_tier\narroz,{URL},Arroz,estandar\nyerba,,Yerba,\n", encoding="utf-8")
+    write_pins(str(path), [{"item_id": "yerba", "url": OTHER, "title": "Yerba 1 kg"}], unpin=["arroz"])
+    rows = {r["item_id"]: r for r in csv.DictReader(path.read_text(encoding="utf-8").splitlines())}
+    assert rows["arroz"]["url"] == "" and rows["arroz"]["brand_tier"] == "estandar"
+    assert rows["yerba"]["url"] == OTHER
@@ -0,0 +1,72 @@
+"""Pool de páginas de pins-run con páginas falsas (sin navegador)."""
+import threading
+import time
+
+from src.site import pool
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = 0
+        self.urls = []
+
+
+def _factory(pages):
+    lock = threading.Lock()
+
+    def _open():
+        page = FakePage()
+        with lock:
+            pages.append(page)
+
+        def _close():
+            page.closed += 1
+        return page, _close
+    return _open
+
+
+def _fake_extract(page, url, **kwargs):
+    page.urls.append(url)
+    # los primeros jobs tardan más: terminan después que los siguientes
+    time.sleep(0.02 if url.endswith("/0") or url.endswith("/1") else 0)
+    if url.endswith("/boom"):
+        raise RuntimeError("selector roto")
+    return {"url": url, "price_final": 100.0}
+
+
+def _jobs(urls):
+    return [{"url": u, "save_basename": f"pinned_{i}"} for i, u in enumerate(urls)]
+
+
+def test_pool_keeps_job_order_and_closes_every_page(monkeypatch):
+    monkeypatch.setattr(pool, "extract_product_page", _fake_extract)
+    pages = []
+    urls = [f"https://x/{i}" for i in range(8)]
+    out = pool.extract_pinned_pool(_jobs(urls), {}, "", "", workers=3, open_page=_factory(pages))
+    assert [o["result"]["url"] for o in out["outcomes"]] == urls
+    assert len(pages) == 3 and all(p.closed == 1 for p in pages)
+    assert sorted(u for p in pages for u in p.urls) == sorted(urls)
+    assert sum(w["items"] for w in out["workers"]) == 8
+
+
+def test_pool_error_stays_with_its_job(monkeypatch):
+    monkeypatch.setattr(pool, "extract_product_page", _fake_extract)
+    seen = []
+    out = pool.extract_pinned_pool(_jobs(["https://x/a", "https://x/boom", "https://x/b"]), {}, "", "", workers=2,
+                                   open_page=_factory([]), on_result=lambda i, o: seen.append(i))
+    errors = [o["error"] for o in out["outcomes"]]
+    assert errors == [None, "selector roto", None]
+    assert out["outcomes"][2]["result"]["price_final"] == 100.0
+    assert sorted(seen) == [0, 1, 2]
+    assert sum(w["errors"] for w in out["workers"]) == 1
+
+
+def test_pool_worker_startup_failure_marks_jobs_not_processed(monkeypatch):
+    monkeypatch.setattr(pool, "extract_product_page", _fake_extract)
+
+    def _broken():
+        raise RuntimeError("chromium no levanta")
+
+    out = pool.extract_pinned_pool(_jobs(["https://x/a", "https://x/b"]), {}, "", "", workers=2, open_page=_broken)
+    assert [o["error"] for o in out["outcomes"]] == ["not processed", "not processed"]
+    assert all(w["fatal"] == "chromium no levanta" for w in out["workers"])
@@ -0,0 +1,58 @@
+"""Pruebas para el parseo offline de páginas de producto y el fetch HTTP."""
+import json
+from pathlib import Path
+
+import responses
+
+from src.site.evidence import flush_evidence
+from src.site.http_fetch import build_session, fetch_pinned_http, fetch_product_http
+from src.site.product import parse_product_html
+from tests.fixtures import html_fixture
+
+SELECTORS = json.loads((Path(__file__).resolve().parents[2] / "config" / "selectors.json").read_text(encoding="utf-8"))
+URL = "https://supermercado.laanonimaonline.com/almacen/arroz/art_2440/"
+
+
+def test_parse_product_html_prices_and_stock():
+    res = parse_product_html(html_fixture("product_page.html"), URL, SELECTORS)
+    assert res["title"] == "Arroz Grano Largo Fino Molinos Ala x 1 kg."
+    assert res["price_final"] == 1500.0
+    assert res["price_original"] == 2150.0
+    assert res["promo_flag"] is True
+    assert res["in_stock"] is True
+    assert res["url"] == URL
+
+
+def test_parse_product_html_out_of_stock():
+    html = html_fixture("product_page.html").replace('style=" display:none;"', 'style=""')
+    assert parse_product_html(html, URL, SELECTORS)["in_stock"] is False
+
+
+@responses.activate
+def test_fetch_product_http_uses_storage_cookies(tmp_path):
+    state = tmp_path / "storage_state.json"
+    state.write_text(json.dumps({"cookies": [{"name": "sucursal", "value": "166", "domain": "supermercado.laanonimaonline.com", "path": "/"}]}))
+    responses.get(URL, body=html_fixture("product_page.html"), status=200)
+    session = build_session(state)
+    res, status = fetch_product_http(session, URL, SELECTORS, html_dump_dir=str(tmp_path), save_basename="pinned_arroz")
+    assert res["price_final"] == 1500.0
+    assert status == 200
+    assert "sucursal=166" in responses.calls[0].request.headers["Cookie"]
+    flush_evidence()
+    assert (tmp_path / "pinned_arroz.html").exists()
+
+
+@responses.activate
+def test_fetch_product_http_returns_none_without_price():
+    responses.get(URL, body="<html><h1>Producto</h1></html>", status=200)
+    assert fetch_product_http(build_session(None), URL, SELECTORS) == (None, 200)
+
+
+@responses.activate
+def test_fetch_pinned_http_gone_product_skips_browser_fallback():
+    gone = URL.replace("art_2440", "art_9999")
+    responses.get(URL, body="<html><h1>Producto</h1></html>", status=503)
+    responses.get(gone, status=404)
+    http = fetch_pinned_http([{"url": URL}, {"url": gone}], SELECTORS, workers=2, storage_state_path=None)
+    assert http["misses"] == [0] and http["gone"] == [1]
+    assert [(o["status"], o["error"]) for o in http["outcomes"]] == [(503, None), (404, "HTTP 404")]
@@ -0,0 +1,63 @@
+"""Re-extracción en lote desde evidencia archivada."""
+from src.site.evidence_store import EvidenceStore
+from src.site.reextract import plan_tasks, reextract
+from src.site.search import _build_query, search_basename
+from tests.fixtures import html_fixture
+from tests.unit.test_replay import SELECTORS, URL
+from tests.unit.test_search_imetrics import HTML as SEARCH_HTML
+
+# filas como las deja read_catalog (números, no strings del CSV)
+ROW = {"item_id": "aceite", "name": "Aceite girasol 1,5 l", "preferred_keywords": ["aceite", "girasol"],
+       "fallback_keywords": [], "expected_unit": "l", "expected_qty": 1.5, "monthly_qty_base": 1.0, "size_tolerance": 0.85}
+ARROZ = {"item_id": "arroz", "name": "Arroz 1 kg", "preferred_keywords": ["arroz"], "fallback_keywords": [],
+         "expected_unit": "kg", "expected_qty": 1.0, "monthly_qty_base": 2.0, "size_tolerance": 0.85}
+
+
+def _archive(tmp_path):
+    store = EvidenceStore(tmp_path / "evidence")
+    for day in ("2025-08-01", "2025-09-01"):
+        run = tmp_path / "evidence" / f"{day[:7]}_{day}"
+        store.put(run / "html" / "pinned_arroz.html", html_fixture("product_page.html").encode("utf-8"))
+        store.put(run / "html" / f"{search_basename(_build_query(ROW))}.html", SEARCH_HTML.encode("utf-8"))
+        # la búsqueda de un ítem ya resuelto por su pin se descarta
+        store.put(run / "html" / f"{search_basename(_build_query(ARROZ))}.html", SEARCH_HTML.encode("utf-8"))
+    runs = sorted((tmp_path / "evidence").glob("*_*"))
+    return plan_tasks(runs, store, [ARROZ, ROW], lambda period: {"arroz": {"url": f"{URL}?p={period}"}})
+
+
+def _run(tasks, workers):
+    rows = []
+    ctx = {"selectors": SELECTORS, "exclude_keywords": [], "base_url": "", "mode": "imetrics"}
+    stats = reextract(tasks, ctx, lambda t, r: rows.append((t["date"], r["item_id"], r["price_final"], r["unit_price_base"])),
+                      workers=workers, chunksize=2)
+    return rows, stats
+
+
+def test_plan_tasks_pinned_first(tmp_path):
+    tasks = _archive(tmp_path)
+    assert [(t["date"], t["kind"]) for t in tasks[:3]] == [("2025-08-01", "pinned"), ("2025-08-01", "search"), ("2025-08-01", "search")]
+    assert len(tasks) == 6
+    # cada corrida con los pins de su período
+    assert [t["url"] for t in tasks if t["kind"] == "pinned"] == [f"{URL}?p=2025-08", f"{URL}?p=2025-09"]
+
+
+def test_reextract_reads_each_manifest_once_per_run(tmp_path, monkeypatch):
+    tasks = _archive(tmp_path)
+    reads = []
+    manifest = EvidenceStore.manifest
+    monkeypatch.setattr(EvidenceStore, "manifest", lambda self, run_dir: reads.append(run_dir) or manifest(self, run_dir))
+    rows, stats = _run(tasks, 1)
+    assert stats["rows"] == 4
+    assert len(reads) == 2
+
+
+def test_reextract_pool_matches_serial(tmp_path):
+    tasks = _archive(tmp_path)
+    serial, stats = _run(tasks, 1)
+    pooled, pstats = _run(tasks, 2)
+    assert pooled == serial
+    assert [r[:3] for r in serial] == [("2025-08-01", "arroz", 1500.0), ("2025-08-01", "aceite", 3100.0),
+                                       ("2025-09-01", "arroz", 1500.0), ("2025-09-01", "aceite", 3100.0)]
+    assert stats["files"] == pstats["files"] == 6
+    assert stats["rows"] == 4 and stats["skipped"] == 2 and stats["errors"] == 0
+    assert pstats["workers"] == 2 and pstats["files_per_sec"] > 0
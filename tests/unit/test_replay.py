@@ -0,0 +1,61 @@
+"""Replay offline de una carpeta de evidencia."""
+import csv
+import json
+from pathlib import Path
+
+from src.site.evidence_store import EvidenceStore
+from src.site.replay import diff_breakdown, replay_pinned, replay_searches
+from src.site.search import _build_query, search_basename
+from tests.fixtures import html_fixture
+from tests.unit.test_search_imetrics import HTML as SEARCH_HTML
+
+SELECTORS = json.loads((Path(__file__).resolve().parents[2] / "config" / "selectors.json").read_text(encoding="utf-8"))
+URL = "https://supermercado.laanonimaonline.com/almacen/arroz/art_2440/"
+ROW = {"item_id": "aceite", "name": "Aceite girasol 1,5 l", "preferred_keywords": ["aceite", "girasol"],
+       "fallback_keywords": [], "expected_unit": "l", "expected_qty": "1.5", "monthly_qty_base": "1", "size_tolerance": ""}
+
+
+def _run_dir(tmp_path):
+    run = tmp_path / "evidence" / "2025-09_2025-09-11"
+    (run / "html").mkdir(parents=True)
+    # un volcado suelto y otro ya compactado en el store
+    (run / "html" / "pinned_arroz.html").write_text(html_fixture("product_page.html"), encoding="utf-8")
+    store = EvidenceStore(tmp_path / "evidence")
+    store.put(run / "html" / f"{search_basename(_build_query(ROW))}.html", SEARCH_HTML.encode("utf-8"))
+    return run, store
+
+
+def test_replay_pinned_html_and_journal_fallback(tmp_path):
+    run, store = _run_dir(tmp_path)
+    jobs = [{"item_id": "arroz", "url": URL, "save_basename": "pinned_arroz"},
+            {"item_id": "leche", "url": URL, "save_basename": "pinned_leche"},
+            {"item_id": "yerba", "url": URL, "save_basename": "pinned_yerba"}]
+    journal = {"leche": {"item_id": "leche", "stage": "pinned", "result": {"title": "Leche 1 l", "price_final": 900.0}}}
+    outs = replay_pinned(run, store, jobs, SELECTORS, journal)
+    assert outs[0]["source"] == "html" and outs[0]["result"]["price_final"] == 1500.0
+    assert outs[1]["source"] == "journal" and outs[1]["result"]["price_final"] == 900.0
+    assert outs[2]["error"] and outs[2]["result"] is None
+
+
+def test_replay_searches_reads_compacted_dump(tmp_path):
+    run, store = _run_dir(tmp_path)
+    outs = replay_searches(run, store, [ROW], SELECTORS, [], str(tmp_path / "log.jsonl"), mode="imetrics")
+    chosen = outs[0]["result"]
+    assert chosen["item_id"] == "aceite"
+    assert chosen["title"] == "Aceite de Girasol Natura x 1,5 Lt."
+    assert chosen["price_final"] == 3100.0
+
+
+def test_diff_breakdown(tmp_path):
+    def _write(path, rows):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=["item_id", "title", "price_final"])
+            w.writeheader()
+            w.writerows(rows)
+    _write(tmp_path / "live.csv", [{"item_id": "a", "title": "A", "price_final": "10"}, {"item_id": "b", "title": "B", "price_final": "5"}])
+    _write(tmp_path / "rep.csv", [{"item_id": "a", "title": "A", "price_final": "11"}, {"item_id": "c", "title": "C", "price_final": "1"}])
+    diff = diff_breakdown(tmp_path / "live.csv", tmp_path / "rep.csv")
+    assert diff["changed"] == {"a": {"price_final": ["10", "11"]}}
+    assert diff["added"] == ["c"] and diff["missing"] == ["b"]
+    assert not diff["identical"]
+    assert diff_breakdown(tmp_path / "live.csv", tmp_path / "live.csv")["identical"]
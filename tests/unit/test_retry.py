@@ -4,9 +4,11 @@ import pytest
 
 from src.infra.retry import (
     CircuitBreakerOpen,
+    append_journal,
     circuit_breaker,
     exponential_backoff,
     load_checkpoint,
+    load_journal,
     save_checkpoint,
 )
 
@@ -52,3 +54,14 @@ def test_checkpoint_roundtrip(tmp_path):
     save_checkpoint("run123", "step1", {"extra": 42}, base_dir=base)
     data = load_checkpoint("run123", base_dir=base)
     assert data == {"step": "step1", "extra": 42}
+
+
+def test_journal_append_and_load_skips_truncated_line(tmp_path):
+    base = tmp_path / "data" / "raw"
+    append_journal("run123", {"item_id": "arroz", "price_final": 1500.0}, base_dir=base)
+    append_journal("run123", {"item_id": "leche", "price_final": 1200.0}, base_dir=base)
+    with (base / "run123" / "items.jsonl").open("a", encoding="utf-8") as fh:
+        fh.write('{"item_id": "fid')
+    records = load_journal("run123", base_dir=base)
+    assert [r["item_id"] for r in records] == ["arroz", "leche"]
+    assert load_journal("otro", base_dir=base) == []
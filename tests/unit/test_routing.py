@@ -0,0 +1,49 @@
+"""Perfil de bloqueo de requests."""
+from src.site.routing import apply_block_profile, reset_routing, routing_summary, should_block
+
+
+def test_should_block_by_profile():
+    assert should_block("https://cdn.onesignal.com/sdks/OneSignalSDK.js", "script", "trackers") == "tracker:onesignal.com"
+    assert should_block("https://www.googletagmanager.com/gtm.js", "script", "lean") == "tracker:googletagmanager.com"
+    img = "https://d1on8qs0xdu5jz.cloudfront.net/web/images/productos/c/0000001000/1963.jpg"
+    # con capturas se conservan imágenes; sin capturas (o strict) se bloquean
+    assert should_block(img, "image", "lean", screenshots=True) == ""
+    assert should_block(img, "image", "lean", screenshots=False) == "type:image"
+    assert should_block(img, "image", "strict", screenshots=True) == "type:image"
+    assert should_block("https://supermercado.laanonimaonline.com/buscar?clave=arroz", "document", "strict") == ""
+    assert should_block("https://cdn.onesignal.com/x.js", "script", "off") == ""
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = type("Req", (), {"url": url, "resource_type": resource_type})()
+        self.outcome = None
+
+    def abort(self):
+        self.outcome = "abort"
+
+    def continue_(self):
+        self.outcome = "continue"
+
+
+class FakeContext:
+    def route(self, pattern, handler):
+        self.handler = handler
+
+
+def test_apply_block_profile_counts_blocked_requests():
+    reset_routing()
+    ctx = FakeContext()
+    apply_block_profile(ctx, "lean", screenshots=False)
+    routes = [
+        FakeRoute("https://www.clarity.ms/tag/abc", "script"),
+        FakeRoute("https://staticwf.laanonimaonline.com/fonts/a.woff2", "font"),
+        FakeRoute("https://supermercado.laanonimaonline.com/almacen/art_2440/", "document"),
+    ]
+    for r in routes:
+        ctx.handler(r)
+    assert [r.outcome for r in routes] == ["abort", "abort", "continue"]
+    summary = routing_summary()
+    assert summary["requests_blocked"] == 2
+    assert summary["by_host"] == {"clarity.ms": 1}
+    assert summary["bytes_saved_est"] > 0
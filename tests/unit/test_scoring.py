@@ -0,0 +1,62 @@
+"""Puntaje en lote de candidatos de búsqueda."""
+import re
+
+from src.site.scoring import KeywordMatcher, POLICIES, score_matrix, score_one
+
+ROWS = [
+    {"item_id": "arroz", "preferred_keywords": ["arroz", "arroz largo"], "expected_qty": "1000", "size_tolerance": "0.85"},
+    {"item_id": "aceite", "preferred_keywords": ["aceite", "girasol"], "expected_qty": "1500", "size_tolerance": ""},
+]
+CARDS = [
+    {"title": "Arroz Largo Fino x 1 kg", "in_stock": True, "qty_base": 1000.0, "unit_price": 1.2},
+    {"title": "Arroz largo x 1 kg", "in_stock": True, "qty_base": 1000.0, "unit_price": 0.9},
+    {"title": "Aceite de Girasol x 1,5 Lt. Light", "in_stock": True, "qty_base": 1500.0, "unit_price": 2.0},
+    {"title": "Aceite Girasol x 1,2 Lt.", "in_stock": False, "qty_base": 1200.0, "unit_price": None},
+]
+
+
+def _naive(row, title, in_stock, qty_base, exclude):
+    # el scorer anterior: un re.search por keyword
+    w = POLICIES["default"]
+    score = 0.0
+    for kw in row["preferred_keywords"]:
+        if kw and re.search(re.escape(kw), title, re.I):
+            score += w["keyword"]
+    for ex in exclude:
+        if ex and re.search(re.escape(ex), title, re.I):
+            score += w["exclude"]
+    exp_qty = float(row.get("expected_qty") or 0)
+    tol = float(row.get("size_tolerance") or 0.85)
+    if qty_base and exp_qty:
+        ratio = min(qty_base, exp_qty) / max(qty_base, exp_qty)
+        if ratio >= tol:
+            score += w["size_match"]
+        elif ratio >= min(0.75, tol - 0.15):
+            score += w["size_near"]
+    if not in_stock:
+        score += w["oos"]
+    return score
+
+
+def test_matrix_matches_per_keyword_search():
+    exclude = ["light", "fino"]
+    out = score_matrix(ROWS, CARDS, exclude, POLICIES["default"])
+    for r, row in enumerate(ROWS):
+        for c, card in enumerate(CARDS):
+            expected = _naive(row, card["title"], card["in_stock"], card["qty_base"], exclude)
+            assert out["scores"][r][c] == expected
+            assert score_one(row, card["title"], card["in_stock"], card["qty_base"], exclude) == expected
+
+
+def test_contained_keywords_and_overlaps():
+    m = KeywordMatcher(["arroz", "arroz largo", "largo", "z la"])
+    assert m.hits("ARROZ LARGO") == {"arroz", "arroz largo", "largo", "z la"}
+    assert m.hits("arroz fino") == {"arroz"}
+    assert KeywordMatcher([]).hits("arroz") == frozenset()
+
+
+def test_best_breaks_ties_by_unit_price():
+    out = score_matrix(ROWS, CARDS, [], POLICIES["default"])
+    # las dos tarjetas de arroz empatan en puntaje: gana la de menor precio unitario
+    assert out["best"] == [1, 2]
+    assert score_matrix(ROWS, [], [])["best"] == [None, None]
@@ -0,0 +1,112 @@
+"""Candidatos de búsqueda desde los inputs imetrics del HTML de resultados."""
+from src.site.bridge import SyncView, run_sync
+from src.site.extract import parse_imetrics_cards
+from src.site.scoring import score_one
+from src.site.search import _candidates, _choose, _imetrics_candidates
+
+HTML = """
+<div id="prod_0004571" class="producto item">
+  <a id="btn_nombre_imetrics_1963" href="/almacen/aceite-natura-x-1-5-lt/art_1963/">Aceite de Girasol Natura x 1,5 Lt.</a>
+  <input type="hidden" name="sku_item_imetrics_1963" id="sku_item_imetrics_1963" value="0004571">
+  <input type="hidden" name="name_item_imetrics_1963" id="name_item_imetrics_1963" value="Aceite de Girasol Natura x 1,5 Lt.">
+  <input type="hidden" name="precio_item_imetrics_1963" id="precio_item_imetrics_1963" value="4.800">
+  <input type="hidden" name="precio_oferta_item_imetrics_1963" id="precio_oferta_item_imetrics_1963" value="3.100">
+  <input type="hidden" name="precio_anterior_item_imetrics_1963" id="precio_anterior_item_imetrics_1963" value="5.100">
+  <div id="btnagregarcarritosinstock_0004571" class="boton_sin_stock" style="display:none;"></div>
+</div>
+<div id="prod_0000042" class="producto item">
+  <a id="btn_nombre_imetrics_42" href="/almacen/aceite-girasol-x-900-cc/art_42/">Aceite Girasol x 900 cc.</a>
+  <input type="hidden" name="sku_item_imetrics_42" id="sku_item_imetrics_42" value="0000042">
+  <input type="hidden" name="name_item_imetrics_42" id="name_item_imetrics_42" value="Aceite Girasol x 900 cc.">
+  <input type="hidden" name="precio_item_imetrics_42" id="precio_item_imetrics_42" value="2100,50">
+  <input type="hidden" name="precio_oferta_item_imetrics_42" id="precio_oferta_item_imetrics_42" value="">
+  <div id="btnagregarcarritosinstock_0000042" class="boton_sin_stock" style=""></div>
+</div>
+"""
+
+
+def test_parse_imetrics_cards_fields():
+    cards = parse_imetrics_cards(HTML)
+    assert cards[0] == {
+        "title": "Aceite de Girasol Natura x 1,5 Lt.",
+        "price_final": 3100.0,
+        "promo_flag": True,
+        "in_stock": True,
+        "url": "/almacen/aceite-natura-x-1-5-lt/art_1963/",
+        "price_original": 5100.0,
+        "price_promo": 3100.0,
+    }
+    assert cards[1]["price_final"] == 2100.5
+    assert cards[1]["promo_flag"] is False
+    assert cards[1]["in_stock"] is False
+    assert parse_imetrics_cards("<html><body>sin resultados</body></html>") == []
+
+
+def test_imetrics_candidates_choose_expected_size():
+    row = {
+        "item_id": "aceite_girasol", "name": "Aceite girasol 1.5 l", "preferred_keywords": ["aceite", "girasol"],
+        "fallback_keywords": [], "expected_qty": "1.5", "expected_unit": "l", "monthly_qty_base": "1.2",
+    }
+    base = "https://supermercado.laanonimaonline.com/"
+    candidates = _candidates(row, parse_imetrics_cards(HTML), [], base)
+    # el lote puntúa igual que scoring.score_one tarjeta por tarjeta
+    assert [c[0] for c in candidates] == [score_one(row, c[2]["title"], c[2]["in_stock"], c[3], []) for c in candidates]
+    chosen = _choose(row, "aceite girasol 1.5 l", candidates)
+    assert chosen["url"] == base + "almacen/aceite-natura-x-1-5-lt/art_1963/"
+    assert chosen["qty_base"] == 1.5
+
+
+# página 2: atributos en otro orden (value antes que id) y comillas simples
+HTML_PAGE2 = """
+<div class="producto item">
+  <a href='/almacen/aceite-cocinero-x-1-5-lt/art_77/' class="nombre" id='btn_nombre_imetrics_77'>Aceite Girasol Cocinero x 1,5 Lt.</a>
+  <input value='2.900' type="hidden" id='precio_item_imetrics_77'>
+  <input value="Aceite Girasol Cocinero x 1,5 Lt." id="name_item_imetrics_77" type="hidden">
+</div>
+"""
+
+
+class FakeNext:
+    def __init__(self, page):
+        self.page = page
+        self.first = self
+
+    def wait_for(self, state=None, timeout=None):
+        return None
+
+    def is_enabled(self):
+        return self.page.current < len(self.page.html) - 1
+
+    def click(self):
+        self.page.current += 1
+
+
+class FakeResultsPage:
+    def __init__(self, html):
+        self.html = html
+        self.current = 0
+
+    def locator(self, css):
+        return FakeNext(self)
+
+    def evaluate(self, js):
+        return 0
+
+    def wait_for_function(self, js, arg=None, timeout=None):
+        return True
+
+    def content(self):
+        return self.html[self.current]
+
+
+def test_imetrics_attribute_order_and_pagination():
+    assert [c["price_final"] for c in parse_imetrics_cards(HTML_PAGE2)] == [2900.0]
+    row = {"item_id": "aceite_girasol", "name": "Aceite girasol 1.5 l", "preferred_keywords": ["aceite"],
+           "fallback_keywords": [], "expected_qty": "1.5", "expected_unit": "l"}
+    page = FakeResultsPage([HTML, HTML_PAGE2])
+    selectors = {"pagination_next": [{"css": "a.siguiente"}]}
+    candidates = run_sync(_imetrics_candidates(SyncView(page), HTML, row, selectors, [], ""))
+    assert page.current == 1
+    assert sorted(c[2]["url"] for c in candidates) == [
+        "/almacen/aceite-cocinero-x-1-5-lt/art_77/", "/almacen/aceite-girasol-x-900-cc/art_42/",
+        "/almacen/aceite-natura-x-1-5-lt/art_1963/"]
@@ -0,0 +1,91 @@
+"""Plan de selectores: specs compiladas, estadísticas y orden persistido."""
+import json
+import pickle
+import re
+
+import pytest
+
+from src.site.extract import _loc_try
+from src.site.product import _page_first
+from src.site.selector_plan import CompiledSpec, load_selector_plan, spec_rx
+
+SELECTORS = {
+    "title": [{"css": "h1.stale"}, {"css": "h1"}, {"text": "Arroz"}],
+    "price_now": [{"css": ".precio"}],
+    "evidence_note": "no es una lista de specs",
+}
+
+
+class FakeLoc:
+    def __init__(self, n):
+        self.n = n
+        self.first = self
+
+    def count(self):
+        return self.n
+
+
+class FakePage:
+    def locator(self, css):
+        return FakeLoc(0 if css == "h1.stale" else 1)
+
+    def get_by_text(self, rx):
+        return FakeLoc(1)
+
+
+@pytest.fixture
+def sel_path(tmp_path):
+    path = tmp_path / "selectors.json"
+    path.write_text(json.dumps(SELECTORS), encoding="utf-8")
+    return path
+
+
+def test_plan_compiles_specs_once_and_is_readonly(sel_path, tmp_path):
+    plan = load_selector_plan(sel_path, store=tmp_path / "plan.json")
+    title = plan.get("title", [])
+    assert all(isinstance(s, CompiledSpec) for s in title)
+    assert spec_rx(title[2], "text", re.I) is spec_rx(plan["title"][2], "text", re.I)
+    assert plan["evidence_note"] == "no es una lista de specs"
+    with pytest.raises(TypeError):
+        title[0]["css"] = "x"
+    assert pickle.loads(pickle.dumps(title[1])) == {"css": "h1"}
+
+
+def test_hits_reorder_next_run_until_selectors_change(sel_path, tmp_path):
+    store = tmp_path / "plan.json"
+    plan = load_selector_plan(sel_path, store=store)
+    for _ in range(3):
+        _page_first(FakePage(), plan.get("title", []))
+    stats = plan.stats()["title"]
+    assert (stats["hits"], stats["tries"], stats["order"]) == ([0, 3, 0], [3, 3, 0], [0, 1, 2])
+    plan.save()
+
+    again = load_selector_plan(sel_path, store=store)
+    # el que acierta primero; el que solo falló queda al final
+    assert again.order("title") == [1, 2, 0]
+    assert _page_first(FakePage(), again.get("title", [])) is not None
+    assert again.stats()["title"]["tries"] == [0, 1, 0]
+
+    sel_path.write_text(json.dumps(dict(SELECTORS, price_now=[{"css": ".nuevo"}])), encoding="utf-8")
+    assert load_selector_plan(sel_path, store=store).order("title") == [0, 1, 2]
+
+
+def test_stale_spec_with_timeouts_is_tried_last(sel_path, tmp_path):
+    store = tmp_path / "plan.json"
+    plan = load_selector_plan(sel_path, store=store)
+    for _ in range(10):
+        plan.record("title", 0, False, 2000.0)  # agota el timeout de _try_loc
+        plan.record("title", 1, True)
+    plan.save()
+    # el spec nunca probado queda entre el que acierta y el que agota timeouts
+    assert load_selector_plan(sel_path, store=store).order("title") == [1, 2, 0]
+
+
+def test_loc_try_on_card_returns_sync_locator_and_records_stats(sel_path, tmp_path):
+    plan = load_selector_plan(sel_path, store=tmp_path / "plan.json")
+    card = FakePage()
+    loc = _loc_try(card, None, plan.get("title", []))
+    # el locator sync de la tarjeta, no la vista awaitable del puente
+    assert isinstance(loc, FakeLoc) and loc.count() == 1
+    assert _loc_try(card, None, [{"css": "h1.stale"}]) is None
+    assert plan.stats()["title"]["hits"] == [0, 1, 0]
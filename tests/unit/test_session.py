@@ -0,0 +1,84 @@
+"""Estado compartido de session-serve (leases y páginas servidas)."""
+import subprocess
+import sys
+import threading
+import time
+
+from src.site import session
+from src.site.session import _write_session, acquire_lease, live_session, read_session, release_lease
+
+
+def test_lease_roundtrip_counts_pages(tmp_path):
+    path = tmp_path / "session.json"
+    _write_session({"status": "ready", "cdp_url": "http://127.0.0.1:9", "pages_served": 3, "leases": {}}, path)
+    lease = acquire_lease(path)
+    assert lease in read_session(path)["leases"]
+    release_lease(lease, pages=12, path=path)
+    state = read_session(path)
+    assert state["leases"] == {}
+    assert state["pages_served"] == 15
+    assert not (tmp_path / "session.json.lock").exists()
+
+
+def test_live_session_requires_ready_and_cdp(tmp_path):
+    path = tmp_path / "session.json"
+    assert live_session(path) is None
+    assert acquire_lease(path) is None
+    # puerto sin navegador: no se considera viva
+    _write_session({"status": "ready", "cdp_url": "http://127.0.0.1:9"}, path)
+    assert live_session(path) is None
+
+
+def _ready(tmp_path):
+    path = tmp_path / "session.json"
+    _write_session({"status": "ready", "cdp_url": "http://127.0.0.1:9", "pages_served": 0, "leases": {}}, path)
+    return path
+
+
+def test_concurrent_clients_do_not_lose_updates(tmp_path):
+    path = _ready(tmp_path)
+
+    def _client():
+        for _ in range(10):
+            release_lease(acquire_lease(path), pages=1, path=path)
+
+    threads = [threading.Thread(target=_client) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    state = read_session(path)
+    assert state["pages_served"] == 60 and state["leases"] == {}
+
+
+def test_lock_held_by_live_process_is_not_broken(tmp_path, monkeypatch):
+    path = _ready(tmp_path)
+    # antes se rompía a los 5 s aunque el dueño siguiera vivo
+    monkeypatch.setattr(session, "LOCK_STALE_SECONDS", 0.1)
+    fd = session._lock(path)
+    t = threading.Thread(target=release_lease, args=("x", 5), kwargs={"path": path})
+    t.start()
+    t.join(0.3)
+    assert t.is_alive() and read_session(path)["pages_served"] == 0
+    session._unlock(path, fd)
+    t.join(5)
+    assert read_session(path)["pages_served"] == 5
+
+
+def test_lock_of_dead_process_is_reclaimed(tmp_path):
+    path = _ready(tmp_path)
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    (tmp_path / "session.json.lock").write_text(f"{dead.pid} {time.time():.3f}")
+    assert acquire_lease(path) is not None
+    assert not (tmp_path / "session.json.lock").exists()
+
+
+def test_no_lease_while_daemon_reverifies_branch(tmp_path):
+    path = _ready(tmp_path)
+    lease = acquire_lease(path)
+    # con un cliente conectado el daemon no toma el contexto compartido
+    assert session._update_session(session._begin_verify, path)["status"] == "ready"
+    release_lease(lease, path=path)
+    assert session._update_session(session._begin_verify, path)["status"] == "verifying"
+    assert acquire_lease(path) is None
@@ -16,3 +16,33 @@ def test_to_base_units():
     assert to_base_units(2, "L") == (2, "l")
     assert to_base_units(750, "ml") == (0.75, "l")
     assert to_base_units(1, "docena") == (12, "unit")
+
+
+def test_parse_title_size_memoized_by_normalized_title():
+    from src.normalize.units import clear_title_size_cache, parse_many, parse_title_size, title_size_stats
+    clear_title_size_cache()
+    assert parse_title_size("Aceite Girasol x 1,5 Lt.") == (1.5, "l")
+    assert parse_title_size("  ACEITE girasol   X 1,5 lt. ") == (1.5, "l")
+    assert parse_many(["Pack x2 500 g", "1 1/2 L", "Pack  X2 500 G", "Huevos"]) == [
+        (1.0, "kg"), (1.5, "l"), (1.0, "kg"), (1.0, "unit")]
+    stats = title_size_stats()
+    assert stats["misses"] == 4 and stats["hits"] == 1
+    assert stats["rules"]["x_tamano"] == 1 and stats["rules"]["fallback"] == 1
+
+
+def test_engine_projections_agree():
+    from cba_shared import engine
+    for text in ("Aceite x 1,5 Lt.", "x2 500g", "2 docenas", "x2 1/2 kg", "Vino 750 ml", "Harina 000 1 kg"):
+        size = engine.parse_text(text)
+        kg_l, g_ml = engine.to_kg_l(size), engine.to_g_ml(size)
+        assert abs(kg_l[0] * (1000 if kg_l[1] in ("kg", "l") else 1) - g_ml[0]) < 1e-9
+
+
+def test_parse_title_size_counts_and_sizes():
+    from src.normalize.units import parse_title_size
+    # la cuenta de un pack va separada del tamaño: "750 ml" no es 75 x 0 ml
+    assert parse_title_size("Vino tinto Dadá Merlot 750 ml") == (0.75, "l")
+    assert parse_title_size("Harina 000 1 kg") == (1.0, "kg")
+    assert parse_title_size("Hamburguesa de carne Paty x 4 un. 288 g") == (0.288, "kg")
+    assert parse_title_size("Huevo color D.T. x 12 un") == (12.0, "unit")
+    assert parse_title_size("Limpiador Poett x 1.8 lts") == (1.8, "l")
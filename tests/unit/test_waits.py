@@ -0,0 +1,70 @@
+"""Esperas por señal: registro de tiempos contra los sleeps fijos."""
+from src.site.waits import reset_waits, settle, settle_mark, wait_for_count_growth, wait_for_css, waits_summary
+
+
+class FakeLoc:
+    def __init__(self, counts):
+        self.counts = list(counts)
+
+    def count(self):
+        return self.counts.pop(0) if len(self.counts) > 1 else self.counts[0]
+
+
+class FakePage:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.slept = 0
+
+    def wait_for_timeout(self, ms):
+        self.slept += ms
+
+    def wait_for_function(self, js, arg=None, timeout=None):
+        if self.fail:
+            raise TimeoutError("timeout")
+
+    def evaluate(self, js):
+        if self.fail:
+            raise RuntimeError("Execution context was destroyed")
+        return 12
+
+
+def test_count_growth_returns_early_and_summary():
+    reset_waits()
+    page = FakePage()
+    assert wait_for_count_growth(page, FakeLoc([10, 10, 24]), 10, "scroll", 700) == 24
+    assert page.slept < 700
+    assert wait_for_css(page, "div.producto.item", "search", 1000) is True
+    summary = waits_summary()
+    assert summary["waits"]["scroll"]["count"] == 1
+    assert summary["waits"]["scroll"]["timeouts"] == 0
+    assert summary["fixed_ms"] == 1700
+    assert summary["saved_ms"] > 0
+
+
+def test_wait_for_css_timeout_is_recorded():
+    reset_waits()
+    assert wait_for_css(FakePage(fail=True), "h1", "product", 1000) is False
+    assert waits_summary()["waits"]["product"]["timeouts"] == 1
+    assert waits_summary()["saved_ms"] == 0
+
+
+def test_count_growth_end_of_scroll_is_not_a_timeout():
+    reset_waits()
+    page = FakePage()
+    assert wait_for_count_growth(page, FakeLoc([10]), 10, "scroll", 300) == 10
+    st = waits_summary()["waits"]["scroll"]
+    assert (st["timeouts"], st["fired"], st["saved_ms"]) == (0, 0, 0)
+
+
+def test_settle_counts_savings_only_when_the_signal_fired():
+    reset_waits()
+    page = FakePage()
+    assert settle_mark(page) == 12
+    assert settle(page, "branch_click", 500, settle_mark(page)) is True
+    # sin marca (evaluate falló) no hay señal: se duerme el fijo y no se reporta ahorro
+    broken = FakePage(fail=True)
+    assert settle(broken, "branch_click", 500, settle_mark(broken)) is False
+    assert broken.slept == 500
+    st = waits_summary()["waits"]["branch_click"]
+    assert (st["count"], st["fired"]) == (2, 1)
+    assert 0 < st["saved_ms"] <= 500
@@ -0,0 +1,63 @@
+"""Almacén SQLite de precios."""
+import csv
+
+from src import warehouse
+from src.cli import write_breakdown
+from src.reporting import render as R
+
+URL = "https://supermercado.laanonimaonline.com/almacen/arroz/art_2440/"
+ROWS = [
+    {"item_id": "arroz", "name": "Arroz 1 kg", "query": "PINNED", "title": "Arroz Ala x 1 kg", "url": URL,
+     "in_stock": True, "promo_flag": False, "price_original": 1500.0, "price_promo": None, "price_final": 1500.0,
+     "unit_price_base": 1500.0, "qty_base": 1.0, "unit": "kg", "expected_qty": 1.0, "cost_item_ae": 3000.0,
+     "substitution": "", "brand_tier": "estandar", "cba_flag": "si", "category": ""},
+    {"item_id": "leche", "name": "Leche 1 l", "query": "Leche 1 l", "title": "Leche entera 1 l", "url": "",
+     "in_stock": False, "promo_flag": True, "price_original": 1200.0, "price_promo": 1000.0, "price_final": 1000.0,
+     "unit_price_base": 1000.0, "qty_base": 1.0, "unit": "l", "expected_qty": 1.0, "cost_item_ae": 1000.0,
+     "substitution": ""},
+]
+
+
+def _csv(path):
+    with open(path, encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_record_run_wal_and_breakdown_export_matches(tmp_path):
+    conn = warehouse.connect(str(tmp_path / "wh.sqlite"))
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    rows = [dict(r, period="2025-09") for r in ROWS]
+    warehouse.record_run(conn, period="2025-09", run_date="2025-09-11", rows=rows, branch="USHUAIA 5")
+    # re-correr el mismo día reemplaza los precios de esa corrida
+    run_id = warehouse.record_run(conn, period="2025-09", run_date="2025-09-11", rows=rows, branch="USHUAIA 5")
+    assert conn.execute("SELECT COUNT(*) FROM prices WHERE run_id = ?", (run_id,)).fetchone()[0] == 2
+    write_breakdown(str(tmp_path / "live.csv"), "2025-09", rows)
+    write_breakdown(str(tmp_path / "wh.csv"), "2025-09", warehouse.breakdown(conn, "2025-09"))
+    assert _csv(tmp_path / "live.csv") == _csv(tmp_path / "wh.csv")
+    hist = warehouse.price_history(conn, sku="art_2440")
+    assert [(h["run_date"], h["price_final"]) for h in hist] == [("2025-09-11", 1500.0)]
+
+
+def test_index_series_and_report_data(tmp_path):
+    conn = warehouse.connect(str(tmp_path / "wh.sqlite"))
+    for date, cba in (("2025-08-20", 1000.0), ("2025-09-02", 1050.0), ("2025-09-20", 1100.0)):
+        run_id = warehouse.record_run(conn, period=date[:7], run_date=date, rows=ROWS)
+        row = warehouse.record_index(conn, run_id, date[:7], cba, cba * 3.09)
+    assert row == {"period": "2025-09", "cba_ae": "1100.00", "cba_family": "3399.00", "idx": "110.00", "mom": "10.00", "yoy": ""}
+    assert [s["period"] for s in warehouse.series(conn)] == ["2025-08", "2025-09"]
+    series, breakdown, prev = R.load_data("", "", "2025-09", db=conn)
+    assert series[-1]["idx"] == "110.00" and len(breakdown) == 2 and len(prev) == 2
+    enriched = {r["item_id"]: r for r in R.enrich(breakdown, "2025-09", prev)}
+    assert enriched["leche"]["in_stock"] is False and enriched["leche"]["promo_flag"] is True
+
+
+def test_import_csv_history(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    write_breakdown(str(exports / "breakdown_2025-09.csv"), "2025-09", [dict(r, period="2025-09") for r in ROWS])
+    (exports / "series_cba.csv").write_text("period,cba_ae,cba_family,idx,mom,yoy\n2025-09,4000.00,12360.00,100.00,,\n", encoding="utf-8")
+    conn = warehouse.connect(str(tmp_path / "wh.sqlite"))
+    assert warehouse.is_empty(conn)
+    assert warehouse.import_csv_history(conn, str(exports)) == {"runs": 1, "rows": 2, "periods": 1}
+    assert warehouse.series(conn)[0]["cba_ae"] == "4000.00"
+    assert _csv(exports / "breakdown_2025-09.csv")[0]["price_final"] == str(warehouse.breakdown(conn, "2025-09")[0]["price_final"])